@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,8 +49,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'events.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'events.middleware.LoadSheddingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -87,6 +91,30 @@ DATABASES = {
     }
 }
 
+# RSVPs and reviews are spread over SHARDING['SHARDS'] by event id (see
+# events/sharding.py). DJANGO_RSVP_SHARDS=N adds SQLite shards for local
+# testing; in production list your own aliases here.
+RSVP_SHARDS = int(os.environ.get('DJANGO_RSVP_SHARDS', 1))
+for _index in range(1, RSVP_SHARDS):
+    DATABASES[f'shard{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'shard{_index}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['events.sharding.ShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (Redis, Memcached) in production so cache entries and
+# user cache stats are shared between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -107,6 +135,27 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# The first hasher is used for new passwords; hashes made with a different
+# hasher or iteration count are upgraded on the next successful login.
+
+PASSWORD_HASHERS = [
+    'events.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    # Unset keeps Django's default PBKDF2 work factor
+    'PBKDF2_ITERATIONS': int(os.environ['PBKDF2_ITERATIONS']) if os.environ.get('PBKDF2_ITERATIONS') else None,
+    # Threads hashing passwords for the async register/login views
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 4)),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -138,14 +187,34 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'events.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter'
-    ]
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'events.throttling.UserTokenBucketThrottle',
+        'events.throttling.IPTokenBucketThrottle',
+    ],
 }
 
+# Maximum number of ids accepted by /api/events/batch/
+EVENT_BATCH_MAX_SIZE = 100
+
+# Maximum number of occurrences returned by the occurrence and calendar endpoints
+EVENT_OCCURRENCE_MAX_LIMIT = 10000
+
+# Seconds /readyz reuses its last database probe result
+READINESS_CACHE_TTL = 2.0
+
+# Run events.startup.warm_up() when wsgi.py/asgi.py are loaded (see manage.py startup_report)
+WARM_UP_ON_START = os.environ.get('DJANGO_WARM_UP', '1') == '1'
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -181,3 +250,107 @@ SIMPLE_JWT = {
 
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-profile')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Server-Timing', 'X-Profile-File']
+
+# Outbound webhook delivery
+WEBHOOKS = {
+    'BATCH_SIZE': 100,  # Max events per POST to one endpoint
+    'MAX_WORKERS': 8,  # Delivery threads shared by all endpoints
+    'TIMEOUT': 5,  # Seconds per HTTP request
+    'MAX_ATTEMPTS': 8,
+    'RETRY_BASE_DELAY': 2,  # Seconds, doubled per attempt with full jitter
+    'RETRY_MAX_DELAY': 600,
+    'POOL_SIZE': 4,  # Keep-alive connections kept per host
+    'CLAIM_TIMEOUT': 300,  # Seconds a worker holds rows it took before another worker may retry them
+    'RETENTION_DAYS': 7,  # Delivered and failed rows are removed by purge_webhook_outbox after this
+    'ALLOW_PRIVATE_ADDRESSES': False,  # Allow endpoints on loopback/private networks (local development only)
+}
+
+# Live event updates (Server-Sent Events)
+LIVE_UPDATES = {
+    # Swap for a shared broker when running more than one worker process
+    'BROKER': 'events.live.InProcessBroker',
+    'COALESCE_INTERVAL': 1.0,  # Seconds between pushes per event
+    'HEARTBEAT_INTERVAL': 15.0,  # Seconds between keep-alive comments
+}
+
+# Token-bucket throttling per scope ("<basename>.<action>" or a view's throttle_scope)
+THROTTLING = {
+    # Use 'events.throttling.CacheBucketStore' to share buckets between processes
+    'STORE': 'events.throttling.InMemoryBucketStore',
+    'CACHE_ALIAS': 'default',
+    'MAX_KEYS': 100000,
+    'NUM_PROXIES': 0,  # Reverse proxies in front of the app; X-Forwarded-For is ignored when 0
+    'RATES': {
+        'events.create': {'user': '20/min', 'ip': '60/min'},
+        'rsvps.create': {'user': '30/min', 'ip': '120/min'},
+        'reviews.create': {'user': '10/min', 'ip': '60/min'},
+        'register': {'ip': '10/hour'},
+        'login': {'ip': '30/min'},
+    },
+}
+
+# Adaptive load shedding (503 + Retry-After when overloaded)
+LOAD_SHEDDING = {
+    'ENABLED': True,
+    'MAX_IN_FLIGHT': 100,  # Concurrent requests per process
+    'DB_LATENCY_THRESHOLD': 0.5,  # Seconds, smoothed per-query latency
+    'LATENCY_SAMPLE_TTL': 5.0,
+    'RETRY_AFTER': 5,
+    'EXEMPT_PATHS': ['/admin/', '/healthz'],
+}
+
+# Organizer analytics rollups (see events/analytics.py)
+ANALYTICS = {
+    'HOURLY_RETENTION_DAYS': 14,  # Older hourly rows are folded into daily ones by compact_analytics
+    'MAX_BUCKETS': 1000,  # Buckets one analytics request may span
+}
+
+# Idempotency-Key support for POST endpoints (see events/idempotency.py)
+IDEMPOTENCY = {
+    'TTL': 86400,  # Seconds a stored response is replayed; purge_idempotency_keys removes expired keys
+    'LOCK_TIMEOUT': 60,  # Seconds without a heartbeat before an unfinished request's key can be taken over
+    'WAIT': 5.0,  # Seconds a concurrent duplicate waits for the first response before a 409
+    'POLL_INTERVAL': 0.05,
+}
+
+# User display data cache (in-process LRU in front of CACHES[CACHE_ALIAS])
+USER_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'VERSION': 1,  # Bump to invalidate every entry
+    'LOCAL_MAX_SIZE': 5000,  # Users kept per process
+    'LOCAL_TTL': 30,  # Seconds a process may serve its local copy
+    'TIMEOUT': 3600,  # Seconds in the shared backend
+    'STATS_FLUSH_EVERY': 100,  # Lookups between hit-rate counter flushes
+}
+
+# Sharding of RSVPs and reviews by event id (see events/sharding.py)
+SHARDING = {
+    # Aliases holding RSVP/review rows, in a fixed order: only append, then run rebalance_shards
+    'SHARDS': ['default', *(f'shard{index}' for index in range(1, RSVP_SHARDS))],
+    'ID_RANGE': 10 ** 12,  # Ids per shard; shard N issues ids from N * ID_RANGE
+}
+
+# Change data capture log of event, RSVP and review writes (see events/changelog.py)
+CHANGES = {
+    'RETENTION_DAYS': 7,  # Older entries are dropped by compact_changes once superseded
+    'TOMBSTONE_RETENTION_DAYS': 30,  # Deletions and archivals are dropped after this
+    'SETTLE_SECONDS': 10,  # Readers wait this long for a gap in the sequence to fill
+    'MAX_LIMIT': 1000,  # Entries per /api/changes/ request
+}
+
+# Request tracing and sampling profiler (see events/profiling.py)
+PROFILING = {
+    'ENABLED': os.environ.get('DJANGO_PROFILING', '0') == '1',  # Off: one settings lookup per request
+    'SERVER_TIMING': True,  # Send span timings in a Server-Timing header
+    'SAMPLE_RATE': float(os.environ.get('DJANGO_PROFILE_SAMPLE_RATE', 0)),  # Share of requests profiled
+    'HEADER': 'X-Profile',  # Staff users send "X-Profile: 1" to profile a request
+    'INTERVAL': 0.005,  # Seconds between stack samples
+    'MAX_SECONDS': 30,  # Sampling stops after this long
+    'MAX_CONCURRENT_PROFILES': 1,  # Profiles per process at once; other requests are only traced
+    'MAX_DEPTH': 128,  # Frames kept per stack
+    'PROFILE_DIR': BASE_DIR / 'profiles',  # Collapsed-stack .folded files
+    'CACHE_ALIAS': 'default',
+    'STATS_FLUSH_EVERY': 100,  # Requests between per-endpoint stats flushes
+}
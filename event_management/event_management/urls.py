@@ -16,23 +16,18 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from events.views import EventViewSet, RSVPViewSet, ReviewViewSet, RegisterView
-from events.api_views import home, api_root
-
-# Create a router and register our viewsets
-router = DefaultRouter()
-router.register(r'events', EventViewSet, basename='events')
-router.register(r'rsvps', RSVPViewSet, basename='rsvps')
-router.register(r'reviews', ReviewViewSet, basename='reviews')
+from rest_framework_simplejwt.views import TokenRefreshView
+from events.api_views import home, api_root, event_live, register, login, healthz, readyz
 
 urlpatterns = [
     path('', home, name='home'),
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
     path('admin/', admin.site.urls),
     path('api/', api_root, name='api-root'),
-    path('api/', include(router.urls)),
-    path('api/auth/register/', RegisterView.as_view(), name='register'),
-    path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/events/<int:pk>/live/', event_live, name='event-live'),
+    path('api/', include('events.urls')),
+    path('api/auth/register/', register, name='register'),
+    path('api/auth/login/', login, name='token_obtain_pair'),
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
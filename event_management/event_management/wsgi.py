@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
 
 application = get_wsgi_application()
+
+# Load everything the first request would, before a preloading server forks workers
+from django.conf import settings  # noqa: E402
+if settings.WARM_UP_ON_START:
+    from events.startup import warm_up
+    warm_up()
@@ -1,34 +1,143 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import UserProfile, Event, RSVP, Review
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import UserProfile, Event, RSVP, Review, WebhookSubscription, WebhookOutbox
+from . import analytics, changelog
+
+
+def estimated_row_count(queryset):
+    """
+    Planner estimate of a table's row count, or None where the database
+    does not expose one. Only PostgreSQL is supported.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that avoids a full COUNT(*) on large tables.
+
+    Unfiltered changelists use the planner estimate when it exceeds
+    ADMIN_COUNT_LIMIT. Everything else counts at most ADMIN_COUNT_LIMIT
+    rows, so pages past the limit are reachable only by filtering further.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables that grow into the millions of rows.
+    Subclasses search by title prefix ('^', served on PostgreSQL by the
+    UPPER(title) text_pattern_ops index of migration 0012) and by exact,
+    case-sensitive username, which uses the unique index on username.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def update_action(field, value, description, before_update=None):
+    """
+    Admin action setting `field` to `value` on the selected rows with a
+    single UPDATE. Like QuerySet.update(), it sends no model signals, so
+    webhooks and live updates are not triggered; the change log records
+    the updated rows. `before_update(queryset, value)` runs first in the
+    same transaction.
+    """
+    def action(modeladmin, request, queryset):
+        with transaction.atomic():
+            if before_update:
+                before_update(queryset, value)
+            pks = list(queryset.order_by().values_list('pk', flat=True))
+            updated = queryset.order_by().update(**{field: value, 'updated_at': timezone.now()})
+            changelog.record_updated(modeladmin.model, pks)
+        modeladmin.message_user(request, f'{updated} {modeladmin.model._meta.verbose_name_plural} updated.')
+
+    action.__name__ = f'set_{field}_{value}'.lower()
+    return admin.action(description=description)(action)
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     """Admin interface for UserProfile model."""
     list_display = ['user', 'full_name', 'location']
+    list_select_related = ['user']
     search_fields = ['user__username', 'full_name', 'location']
+    autocomplete_fields = ['user']
 
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(LargeTableAdmin):
     """Admin interface for Event model."""
     list_display = ['title', 'organizer', 'location', 'start_time', 'is_public', 'created_at']
+    list_select_related = ['organizer']
     list_filter = ['is_public', 'created_at', 'start_time']
-    search_fields = ['title', 'description', 'location', 'organizer__username']
-    date_hierarchy = 'start_time'
+    search_fields = ['^title', '^location', 'organizer__username__exact']
+    autocomplete_fields = ['organizer']
+    actions = [
+        update_action('is_public', True, 'Make selected events public'),
+        update_action('is_public', False, 'Make selected events private'),
+    ]
 
 
 @admin.register(RSVP)
-class RSVPAdmin(admin.ModelAdmin):
+class RSVPAdmin(LargeTableAdmin):
     """Admin interface for RSVP model."""
     list_display = ['event', 'user', 'status', 'created_at']
+    list_select_related = ['event', 'user']
     list_filter = ['status', 'created_at']
-    search_fields = ['event__title', 'user__username']
+    search_fields = ['^event__title', 'user__username__exact']
+    autocomplete_fields = ['event', 'user']
+    actions = [
+        update_action('status', status, f'Mark selected RSVPs as "{label}"', analytics.track_status_update)
+        for status, label in RSVP.STATUS_CHOICES
+    ]
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     """Admin interface for Review model."""
     list_display = ['event', 'user', 'rating', 'created_at']
+    list_select_related = ['event', 'user']
     list_filter = ['rating', 'created_at']
-    search_fields = ['event__title', 'user__username', 'comment']
+    search_fields = ['^event__title', 'user__username__exact']
+    autocomplete_fields = ['event', 'user']
+
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    """Admin interface for WebhookSubscription model."""
+    list_display = ['url', 'organizer', 'is_active', 'max_concurrency', 'created_at']
+    list_select_related = ['organizer']
+    list_filter = ['is_active']
+    search_fields = ['url', 'organizer__username']
+    autocomplete_fields = ['organizer']
+
+
+@admin.register(WebhookOutbox)
+class WebhookOutboxAdmin(LargeTableAdmin):
+    """Admin interface for WebhookOutbox model."""
+    list_display = ['event_type', 'subscription', 'attempts', 'next_attempt_at', 'delivered_at']
+    list_select_related = ['subscription']
+    list_filter = ['event_type', 'delivered_at']
+    raw_id_fields = ['subscription']
@@ -0,0 +1,319 @@
+"""
+Organizer analytics from time-bucketed rollup tables.
+
+Every RSVP/review write adds its net effect to the event's row in
+HourlyEventStats for the current UTC hour (see signals.py), in the same
+transaction as the write. `compact_analytics` folds whole days older than
+ANALYTICS['HOURLY_RETENTION_DAYS'] into DailyEventStats, and
+`rebuild_analytics` recomputes both tables from the RSVP/review rows
+(including archived ones) for backfills.
+
+Counters are net changes: a status change moves one RSVP between status
+counters in the bucket where it happened, and a deletion is subtracted
+where it happened. `new_rsvps` only ever counts creations. A rebuild
+cannot replay history, so it attributes each current row to the bucket
+of its created_at; totals are the same either way.
+
+Writes that bypass signals (bulk_create(), QuerySet.update()) are not
+counted, except for the RSVP status actions in the admin.
+"""
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import (
+    Event, RSVP, Review, ArchivedEvent, ArchivedRSVP, ArchivedReview,
+    HourlyEventStats, DailyEventStats
+)
+from .projections import to_datetime
+from .sharding import fan_out
+
+
+DEFAULTS = {
+    'HOURLY_RETENTION_DAYS': 14,
+    'MAX_BUCKETS': 1000,
+}
+
+COUNTERS = ('new_rsvps', 'going', 'maybe', 'not_going', 'reviews', 'rating_sum')
+STATUS_COUNTERS = {RSVP.GOING: 'going', RSVP.MAYBE: 'maybe', RSVP.NOT_GOING: 'not_going'}
+GRANULARITIES = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+# Buckets shown when a request gives no start
+DEFAULT_BUCKETS = {'hour': 48, 'day': 30}
+
+
+def analytics_setting(name):
+    """Read an ANALYTICS setting, falling back to the module default."""
+    return getattr(settings, 'ANALYTICS', {}).get(name, DEFAULTS[name])
+
+
+def hour_bucket(value):
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(value):
+    return hour_bucket(value).replace(hour=0)
+
+
+def hourly_horizon(now=None):
+    """Start of the oldest day still kept at hourly resolution."""
+    return day_bucket(now or timezone.now()) - timedelta(days=analytics_setting('HOURLY_RETENTION_DAYS'))
+
+
+# Incremental maintenance
+
+def state(instance):
+    """
+    (event_id, counters) contributed by an RSVP or review as loaded, or
+    None if the fields are deferred.
+    """
+    values = instance.__dict__
+    if isinstance(instance, RSVP):
+        if 'event_id' not in values or 'status' not in values:
+            return None
+        return values['event_id'], {STATUS_COUNTERS[values['status']]: 1}
+    if 'event_id' not in values or 'rating' not in values:
+        return None
+    return values['event_id'], {'reviews': 1, 'rating_sum': values['rating']}
+
+
+def stored_state(instance):
+    """state() of the row as currently stored in the database."""
+    stored = type(instance).objects.using(instance._state.db).filter(pk=instance.pk).first()
+    return state(stored) if stored is not None else None
+
+
+def track(instance, previous, current, created=False):
+    """
+    Record the difference between two states of an RSVP or review
+    (None for "did not exist") in the current hourly bucket.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    if previous is not None:
+        for name, value in previous[1].items():
+            deltas[previous[0]][name] -= value
+    if current is not None:
+        for name, value in current[1].items():
+            deltas[current[0]][name] += value
+        if created and isinstance(instance, RSVP):
+            deltas[current[0]]['new_rsvps'] += 1
+
+    # Avoid a lookup of the organizer when the event is already loaded
+    organizer_id = None
+    if type(instance).event.is_cached(instance):
+        organizer_id = instance.event.organizer_id
+    for event_id, counters in deltas.items():
+        record(event_id, organizer_id if event_id == instance.event_id else None, **counters)
+
+
+def track_status_update(queryset, status):
+    """Record a bulk status change of RSVPs, which sends no signals."""
+    changes = (
+        queryset.exclude(status=status).order_by()
+        .values('event_id', 'status').annotate(count=Count('pk'))
+    )
+    deltas = defaultdict(lambda: defaultdict(int))
+    for row in changes:
+        deltas[row['event_id']][STATUS_COUNTERS[row['status']]] -= row['count']
+        deltas[row['event_id']][STATUS_COUNTERS[status]] += row['count']
+    for event_id, counters in deltas.items():
+        record(event_id, **counters)
+
+
+def record(event_id, organizer_id=None, when=None, **deltas):
+    """
+    Add counter deltas to an event's hourly row with a single UPDATE,
+    creating the row for the first write of the hour.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    bucket = hour_bucket(when or timezone.now())
+    rows = HourlyEventStats.objects.filter(event_id=event_id, bucket=bucket)
+    changes = {name: F(name) + value for name, value in deltas.items()}
+    if rows.update(**changes):
+        return
+
+    if organizer_id is None:
+        organizer_id = Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).first()
+        if organizer_id is None:
+            return
+    try:
+        with transaction.atomic():
+            HourlyEventStats.objects.create(event_id=event_id, organizer_id=organizer_id, bucket=bucket, **deltas)
+    except IntegrityError:
+        # Another write created the row first
+        rows.update(**changes)
+
+
+# Reading
+
+def _sums():
+    # Aliased: an annotation cannot reuse a model field's name
+    return {f'sum_{name}': Sum(name) for name in COUNTERS}
+
+
+def _represent(values):
+    data = {name: values.get(name) or 0 for name in COUNTERS if name != 'rating_sum'}
+    data['average_rating'] = round(values['rating_sum'] / values['reviews'], 2) if data['reviews'] else None
+    return data
+
+
+def report(filters, start, end, granularity='day'):
+    """
+    Totals and per-bucket activity of the rollup rows matching `filters`
+    (e.g. {'event_id': 1} or {'organizer': user}). Totals cover all time;
+    buckets cover [start, end) and omit buckets without activity.
+    """
+    hourly = HourlyEventStats.objects.filter(**filters).order_by()
+    daily = DailyEventStats.objects.filter(**filters).order_by()
+
+    totals = defaultdict(int)
+    for queryset in (hourly, daily):
+        sums = queryset.aggregate(**_sums())
+        for name in COUNTERS:
+            totals[name] += sums[f'sum_{name}'] or 0
+
+    buckets = defaultdict(lambda: defaultdict(int))
+    hourly = hourly.filter(bucket__gte=start, bucket__lt=end)
+    if granularity == 'hour':
+        sources = [hourly.values(slot=F('bucket'))]
+    else:
+        # Days not yet compacted are summed from their hourly rows
+        sources = [
+            daily.filter(bucket__gte=start, bucket__lt=end).values(slot=F('bucket')),
+            hourly.values(slot=TruncDay('bucket', tzinfo=dt_timezone.utc)),
+        ]
+    for queryset in sources:
+        for row in queryset.annotate(**_sums()):
+            for name in COUNTERS:
+                buckets[row['slot']][name] += row[f'sum_{name}'] or 0
+
+    return {
+        'granularity': granularity,
+        'start': to_datetime(start),
+        'end': to_datetime(end),
+        'totals': {
+            'rsvps': totals['going'] + totals['maybe'] + totals['not_going'],
+            **_represent(totals),
+        },
+        'buckets': [{'bucket': to_datetime(key), **_represent(buckets[key])} for key in sorted(buckets)],
+    }
+
+
+# Compaction and rebuild
+
+def compact(now=None, progress=None):
+    """
+    Fold hourly rows of whole days before the hourly horizon into the daily
+    table, one day per transaction. Returns (hourly rows folded, days).
+    """
+    horizon = hourly_horizon(now)
+    folded = days = 0
+    while True:
+        with transaction.atomic():
+            oldest = (
+                HourlyEventStats.objects.filter(bucket__lt=horizon)
+                .order_by('bucket').values_list('bucket', flat=True).first()
+            )
+            if oldest is None:
+                return folded, days
+            day = day_bucket(oldest)
+            hours = HourlyEventStats.objects.filter(bucket__gte=day, bucket__lt=day + timedelta(days=1))
+            sums = list(hours.order_by().values('event_id', 'organizer_id').annotate(**_sums()))
+            existing = {row.event_id: row for row in DailyEventStats.objects.filter(bucket=day)}
+
+            updated, created = [], []
+            for row in sums:
+                target = existing.get(row['event_id'])
+                if target is None:
+                    created.append(DailyEventStats(
+                        event_id=row['event_id'], organizer_id=row['organizer_id'], bucket=day,
+                        **{name: row[f'sum_{name}'] or 0 for name in COUNTERS}
+                    ))
+                    continue
+                for name in COUNTERS:
+                    setattr(target, name, getattr(target, name) + (row[f'sum_{name}'] or 0))
+                updated.append(target)
+            DailyEventStats.objects.bulk_create(created, batch_size=1000)
+            DailyEventStats.objects.bulk_update(updated, COUNTERS, batch_size=1000)
+            count, _ = hours.delete()
+        folded += count
+        days += 1
+        if progress:
+            progress(day, count)
+
+
+def _aggregate(queryset, trunc, counters):
+    return (
+        queryset.order_by()
+        .annotate(slot=trunc('created_at', tzinfo=dt_timezone.utc))
+        .values('event_id', 'slot')
+        .annotate(**counters)
+    )
+
+
+RSVP_COUNTERS = {
+    'new_rsvps': Count('pk'),
+    **{name: Count('pk', filter=Q(status=status)) for status, name in STATUS_COUNTERS.items()},
+}
+REVIEW_COUNTERS = {'reviews': Count('pk'), 'rating_sum': Sum('rating')}
+
+# (event model, rsvp model, review model) read by rebuild()
+SOURCES = ((Event, RSVP, Review), (ArchivedEvent, ArchivedRSVP, ArchivedReview))
+
+
+def rebuild(batch_size=1000, now=None, progress=None):
+    """
+    Recompute both rollup tables from RSVP and review rows, hot and
+    archived, for `batch_size` consecutive event ids per transaction.
+    Rows before the hourly horizon go straight to the daily table.
+    Writes to events in the batch being rebuilt may be counted twice or
+    not at all; run it while the API is quiet. Returns rollup rows written.
+    """
+    horizon = hourly_horizon(now)
+    bounds = [
+        model.objects.aggregate(low=models.Min('id'), high=models.Max('id'))
+        for model, _, _ in SOURCES
+    ]
+    lows = [bound['low'] for bound in bounds if bound['low'] is not None]
+    if not lows:
+        return 0
+    low, high = min(lows), max(bound['high'] for bound in bounds if bound['high'] is not None)
+
+    written = 0
+    for first in range(low, high + 1, batch_size):
+        ids = {'event_id__gte': first, 'event_id__lt': first + batch_size}
+        with transaction.atomic():
+            HourlyEventStats.objects.filter(**ids).delete()
+            DailyEventStats.objects.filter(**ids).delete()
+            for model, trunc, period in (
+                (HourlyEventStats, TruncHour, Q(created_at__gte=horizon)),
+                (DailyEventStats, TruncDay, Q(created_at__lt=horizon)),
+            ):
+                rows = defaultdict(lambda: defaultdict(int))
+                organizers = {}
+                for event_model, rsvp_model, review_model in SOURCES:
+                    organizers.update(
+                        event_model.objects.filter(id__gte=first, id__lt=first + batch_size)
+                        .values_list('id', 'organizer_id')
+                    )
+                    for source, counters in ((rsvp_model, RSVP_COUNTERS), (review_model, REVIEW_COUNTERS)):
+                        queryset = _aggregate(source.objects.filter(period, **ids), trunc, counters)
+                        # Hot rows are spread over the shards, archived ones are not
+                        for queryset in fan_out(queryset) if source in (RSVP, Review) else [queryset]:
+                            for row in queryset:
+                                for name in counters:
+                                    rows[row['event_id'], row['slot']][name] += row[name] or 0
+                model.objects.bulk_create([
+                    model(event_id=event_id, organizer_id=organizers[event_id], bucket=slot, **counters)
+                    for (event_id, slot), counters in rows.items()
+                ], batch_size=1000)
+                written += len(rows)
+        if progress:
+            progress(min(first + batch_size - 1, high), high, written)
+    return written
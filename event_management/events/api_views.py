@@ -1,7 +1,121 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import iri_to_uri
+from functools import lru_cache
+from types import SimpleNamespace
+import json
+import logging
+import threading
+import time
+
+from .models import Event
+from .serializers import RegisterSerializer
+from .throttling import IPTokenBucketThrottle
+from . import hashers, live, sharding
+
+
+logger = logging.getLogger(__name__)
+
+
+# Discovery documents with relative links; absolute URLs are filled in once
+# per scheme/host by _discovery()
+API_ROOT = {
+    'message': 'Welcome to Event Management System API',
+    'version': '1.0',
+    'endpoints': {
+        'authentication': {
+            'register': '/api/auth/register/',
+            'login': '/api/auth/login/',
+            'refresh_token': '/api/auth/token/refresh/',
+        },
+        'events': {
+            'list_create': '/api/events/',
+            'detail': '/api/events/{id}/',
+            'search': '/api/events/?search=keyword',
+            'filter': '/api/events/?location=New York',
+        },
+        'rsvps': {
+            'list_create': '/api/rsvps/',
+            'detail': '/api/rsvps/{id}/',
+        },
+        'reviews': {
+            'list_create': '/api/reviews/',
+            'detail': '/api/reviews/{id}/',
+            'filter_by_event': '/api/reviews/?event={event_id}',
+        },
+        'analytics': {
+            'event': '/api/events/{id}/analytics/',
+            'organizer': '/api/me/analytics/',
+        },
+        'changes': '/api/changes/?after={seq}&limit={limit}',
+        'admin': '/admin/',
+    },
+    'documentation': {
+        'quick_start': 'See README.md for setup instructions',
+        'api_testing': 'See API_TESTING_GUIDE.md for testing examples',
+        'quick_reference': 'See QUICK_REFERENCE.md for quick reference',
+    },
+    'features': [
+        'JWT Authentication',
+        'Event Management (CRUD)',
+        'RSVP System',
+        'Review System',
+        'Public/Private Events',
+        'Search & Filtering',
+        'Pagination',
+    ]
+}
+
+HOME = {
+    'message': 'Event Management System API',
+    'version': '1.0',
+    'status': 'Running',
+    'api_root': '/api/',
+    'documentation': {
+        'swagger': 'Install drf-spectacular for auto-generated API docs',
+        'readme': 'See README.md in project root',
+    },
+    'quick_links': {
+        'register': '/api/auth/register/',
+        'login': '/api/auth/login/',
+        'events': '/api/events/',
+        'admin': '/admin/',
+    }
+}
+
+# Keys whose values are documentation text rather than links
+TEXT_KEYS = {'message', 'version', 'status', 'documentation', 'features'}
+
+DISCOVERY_MAX_AGE = 300
+
+
+def _absolute(value, base):
+    if isinstance(value, dict):
+        return {key: item if key in TEXT_KEYS else _absolute(item, base) for key, item in value.items()}
+    return iri_to_uri(base + value)
+
+
+@lru_cache(maxsize=64)
+def _discovery(name, base):
+    """Discovery document with absolute links for one scheme://host, built once."""
+    return _absolute({'api_root': API_ROOT, 'home': HOME}[name], base)
+
+
+def _discovery_response(request, name):
+    # get_host() validates against ALLOWED_HOSTS, which bounds the cache keys
+    response = Response(_discovery(name, f'{request.scheme}://{request.get_host()}'))
+    patch_cache_control(response, public=True, max_age=DISCOVERY_MAX_AGE)
+    patch_vary_headers(response, ['Host'])
+    return response
 
 
 @api_view(['GET'])
@@ -10,47 +124,7 @@ def api_root(request):
     """
     API Root endpoint - Welcome page with available endpoints.
     """
-    return Response({
-        'message': 'Welcome to Event Management System API',
-        'version': '1.0',
-        'endpoints': {
-            'authentication': {
-                'register': request.build_absolute_uri('/api/auth/register/'),
-                'login': request.build_absolute_uri('/api/auth/login/'),
-                'refresh_token': request.build_absolute_uri('/api/auth/token/refresh/'),
-            },
-            'events': {
-                'list_create': request.build_absolute_uri('/api/events/'),
-                'detail': request.build_absolute_uri('/api/events/{id}/'),
-                'search': request.build_absolute_uri('/api/events/?search=keyword'),
-                'filter': request.build_absolute_uri('/api/events/?location=New York'),
-            },
-            'rsvps': {
-                'list_create': request.build_absolute_uri('/api/rsvps/'),
-                'detail': request.build_absolute_uri('/api/rsvps/{id}/'),
-            },
-            'reviews': {
-                'list_create': request.build_absolute_uri('/api/reviews/'),
-                'detail': request.build_absolute_uri('/api/reviews/{id}/'),
-                'filter_by_event': request.build_absolute_uri('/api/reviews/?event={event_id}'),
-            },
-            'admin': request.build_absolute_uri('/admin/'),
-        },
-        'documentation': {
-            'quick_start': 'See README.md for setup instructions',
-            'api_testing': 'See API_TESTING_GUIDE.md for testing examples',
-            'quick_reference': 'See QUICK_REFERENCE.md for quick reference',
-        },
-        'features': [
-            'JWT Authentication',
-            'Event Management (CRUD)',
-            'RSVP System',
-            'Review System',
-            'Public/Private Events',
-            'Search & Filtering',
-            'Pagination',
-        ]
-    })
+    return _discovery_response(request, 'api_root')
 
 
 @api_view(['GET'])
@@ -59,19 +133,196 @@ def home(request):
     """
     Home page - Redirects to API root.
     """
-    return Response({
-        'message': 'Event Management System API',
-        'version': '1.0',
-        'status': 'Running',
-        'api_root': request.build_absolute_uri('/api/'),
-        'documentation': {
-            'swagger': 'Install drf-spectacular for auto-generated API docs',
-            'readme': 'See README.md in project root',
+    return _discovery_response(request, 'home')
+
+
+def healthz(request):
+    """Liveness check: the process is serving requests. Never touches the database."""
+    response = JsonResponse({'status': 'ok'})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class _ReadinessProbe:
+    """
+    Connectivity check of the default database and every RSVP/review shard,
+    cached for READINESS_CACHE_TTL seconds per process.
+    """
+
+    def __init__(self):
+        self._result = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def check(self):
+        ttl = getattr(settings, 'READINESS_CACHE_TTL', 2.0)
+        with self._lock:
+            if time.monotonic() - self._checked_at >= ttl:
+                self._result = self._probe()
+                self._checked_at = time.monotonic()
+            return self._result
+
+    def _probe(self):
+        for alias in dict.fromkeys([DEFAULT_DB_ALIAS, *sharding.shards()]):
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            except DatabaseError:
+                # The error text can name hosts and users; keep it out of the public response
+                logger.warning('Readiness probe of database %r failed', alias, exc_info=True)
+                return 'unavailable'
+        return None
+
+    def reset(self):
+        with self._lock:
+            self._result = None
+            self._checked_at = float('-inf')
+
+
+readiness = _ReadinessProbe()
+
+
+def readyz(request):
+    """Readiness check: the database is reachable (probe result is cached briefly)."""
+    error = readiness.check()
+    if error is None:
+        response = JsonResponse({'status': 'ok', 'database': 'ok'})
+    else:
+        response = JsonResponse({'status': 'unavailable', 'database': error}, status=503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _authenticate(request):
+    """Resolve the JWT user for a plain Django request, or None if anonymous."""
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+async def event_live(request, pk):
+    """
+    Server-Sent Events stream of RSVP count and rating changes for an event.
+    Sends the current figures on connect, then at most one update per
+    coalesce interval while the event keeps changing.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+    event = await Event.objects.filter(pk=pk).only('id', 'is_public', 'organizer_id').afirst()
+    if event is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    if not event.is_public:
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=401)
+        if user is None or user.pk != event.organizer_id:
+            return JsonResponse(
+                {'detail': 'You do not have permission to view this private event.'},
+                status=403
+            )
+
+    response = StreamingHttpResponse(live.stream(event.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _request_data(request):
+    """
+    Parse a JSON or form-encoded request body into a mapping of strings.
+    Returns (data, None), or (None, a 400 response).
+    """
+    if request.content_type != 'application/json':
+        return request.POST, None
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None, JsonResponse({'detail': 'JSON parse error.'}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({'detail': 'Expected a JSON object.'}, status=400)
+    errors = {field: ['Not a valid string.'] for field, value in data.items() if not isinstance(value, str)}
+    if errors:
+        return None, JsonResponse(errors, status=400)
+    return data, None
+
+
+def _throttled(request, scope):
+    """Apply the per-IP token bucket for scope; return a 429 response or None."""
+    throttle = IPTokenBucketThrottle()
+    if throttle.allow_request(request, SimpleNamespace(throttle_scope=scope)):
+        return None
+    wait = throttle.wait()
+    response = JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {int(wait) + 1} seconds.'},
+        status=429
+    )
+    response['Retry-After'] = str(int(wait) + 1)
+    return response
+
+
+def _post_only(request):
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    return None
+
+
+async def register(request):
+    """
+    Register a new user.
+    Password hashing runs in the bounded hashing pool so it never blocks
+    the event loop serving other requests.
+    """
+    error = _post_only(request) or _throttled(request, 'register')
+    if error:
+        return error
+    data, error = _request_data(request)
+    if error:
+        return error
+
+    serializer = RegisterSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    password_hash = await hashers.hash_password(serializer.validated_data['password'])
+    user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    return JsonResponse({
+        'user': {
+            'username': user.username,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
         },
-        'quick_links': {
-            'register': request.build_absolute_uri('/api/auth/register/'),
-            'login': request.build_absolute_uri('/api/auth/login/'),
-            'events': request.build_absolute_uri('/api/events/'),
-            'admin': request.build_absolute_uri('/admin/'),
-        }
-    })
+        'message': 'User registered successfully. Please login to get your token.'
+    }, status=201)
+
+
+async def login(request):
+    """
+    Obtain a JWT access/refresh pair.
+    Validates with simplejwt's TokenObtainPairSerializer, so credentials go
+    through authenticate() and AUTHENTICATION_BACKENDS, in the hashing
+    pool. ModelBackend re-encodes outdated hashes on success.
+    """
+    error = _post_only(request) or _throttled(request, 'login')
+    if error:
+        return error
+    data, error = _request_data(request)
+    if error:
+        return error
+
+    serializer = TokenObtainPairSerializer(data=data, context={'request': request})
+    try:
+        is_valid = await hashers.run_in_pool(serializer.is_valid)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=401)
+    if not is_valid:
+        return JsonResponse(serializer.errors, status=400)
+    return JsonResponse(serializer.validated_data)
+
+
+# Plain Django views are not CSRF exempt by default; these use JWT, not sessions.
+register.csrf_exempt = True
+login.csrf_exempt = True
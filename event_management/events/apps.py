@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+        # Install the query hooks on connections as they connect
+        from . import middleware, profiling  # noqa: F401
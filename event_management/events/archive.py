@@ -0,0 +1,106 @@
+"""
+Archival of finished events.
+
+archive_batch() moves one batch of events that ended before a cutoff,
+together with their RSVPs and reviews, into the Archived* tables in a
+single transaction. Each batch commits on its own, so an interrupted run
+simply resumes with the events still left in the hot tables. Each
+archived event gets an 'archived' entry in the change log.
+
+Recurring series and their stored occurrences stay in the hot tables:
+a series' end_time only covers its first occurrence, and archiving a
+stored occurrence would let its virtual counterpart reappear.
+
+RSVPs and reviews are read from each event's shard (see events.sharding).
+Rows on a shard other than 'default' are deleted inside the batch but
+commit on their own connection, just before the batch does.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .changelog import record_archived
+from .models import Event, RSVP, Review, ArchivedEvent, ArchivedRSVP, ArchivedReview
+from .sharding import group_by_shard
+
+
+EVENT_FIELDS = (
+    'id', 'title', 'description', 'organizer_id', 'location', 'start_time', 'end_time',
+    'is_public', 'created_at', 'updated_at'
+)
+RSVP_FIELDS = ('id', 'event_id', 'user_id', 'status', 'created_at', 'updated_at')
+REVIEW_FIELDS = ('id', 'event_id', 'user_id', 'rating', 'comment', 'created_at', 'updated_at')
+
+
+def _copy(source_queryset, target_model, fields, chunk_size, using=DEFAULT_DB_ALIAS):
+    rows = source_queryset.order_by().values(*fields).iterator(chunk_size=chunk_size)
+    batch = []
+    copied = 0
+    for row in rows:
+        batch.append(target_model(**row))
+        if len(batch) >= chunk_size:
+            target_model.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+            copied += len(batch)
+            batch = []
+    if batch:
+        target_model.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+        copied += len(batch)
+    return copied
+
+
+def _delete_rows(model, event_ids, using=DEFAULT_DB_ALIAS, column='event_id'):
+    """
+    Delete rows with a plain DELETE. Archiving is not a user-visible delete,
+    so per-row delete signals (webhooks, live updates, the change log) must
+    not fire.
+    """
+    connection = connections[using]
+    placeholders = ', '.join(['%s'] * len(event_ids))
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', list(event_ids))
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Archive up to batch_size events that ended before cutoff.
+    Returns (events, rsvps, reviews) moved; (0, 0, 0) when nothing is left.
+    """
+    with transaction.atomic():
+        event_ids = list(
+            Event.objects.filter(end_time__lt=cutoff, recurrence='', series__isnull=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not event_ids:
+            return 0, 0, 0
+
+        events = _copy(Event.objects.filter(id__in=event_ids), ArchivedEvent, EVENT_FIELDS, batch_size)
+        rsvps = reviews = 0
+        shards = group_by_shard(event_ids)
+        for alias, ids in shards.items():
+            rsvps += _copy(RSVP.objects.using(alias).filter(event_id__in=ids), ArchivedRSVP, RSVP_FIELDS, batch_size)
+            reviews += _copy(
+                Review.objects.using(alias).filter(event_id__in=ids), ArchivedReview, REVIEW_FIELDS, batch_size
+            )
+
+        for alias, ids in shards.items():
+            _delete_rows(RSVP, ids, using=alias)
+            _delete_rows(Review, ids, using=alias)
+        _delete_rows(Event, event_ids, column='id')
+        record_archived(event_ids)
+    return events, rsvps, reviews
+
+
+def archive_events(cutoff, batch_size=500, max_batches=None, progress=None):
+    """Archive batches until no finished events remain (or max_batches is hit)."""
+    totals = [0, 0, 0]
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved[0]:
+            break
+        batches += 1
+        totals = [total + count for total, count in zip(totals, moved)]
+        if progress:
+            progress(batches, *totals)
+    return tuple(totals)
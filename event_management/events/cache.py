@@ -0,0 +1,208 @@
+"""
+Two-tier cache of user display data (username, email, names).
+
+Lookups check a size-bounded in-process LRU first, then a Django cache
+backend shared between processes, and finally load all remaining misses
+from the database in one query. Entries are keyed by user id and a
+version number; bump USER_CACHE['VERSION'] to drop every entry at once.
+
+User/UserProfile post_save and post_delete signals invalidate an entry in
+both tiers, once right away and again when the write commits, since a
+concurrent read before the commit can cache the old row again. Other
+processes may keep serving their local copy for up to
+USER_CACHE['LOCAL_TTL'] seconds. Bulk writes that skip signals
+(QuerySet.update(), bulk_create()) are not seen until entries expire.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'VERSION': 1,
+    'LOCAL_MAX_SIZE': 5000,
+    'LOCAL_TTL': 30,
+    'TIMEOUT': 3600,
+    'STATS_FLUSH_EVERY': 100,
+}
+
+STAT_NAMES = ('local_hits', 'shared_hits', 'misses')
+
+
+def cache_setting(name):
+    """Read a USER_CACHE setting, falling back to the module default."""
+    return getattr(settings, 'USER_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def display_name(entry):
+    """Profile full name, then first/last name, then username."""
+    if entry['full_name']:
+        return entry['full_name']
+    full_name = f"{entry['first_name']} {entry['last_name']}".strip()
+    return full_name or entry['username']
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU with a per-entry TTL."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache:
+    """In-process LRU in front of a shared cache backend, keyed by user id."""
+
+    def __init__(self):
+        self.local = LRUCache(cache_setting('LOCAL_MAX_SIZE'), cache_setting('LOCAL_TTL'))
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[cache_setting('CACHE_ALIAS')]
+
+    def key(self, user_id):
+        return f"user:v{cache_setting('VERSION')}:{user_id}"
+
+    def get(self, user_id):
+        """Return the cached entry for one user, or None if the user does not exist."""
+        return self.get_many([user_id]).get(user_id)
+
+    def get_many(self, user_ids):
+        """Return {user_id: entry} for every existing user, filling both tiers in bulk."""
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            entry = self.local.get(user_id)
+            if entry is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = entry
+        local_hits = len(found)
+
+        shared_hits = 0
+        if missing:
+            keys = {self.key(user_id): user_id for user_id in missing}
+            for key, entry in self.backend.get_many(keys).items():
+                found[keys[key]] = entry
+                self.local.set(keys[key], entry)
+                shared_hits += 1
+            missing = [user_id for user_id in missing if user_id not in found]
+
+        if missing:
+            loaded = self.load(missing)
+            if loaded:
+                self.backend.set_many(
+                    {self.key(user_id): entry for user_id, entry in loaded.items()},
+                    timeout=cache_setting('TIMEOUT'),
+                )
+            for user_id, entry in loaded.items():
+                self.local.set(user_id, entry)
+            found.update(loaded)
+
+        self.record(local_hits, shared_hits, len(missing))
+        return found
+
+    def load(self, user_ids):
+        rows = User.objects.filter(pk__in=user_ids).values(
+            'id', 'username', 'email', 'first_name', 'last_name', 'profile__full_name'
+        )
+        return {
+            row['id']: {
+                'username': row['username'],
+                'email': row['email'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'full_name': row['profile__full_name'] or '',
+            }
+            for row in rows
+        }
+
+    def invalidate(self, user_id):
+        self.local.delete(user_id)
+        self.backend.delete(self.key(user_id))
+
+    def invalidate_on_commit(self, user_id, using=None):
+        """Invalidate now, and again once the current transaction commits."""
+        self.invalidate(user_id)
+        transaction.on_commit(lambda: self.invalidate(user_id), using=using)
+
+    def record(self, local_hits, shared_hits, misses):
+        """Count lookups locally and flush the totals to the backend periodically."""
+        with self._lock:
+            self.stats['local_hits'] += local_hits
+            self.stats['shared_hits'] += shared_hits
+            self.stats['misses'] += misses
+            self._pending += local_hits + shared_hits + misses
+            if self._pending < cache_setting('STATS_FLUSH_EVERY'):
+                return
+            self._pending = 0
+            counts, self.stats = self.stats, dict.fromkeys(STAT_NAMES, 0)
+        self.flush_stats(counts)
+
+    def flush_stats(self, counts=None):
+        if counts is None:
+            with self._lock:
+                counts, self.stats = self.stats, dict.fromkeys(STAT_NAMES, 0)
+                self._pending = 0
+        backend = self.backend
+        for name, value in counts.items():
+            if value:
+                key = f'user-cache-stats:{name}'
+                backend.add(key, 0, timeout=None)
+                backend.incr(key, value)
+
+    def shared_stats(self):
+        """Counters flushed to the shared backend by every process."""
+        keys = {f'user-cache-stats:{name}': name for name in STAT_NAMES}
+        values = self.backend.get_many(keys)
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = dict.fromkeys(STAT_NAMES, 0)
+            self._pending = 0
+        self.backend.delete_many([f'user-cache-stats:{name}' for name in STAT_NAMES])
+
+
+user_cache = UserCache()
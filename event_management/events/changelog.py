@@ -0,0 +1,153 @@
+"""
+Change data capture for events, RSVPs and reviews.
+
+Every create, update and delete of an Event, RSVP or Review appends a
+ChangeLogEntry in the write's transaction (see signals.py), so the log
+and the tables never disagree. Consumers such as search indexing, cache
+warmers and analytics read the log in `seq` order from a cursor with
+`GET /api/changes/?after=<seq>` or `manage.py tail_changes`, and only
+process what changed.
+
+A sequence number is taken on insert but only becomes visible on commit,
+so a transaction can commit a smaller seq after a larger one was read.
+read() therefore stops before a gap in the sequence until the entry after
+it is CHANGES['SETTLE_SECONDS'] old; gaps left by rolled back transactions
+are passed after that. SQLite serializes writers and leaves no such gaps.
+
+`compact_changes` keeps the table bounded. Entries older than
+CHANGES['RETENTION_DAYS'] are dropped once a later entry exists for the
+same object, and deletions and archivals older than
+CHANGES['TOMBSTONE_RETENTION_DAYS'] are dropped altogether. A consumer
+further behind than the retention may skip intermediate changes but still
+sees every object's latest one; one further behind than the tombstone
+retention should resync from the list endpoints.
+
+Archiving logs one 'archived' entry per event; the RSVPs and reviews that
+move with it are not logged one by one. Writes that bypass signals
+(bulk_create(), QuerySet.update()) are not logged, except for the admin
+update actions. Rows on a shard other than 'default' are logged outside
+their write's transaction.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import ChangeLogEntry, Event, RSVP, Review
+from .projections import to_datetime
+
+
+DEFAULTS = {
+    'RETENTION_DAYS': 7,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+    'SETTLE_SECONDS': 10,
+    'MAX_LIMIT': 1000,
+}
+
+OBJECT_TYPES = {Event: 'event', RSVP: 'rsvp', Review: 'review'}
+TOMBSTONES = (ChangeLogEntry.DELETED, ChangeLogEntry.ARCHIVED)
+
+
+def changes_setting(name):
+    """Read a CHANGES setting, falling back to the module default."""
+    return getattr(settings, 'CHANGES', {}).get(name, DEFAULTS[name])
+
+
+# Writing
+
+def row_data(instance):
+    """Column values of a row, keyed like values() (`organizer_id`, `event_id`, ...)."""
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def entry(instance, action):
+    return ChangeLogEntry(
+        object_type=OBJECT_TYPES[type(instance)],
+        object_id=instance.pk,
+        action=action,
+        event_id=instance.pk if isinstance(instance, Event) else instance.event_id,
+        data=None if action == ChangeLogEntry.DELETED else row_data(instance),
+    )
+
+
+def record(instance, action):
+    """Append one change. Call it inside the write's transaction."""
+    entry(instance, action).save()
+
+
+def record_updated(model, pks, batch_size=1000):
+    """Log rows changed by QuerySet.update(), which sends no signals."""
+    for start in range(0, len(pks), batch_size):
+        rows = model.objects.filter(pk__in=pks[start:start + batch_size]).order_by('pk')
+        ChangeLogEntry.objects.bulk_create([entry(row, ChangeLogEntry.UPDATED) for row in rows])
+
+
+def record_archived(event_ids):
+    """Log events moved to the archive tables."""
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(object_type='event', object_id=event_id, action=ChangeLogEntry.ARCHIVED, event_id=event_id)
+        for event_id in event_ids
+    ])
+
+
+# Reading
+
+def read(after=0, limit=100, now=None):
+    """
+    Up to `limit` entries after seq `after`, stopping before a gap that may
+    still be filled by a committing transaction. Returns (entries, cursor),
+    where the cursor is the `after` to pass next time.
+    """
+    settled = (now or timezone.now()) - timedelta(seconds=changes_setting('SETTLE_SECONDS'))
+    entries = list(ChangeLogEntry.objects.filter(seq__gt=after).order_by('seq')[:limit])
+    expected = after + 1
+    for index, change in enumerate(entries):
+        if change.seq != expected and change.changed_at > settled:
+            entries = entries[:index]
+            break
+        expected = change.seq + 1
+    return entries, entries[-1].seq if entries else after
+
+
+def represent(change):
+    return {
+        'seq': change.seq,
+        'type': change.object_type,
+        'id': change.object_id,
+        'action': change.action,
+        'event': change.event_id,
+        'data': change.data,
+        'changed_at': to_datetime(change.changed_at),
+    }
+
+
+# Compaction
+
+def compact(now=None, batch_size=10000, progress=None):
+    """
+    Drop superseded entries older than the retention and tombstones older
+    than the tombstone retention, `batch_size` sequence numbers per
+    transaction. Returns the number of entries removed.
+    """
+    now = now or timezone.now()
+    old = ChangeLogEntry.objects.filter(changed_at__lt=now - timedelta(days=changes_setting('RETENTION_DAYS')))
+    tombstone_horizon = now - timedelta(days=changes_setting('TOMBSTONE_RETENTION_DAYS'))
+    bounds = old.aggregate(low=Min('seq'), high=Max('seq'))
+    if bounds['low'] is None:
+        return 0
+
+    newer = ChangeLogEntry.objects.filter(
+        object_type=OuterRef('object_type'), object_id=OuterRef('object_id'), seq__gt=OuterRef('seq')
+    )
+    removed = 0
+    for first in range(bounds['low'], bounds['high'] + 1, batch_size):
+        with transaction.atomic():
+            window = old.filter(seq__gte=first, seq__lt=first + batch_size)
+            superseded, _ = window.filter(Exists(newer)).delete()
+            tombstones, _ = window.filter(action__in=TOMBSTONES, changed_at__lt=tombstone_horizon).delete()
+        removed += superseded + tombstones
+        if progress:
+            progress(min(first + batch_size - 1, bounds['high']), bounds['high'], removed)
+    return removed
@@ -0,0 +1,80 @@
+"""
+Password hashing with a per-environment work factor, run off the event loop.
+
+ConfigurablePBKDF2PasswordHasher reads its iteration count from
+settings.PASSWORD_HASHING, so each environment can pick its own cost.
+Stored hashes with a different count (or from another hasher) are
+re-encoded on the next successful login.
+
+hash_password() and run_in_pool() run the hashing in a bounded thread
+pool. hashlib releases the GIL while computing PBKDF2, so the pool
+spreads logins across cores while the event loop keeps serving other
+requests, and the pool size caps how much CPU signup spikes can take.
+Login runs authenticate() through run_in_pool(); ModelBackend hashes the
+password for unknown users too, so they take as long as wrong passwords.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.db import close_old_connections
+
+
+DEFAULTS = {
+    'PBKDF2_ITERATIONS': None,  # None keeps Django's default
+    'WORKERS': 4,
+}
+
+
+def hashing_setting(name):
+    """Read a PASSWORD_HASHING setting, falling back to the module default."""
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 hasher whose iteration count comes from settings."""
+
+    @property
+    def iterations(self):
+        return hashing_setting('PBKDF2_ITERATIONS') or PBKDF2PasswordHasher.iterations
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, sized by PASSWORD_HASHING['WORKERS']."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=hashing_setting('WORKERS'), thread_name_prefix='password-hashing'
+                )
+    return _pool
+
+
+async def hash_password(raw_password):
+    """Hash a password in the hashing pool."""
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), make_password, raw_password)
+
+
+def _with_connections(func, *args):
+    # Pool threads hold their own database connections; tidy them up the
+    # way Django does around a request
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args):
+    """
+    Run a function that checks passwords and may use the database, such as
+    authenticate(), in the hashing pool.
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), _with_connections, func, *args)
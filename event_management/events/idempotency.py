@@ -0,0 +1,233 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client sends `Idempotency-Key: <unique value>` with a POST it may retry.
+The first request claims the key for its user and runs normally; its
+response is stored under the key for IDEMPOTENCY['TTL'] seconds. A retry
+with the same key and request gets the stored response back (marked with
+`Idempotent-Replayed: true`) without running the view again, so no
+validation, lookups or writes are repeated.
+
+A duplicate that arrives while the first request is still running waits
+up to IDEMPOTENCY['WAIT'] seconds for its response, then gets 409. Reusing
+a key for a different request gets 422. Server errors are not stored, so
+the client can retry them with the same key.
+
+The claim is committed before the view runs and the response is stored
+after it returns. While the view runs, a heartbeat thread renews the
+claim every third of IDEMPOTENCY['LOCK_TIMEOUT']; if the process dies,
+the claim is taken over once its heartbeat is LOCK_TIMEOUT seconds old.
+A request whose claim was taken over anyway (e.g. a stalled process)
+still answers normally, but its response is not stored. Expired keys are
+removed by `purge_idempotency_keys`.
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+DEFAULTS = {
+    'TTL': 86400,
+    'LOCK_TIMEOUT': 60,
+    'WAIT': 5.0,
+    'POLL_INTERVAL': 0.05,
+}
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_setting(name):
+    """Read an IDEMPOTENCY setting, falling back to the module default."""
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, DEFAULTS[name])
+
+
+class KeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed. Retry shortly.'
+    default_code = 'idempotency_key_in_progress'
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used for a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class _Replay(Exception):
+    """Raised from initial() to answer with a stored response."""
+
+    def __init__(self, record):
+        self.record = record
+
+
+def fingerprint(request):
+    """Hash of what makes two requests "the same": method, path and body."""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(b'\0')
+    digest.update(request._request.body)
+    return digest.hexdigest()
+
+
+def claim(user, key, request_hash):
+    """
+    Claim `key` for a new execution, or return the completed record to
+    replay. Waits while another request holds the key.
+    """
+    deadline = time.monotonic() + idempotency_setting('WAIT')
+    while True:
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(
+                        user=user, key=key, request_hash=request_hash,
+                        expires_at=now + timedelta(seconds=idempotency_setting('TTL')),
+                    ), False
+            except IntegrityError:
+                continue  # a concurrent duplicate claimed it first
+
+        if record.expires_at <= now or (
+            not record.is_complete
+            and record.heartbeat_at <= now - timedelta(seconds=idempotency_setting('LOCK_TIMEOUT'))
+        ):
+            # Expired, or abandoned by a request that stopped renewing it
+            IdempotencyKey.objects.filter(pk=record.pk, heartbeat_at=record.heartbeat_at).delete()
+            continue
+        if record.request_hash != request_hash:
+            raise KeyReused()
+        if record.is_complete:
+            return record, True
+        if time.monotonic() >= deadline:
+            raise KeyInProgress()
+        time.sleep(idempotency_setting('POLL_INTERVAL'))
+
+
+def _claimed(record):
+    """The claim row of `record`, unless it was taken over or completed."""
+    return IdempotencyKey.objects.filter(pk=record.pk, status_code=None)
+
+
+def renew(record):
+    """Move a claim's heartbeat forward. Returns False once it is no longer held."""
+    return bool(_claimed(record).update(heartbeat_at=timezone.now()))
+
+
+def complete(record, status_code, response_body):
+    """Store the response of a claim. Returns False if the claim was taken over."""
+    if _claimed(record).update(status_code=status_code, response_body=response_body):
+        return True
+    logger.warning('Idempotency key %s was taken over before its response was stored.', record)
+    return False
+
+
+def release(record):
+    """Drop a claim so the client can retry with the same key."""
+    _claimed(record).delete()
+
+
+class Heartbeat(threading.Thread):
+    """Renews a claim while its request runs."""
+
+    def __init__(self, record):
+        super().__init__(name='idempotency-heartbeat', daemon=True)
+        self.record = record
+        self.interval = idempotency_setting('LOCK_TIMEOUT') / 3
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval) and renew(self.record):
+                pass
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class IdempotentCreateMixin:
+    """
+    Viewset mixin honouring the Idempotency-Key header on POST requests by
+    authenticated users. Keys are scoped to the user.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.idempotency_record = None
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or key is None or not request.user.is_authenticated:
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: f'Must be 1 to {MAX_KEY_LENGTH} characters.'})
+
+        record, completed = claim(request.user, key, fingerprint(request))
+        if completed:
+            raise _Replay(record)
+        self.idempotency_record = record
+        self.idempotency_heartbeat = Heartbeat(record)
+        self.idempotency_heartbeat.start()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            response = Response(exc.record.response_body, status=exc.record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.release_idempotency_key()
+            raise
+
+    def take_idempotency_record(self):
+        """The claim held by this request, with its heartbeat stopped."""
+        record = getattr(self, 'idempotency_record', None)
+        self.idempotency_record = None
+        if record is not None:
+            self.idempotency_heartbeat.stop()
+        return record
+
+    def release_idempotency_key(self):
+        """Drop the claim so the client can retry with the same key."""
+        record = self.take_idempotency_record()
+        if record is not None:
+            release(record)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, 'idempotency_record', None) is not None:
+            if response.status_code >= 500:
+                self.release_idempotency_key()
+            else:
+                complete(self.take_idempotency_record(), response.status_code, response.data)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def purge_expired(batch_size=1000, now=None):
+    """Delete expired keys in batches. Returns the number deleted."""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now).order_by()
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,202 @@
+"""
+Live RSVP count and rating updates for event pages.
+
+RSVP/Review signals publish a change notice for the event to a broker.
+Each worker process runs one LiveEventHub that listens on the broker, and
+for every event with open streams computes a single snapshot per coalesce
+interval and fans it out to all local listeners.
+
+The in-process broker only reaches streams served by the same process.
+Multi-process deployments can point LIVE_UPDATES['BROKER'] at another
+Broker implementation (e.g. one backed by Redis pub/sub).
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.utils.module_loading import import_string
+
+from .models import RSVP, Review
+from .sharding import for_event
+
+
+DEFAULTS = {
+    'BROKER': 'events.live.InProcessBroker',
+    'COALESCE_INTERVAL': 1.0,
+    'HEARTBEAT_INTERVAL': 15.0,
+}
+
+
+def live_setting(name):
+    """Read a LIVE_UPDATES setting, falling back to the module default."""
+    return getattr(settings, 'LIVE_UPDATES', {}).get(name, DEFAULTS[name])
+
+
+def channel_name(event_id):
+    return f'event:{event_id}'
+
+
+class Broker:
+    """
+    Pub/sub interface used to fan change notices out to listening processes.
+    publish() may be called from any thread; callbacks may run on any thread.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        """Register callback(message) for channel and return a token for unsubscribe()."""
+        raise NotImplementedError
+
+    def unsubscribe(self, channel, token):
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """Broker that delivers messages to subscribers in the current process."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, {}).values())
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        token = object()
+        with self._lock:
+            self._subscribers.setdefault(channel, {})[token] = callback
+        return token
+
+    def unsubscribe(self, channel, token):
+        with self._lock:
+            callbacks = self._subscribers.get(channel, {})
+            callbacks.pop(token, None)
+            if not callbacks:
+                self._subscribers.pop(channel, None)
+
+
+def snapshot(event_id):
+    """Current RSVP count and rating figures for an event."""
+    reviews = for_event(Review, event_id).aggregate(
+        review_count=Count('id'), average_rating=Avg('rating')
+    )
+    average = reviews['average_rating']
+    return {
+        'event': event_id,
+        'rsvp_count': for_event(RSVP, event_id).count(),
+        'review_count': reviews['review_count'],
+        'average_rating': round(average, 2) if average is not None else None,
+    }
+
+
+class _Channel:
+    """Local listeners for one event plus its coalescing state."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.listeners = set()
+        self.token = None
+        self.flush_pending = False
+        self.last_push = 0.0
+
+
+class LiveEventHub:
+    """
+    Per-process fan-out of event snapshots to open SSE streams.
+    Listener queues hold only the latest snapshot, so slow clients never
+    accumulate a backlog.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._channels = {}
+
+    def notify(self, event_id):
+        """Publish a change notice for an event. Safe to call from sync code."""
+        self.broker.publish(channel_name(event_id), {'event': event_id})
+
+    def listen(self, event_id):
+        """Register a listener queue for an event. Must be called on the event loop."""
+        channel = self._channels.get(event_id)
+        if channel is None:
+            channel = self._channels[event_id] = _Channel(asyncio.get_running_loop())
+            channel.token = self.broker.subscribe(
+                channel_name(event_id),
+                lambda message: channel.loop.call_soon_threadsafe(self._schedule, event_id),
+            )
+        queue = asyncio.Queue(maxsize=1)
+        channel.listeners.add(queue)
+        return queue
+
+    def unlisten(self, event_id, queue):
+        channel = self._channels.get(event_id)
+        if channel is None:
+            return
+        channel.listeners.discard(queue)
+        if not channel.listeners:
+            self.broker.unsubscribe(channel_name(event_id), channel.token)
+            del self._channels[event_id]
+
+    def _schedule(self, event_id):
+        channel = self._channels.get(event_id)
+        if channel is None or channel.flush_pending:
+            return
+        channel.flush_pending = True
+        channel.loop.create_task(self._flush(event_id, channel))
+
+    async def _flush(self, event_id, channel):
+        wait = channel.last_push + live_setting('COALESCE_INTERVAL') - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        channel.flush_pending = False
+        data = await sync_to_async(snapshot)(event_id)
+        channel.last_push = time.monotonic()
+        for queue in list(channel.listeners):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """Return the process-wide hub, creating it with the configured broker."""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = LiveEventHub(import_string(live_setting('BROKER'))())
+    return _hub
+
+
+def format_sse(data, event='update'):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def stream(event_id, hub=None):
+    """Async generator of SSE frames: initial snapshot, then coalesced updates."""
+    hub = hub or get_hub()
+    queue = hub.listen(event_id)
+    try:
+        yield format_sse(await sync_to_async(snapshot)(event_id))
+        heartbeat = live_setting('HEARTBEAT_INTERVAL')
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_sse(data)
+    finally:
+        hub.unlisten(event_id, queue)
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from events.archive import archive_events
+
+
+class Command(BaseCommand):
+    """
+    Move finished events and their RSVPs/reviews into the archive tables.
+    Works in batched transactions; safe to interrupt and re-run.
+    """
+    help = 'Archive events that ended more than --older-than days ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Archive events whose end_time is more than DAYS days in the past.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Events per transaction.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError('--older-than must be zero or more days.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        self.stdout.write(f'Archiving events that ended before {cutoff.isoformat()}')
+
+        def progress(batch, events, rsvps, reviews):
+            self.stdout.write(f'  batch {batch}: {events} events, {rsvps} RSVPs, {reviews} reviews archived so far')
+
+        events, rsvps, reviews = archive_events(
+            cutoff, batch_size=options['batch_size'], max_batches=options['max_batches'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {events} events, {rsvps} RSVPs and {reviews} reviews.'
+        ))
@@ -0,0 +1,161 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from events import analytics
+from events.models import Event, RSVP, Review
+from events.snapshot import _KeepTimestamps
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the analytics endpoints' queries on rollup tables against
+    computing the same figures live from RSVP and review rows, plus the
+    cost of rebuilding, compacting and the per-write rollup update.
+    Seeds a synthetic dataset inside a transaction that is rolled back;
+    seeding the default 10M RSVPs takes several minutes on SQLite.
+    """
+    help = 'Compare analytics from rollup tables vs live aggregation over RSVPs and reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rsvps', type=int, default=10000000)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--organizers', type=int, default=50)
+        parser.add_argument('--days', type=int, default=180, help='Spread of RSVP creation times.')
+        parser.add_argument('--review-ratio', type=float, default=0.1)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, options):
+        organizers, events = self.seed(options)
+        now = timezone.now()
+        start, end = analytics.day_bucket(now) - timedelta(days=30), analytics.day_bucket(now) + timedelta(days=1)
+
+        started = time.perf_counter()
+        rows = analytics.rebuild(batch_size=500)
+        self.stdout.write(f'Rebuilt {rows:,} rollup rows in {time.perf_counter() - started:.1f}s')
+
+        event_id = events[0]
+        organizer = organizers[0]
+        self.stdout.write(f"{'30-day daily report':<28}{'live':>12}{'rollups':>12}")
+        for name, live, rollup in (
+            ('one event', lambda: self.live({'event_id': event_id}, start, end),
+             lambda: analytics.report({'event_id__in': [event_id]}, start, end)),
+            (f"organizer ({options['events'] // options['organizers']} events)",
+             lambda: self.live({'event__organizer': organizer}, start, end),
+             lambda: analytics.report({'organizer': organizer}, start, end)),
+        ):
+            live_ms = self.timed(live, options['repeat'])
+            rollup_ms = self.timed(rollup, options['repeat'])
+            self.stdout.write(
+                f'{name:<28}{live_ms:>9.1f} ms{rollup_ms:>9.1f} ms   ({live_ms / max(rollup_ms, 0.001):.0f}x)'
+            )
+
+        # The first write of an hour creates the event's row, later ones update it
+        writes = min(1000, len(events))
+        for label in ('first in the hour', 'later'):
+            started = time.perf_counter()
+            for event_id in events[-writes:]:
+                analytics.record(event_id, going=1, maybe=-1)
+            per_write = (time.perf_counter() - started) / writes * 1000
+            self.stdout.write(f'Rollup update per RSVP/review write ({label}): {per_write:.3f} ms')
+
+        started = time.perf_counter()
+        folded, days = analytics.compact(now=now + timedelta(days=7))
+        self.stdout.write(
+            f'Compacted {folded:,} hourly rows into {days} days in {time.perf_counter() - started:.1f}s'
+        )
+
+    def seed(self, options):
+        rng = random.Random(0)
+        now = timezone.now()
+        users_needed = -(-options['rsvps'] // options['events'])
+        organizers = User.objects.bulk_create([
+            User(username=f'bench-analytics-organizer-{i}') for i in range(options['organizers'])
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'bench-analytics-{i}') for i in range(users_needed)
+        ], batch_size=5000)
+        events = Event.objects.bulk_create([
+            Event(
+                title=f'Bench Event {i}', description='Analytics benchmark event',
+                organizer=organizers[i % len(organizers)], location='Hall',
+                start_time=now + timedelta(days=30), end_time=now + timedelta(days=30, hours=2),
+            )
+            for i in range(options['events'])
+        ], batch_size=5000)
+        event_ids = [event.id for event in events]
+
+        statuses = [RSVP.GOING] * 6 + [RSVP.MAYBE] * 3 + [RSVP.NOT_GOING]
+        span = options['days'] * 86400
+        review_every = max(int(1 / options['review_ratio']), 1) if options['review_ratio'] else 0
+        created = 0
+        with _KeepTimestamps(RSVP, Review):
+            for user in users:
+                count = min(options['events'], options['rsvps'] - created)
+                if count <= 0:
+                    break
+                stamps = [now - timedelta(seconds=rng.randrange(span)) for _ in range(count)]
+                RSVP.objects.bulk_create([
+                    RSVP(event_id=event_id, user=user, status=rng.choice(statuses), created_at=stamp, updated_at=stamp)
+                    for event_id, stamp in zip(event_ids, stamps)
+                ], batch_size=5000)
+                if review_every and user.id % review_every == 0:
+                    Review.objects.bulk_create([
+                        Review(
+                            event_id=event_id, user=user, rating=rng.randint(1, 5), comment='Benchmark',
+                            created_at=stamp, updated_at=stamp,
+                        )
+                        for event_id, stamp in zip(event_ids, stamps)
+                    ], batch_size=5000)
+                created += count
+                if created % 1000000 < options['events']:
+                    self.stdout.write(f'  seeded {created:,} RSVPs')
+        self.stdout.write(
+            f"Seeded {created:,} RSVPs over {options['events']} events and {options['organizers']} organizers"
+        )
+        return organizers, event_ids
+
+    def live(self, filters, start, end):
+        """The figures of analytics.report() computed from RSVP and review rows."""
+        rsvps = RSVP.objects.filter(**filters).order_by()
+        reviews = Review.objects.filter(**filters).order_by()
+        day = TruncDay('created_at')
+        status_counts = {
+            name: Count('pk', filter=Q(status=value)) for value, name in analytics.STATUS_COUNTERS.items()
+        }
+        return (
+            rsvps.aggregate(new_rsvps=Count('pk'), **status_counts),
+            reviews.aggregate(reviews=Count('pk'), rating_sum=Sum('rating')),
+            list(rsvps.filter(created_at__gte=start, created_at__lt=end)
+                 .annotate(day=day).values('day').annotate(new_rsvps=Count('pk'), **status_counts)),
+            list(reviews.filter(created_at__gte=start, created_at__lt=end)
+                 .annotate(day=day).values('day').annotate(reviews=Count('pk'), rating_sum=Sum('rating'))),
+        )
+
+    def timed(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000
@@ -0,0 +1,109 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events.archive import archive_events
+from events.models import Event, RSVP
+from events.projections import EventProjection
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Benchmark list and search latency before and after archiving.
+    Seeds a synthetic dataset inside a transaction that is rolled back.
+    Use --events 10000000 for the full-size comparison; expect seeding
+    to take a long time on SQLite.
+    """
+    help = 'Compare list/search latency on unarchived vs archived (hot-only) tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--past-ratio', type=float, default=0.95, help='Share of events that already ended.')
+        parser.add_argument('--rsvps-per-event', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options)
+                before = self.measure(options['repeat'])
+                started = time.perf_counter()
+                archive_events(timezone.now(), batch_size=1000)
+                archive_time = time.perf_counter() - started
+                after = self.measure(options['repeat'])
+                self.report(before, after, archive_time)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, options):
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(username=f'bench-archive-{i}') for i in range(max(options['rsvps_per_event'], 1))
+        ])
+        past_count = int(options['events'] * options['past_ratio'])
+        chunk = 5000
+        for start in range(0, options['events'], chunk):
+            events = Event.objects.bulk_create([
+                Event(
+                    title=f'Bench Event {i}', description='Archived benchmark event',
+                    organizer=users[0], location=f'City {i % 100}',
+                    start_time=now + timedelta(days=-30 if i < past_count else 30),
+                    end_time=now + timedelta(days=-29 if i < past_count else 31),
+                )
+                for i in range(start, min(start + chunk, options['events']))
+            ])
+            RSVP.objects.bulk_create([
+                RSVP(event=event, user=user)
+                for event in events for user in users[:options['rsvps_per_event']]
+            ])
+        self.stdout.write(f"Seeded {options['events']} events ({past_count} finished)")
+
+    def timed(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000
+
+    def measure(self, repeat):
+        projection = EventProjection()
+
+        def list_page():
+            queryset = projection.project(Event.objects.filter(is_public=True))
+            queryset.count()
+            projection.represent_many(queryset[:5])
+
+        def search_page():
+            queryset = projection.project(Event.objects.filter(
+                Q(title__icontains='Event 1') | Q(location__icontains='City 1')
+            ))
+            queryset.count()
+            projection.represent_many(queryset[:5])
+
+        return {
+            'rows': Event.objects.count(),
+            'list': self.timed(list_page, repeat),
+            'search': self.timed(search_page, repeat),
+        }
+
+    def report(self, before, after, archive_time):
+        self.stdout.write(f'Archiving took {archive_time:.1f}s')
+        self.stdout.write(f"{'':<10}{'unarchived':>14}{'hot only':>14}")
+        self.stdout.write(f"{'rows':<10}{before['rows']:>14,}{after['rows']:>14,}")
+        for name in ('list', 'search'):
+            self.stdout.write(
+                f'{name:<10}{before[name]:>11.1f} ms{after[name]:>11.1f} ms'
+                f'   ({before[name] / max(after[name], 0.001):.1f}x)'
+            )
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from django.test.utils import override_settings
+
+from events import hashers
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the async /api/auth/login/ endpoint and its effect on other
+    requests. Logins and GET /api/events/ reads go through the full ASGI
+    middleware stack with AsyncClient, against the configured database.
+    A temporary user is created for the run and deleted afterwards;
+    throttling is disabled while it runs.
+    """
+    help = 'Report logins/s per core and API read latency while logins are in flight.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=None, help='PBKDF2 iterations (default: configured).')
+        parser.add_argument('--logins', type=int, default=40)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--read-interval', type=float, default=0.005, help='Seconds between reads.')
+
+    def handle(self, *args, **options):
+        hashing = {'PBKDF2_ITERATIONS': options['iterations'], 'WORKERS': hashers.hashing_setting('WORKERS')}
+        throttling = {**getattr(settings, 'THROTTLING', {}), 'RATES': {}}
+        with override_settings(
+            PASSWORD_HASHING=hashing, THROTTLING=throttling, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            self.credentials = {'username': f'bench-auth-{uuid.uuid4().hex[:8]}', 'password': 'bench-password'}
+            user = User.objects.create_user(**self.credentials)
+            try:
+                encoded = user.password
+                self.stdout.write(f'Hash: {encoded.split("$")[0]} with {encoded.split("$")[1]} iterations')
+                asyncio.run(self.run(options))
+            finally:
+                user.delete()
+
+    async def run(self, options):
+        client = AsyncClient()
+        await self.login(client)  # Warm up the pool and connections
+
+        count = max(1, options['logins'] // 4)
+        start = time.perf_counter()
+        for _ in range(count):
+            await self.login(client)
+        rate = count / (time.perf_counter() - start)
+        self.stdout.write(f'One at a time: {rate:,.1f} logins/s per core')
+
+        self.report('reads only', None, await self.reads(client, options, asyncio.Event()))
+
+        done = asyncio.Event()
+        read_task = asyncio.create_task(self.reads(client, options, done))
+        start = time.perf_counter()
+        await asyncio.gather(*(self.login(client) for _ in range(options['logins'])))
+        elapsed = time.perf_counter() - start
+        done.set()
+        self.report('with logins', options['logins'] / elapsed, await read_task)
+
+    async def login(self, client):
+        response = await client.post('/api/auth/login/', self.credentials, content_type='application/json')
+        if response.status_code != 200:
+            raise RuntimeError(f'Login failed with {response.status_code}: {response.content[:200]!r}')
+
+    async def reads(self, client, options, done):
+        """Time GET /api/events/ every read_interval seconds until done is set."""
+        latencies = []
+        for _ in range(options['reads']):
+            await asyncio.sleep(options['read_interval'])
+            start = time.perf_counter()
+            await client.get('/api/events/')
+            latencies.append(time.perf_counter() - start)
+            if done.is_set():
+                break
+        return latencies
+
+    def report(self, label, rate, latencies):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        line = f'{label:>12}: '
+        if rate is not None:
+            workers = min(hashers.hashing_setting('WORKERS'), os.cpu_count() or 1)
+            line += f'{rate:,.1f} logins/s ({rate / workers:,.1f} per core), '
+        self.stdout.write(
+            line + f'read latency p50 {statistics.median(latencies) * 1000:.1f} ms, '
+            f'p99 {p99 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms over {len(latencies)} reads'
+        )
@@ -0,0 +1,95 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events import recurrence
+from events.models import Event
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Benchmark calendar window queries over lazily expanded recurring events
+    against the same occurrences stored as one Event row each.
+    Runs inside a transaction that is rolled back.
+    """
+    help = 'Compare window queries on recurring series vs materialized occurrence rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--series', type=int, default=100, help='Weekly recurring events.')
+        parser.add_argument('--weeks', type=int, default=520, help='Occurrences per series when materialized.')
+        parser.add_argument('--window-days', type=int, default=28)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, options):
+        organizer = User.objects.create(username='bench-recurrence')
+        start = timezone.now().replace(microsecond=0)
+        duration = timedelta(hours=2)
+
+        Event.objects.bulk_create([
+            Event(
+                title=f'Series {i}', description='Recurring', organizer=organizer, location='Hall',
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i) + duration,
+                recurrence='FREQ=WEEKLY',
+            )
+            for i in range(options['series'])
+        ])
+        series_ids = set(Event.objects.exclude(recurrence='').values_list('id', flat=True))
+
+        materialized = 0
+        for i in range(options['series']):
+            rows = [
+                Event(
+                    title=f'Materialized {i}', description='Recurring', organizer=organizer, location='Hall',
+                    start_time=start + timedelta(hours=i, weeks=week),
+                    end_time=start + timedelta(hours=i, weeks=week) + duration,
+                )
+                for week in range(options['weeks'])
+            ]
+            Event.objects.bulk_create(rows, batch_size=2000)
+            materialized += len(rows)
+        self.stdout.write(
+            f"{options['series']} series vs {materialized:,} materialized rows; "
+            f"{options['window_days']}-day windows"
+        )
+
+        lazy = Event.objects.filter(id__in=series_ids)
+        stored = Event.objects.exclude(id__in=series_ids)
+        window = timedelta(days=options['window_days'])
+        limit = 10000
+
+        self.stdout.write(f"{'window start':<16}{'expanded':>12}{'materialized':>16}")
+        for weeks_ahead in (0, options['weeks'] // 2, options['weeks'] - 5):
+            window_start = start + timedelta(weeks=weeks_ahead)
+            window_end = window_start + window
+            expanded = self.timed(
+                lambda: recurrence.calendar(lazy, window_start, window_end, limit), options['repeat']
+            )
+            rows = self.timed(
+                lambda: recurrence.calendar(stored, window_start, window_end, limit), options['repeat']
+            )
+            self.stdout.write(f"{f'+{weeks_ahead} weeks':<16}{expanded:>9.1f} ms{rows:>13.1f} ms")
+
+    def timed(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
@@ -0,0 +1,101 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from events.models import Event, RSVP, Review, UserProfile
+from events.projections import EventProjection, RSVPProjection, ReviewProjection
+from events.renderers import FastJSONRenderer
+from events.serializers import EventSerializer, RSVPSerializer, ReviewSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Microbenchmark of the serializer path versus the projection path.
+    Builds a synthetic dataset inside a transaction that is rolled back,
+    so it can be pointed at any database.
+    """
+    help = 'Report objects serialized per second for ModelSerializer vs projection output.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--rsvps-per-event', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['events'], options['rsvps_per_event'])
+                self.run(options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, event_count, rsvps_per_event):
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(username=f'bench-user-{i}', first_name='Bench', last_name=str(i))
+            for i in range(max(rsvps_per_event, 10))
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, full_name=f'Bench User {i}' if i % 2 else '')
+            for i, user in enumerate(users)
+        ])
+        events = Event.objects.bulk_create([
+            Event(
+                title=f'Bench Event {i}', description='Benchmark event ' * 10,
+                organizer=users[i % len(users)], location='Bench City',
+                start_time=now, end_time=now,
+            )
+            for i in range(event_count)
+        ])
+        RSVP.objects.bulk_create([
+            RSVP(event=event, user=users[j]) for event in events for j in range(rsvps_per_event)
+        ])
+        Review.objects.bulk_create([
+            Review(event=event, user=users[j], rating=j % 5 + 1, comment='Fine')
+            for event in events for j in range(rsvps_per_event)
+        ])
+
+    def timed(self, label, count, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rate = count / best if best else float('inf')
+        self.stdout.write(f'  {label:<36} {rate:>12,.0f} objects/s')
+        return rate
+
+    def run(self, repeat):
+        renderer = JSONRenderer()
+        fast_renderer = FastJSONRenderer()
+        cases = [
+            ('events', Event.objects.all(), EventSerializer, EventProjection()),
+            ('rsvps', RSVP.objects.all(), RSVPSerializer, RSVPProjection()),
+            ('reviews', Review.objects.all(), ReviewSerializer, ReviewProjection()),
+        ]
+        for name, queryset, serializer_class, projection in cases:
+            count = queryset.count()
+            self.stdout.write(f'{name} ({count} objects)')
+            before = self.timed(
+                'ModelSerializer + JSONRenderer', count, repeat,
+                lambda: renderer.render(serializer_class(queryset.all(), many=True).data),
+            )
+            self.timed(
+                'projection + JSONRenderer', count, repeat,
+                lambda: renderer.render(projection.represent_many(projection.project(queryset.all()))),
+            )
+            after = self.timed(
+                'projection + FastJSONRenderer', count, repeat,
+                lambda: fast_renderer.render(projection.represent_many(projection.project(queryset.all()))),
+            )
+            self.stdout.write(f'  speedup: {after / before:.1f}x')
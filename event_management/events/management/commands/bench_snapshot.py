@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
+from itertools import chain
+
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events import snapshot
+from events.models import Event, RSVP, Review, UserProfile
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Compare dumping and loading a synthetic dataset as a JSON fixture
+    (dumpdata/loaddata format) versus a binary snapshot (dump_events /
+    load_events). Runs inside a transaction that is rolled back.
+    """
+    help = 'Benchmark loaddata JSON fixtures against load_events binary snapshots.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--rsvps-per-event', type=int, default=5)
+        parser.add_argument('--reviews-per-event', type=int, default=2)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                with transaction.atomic():
+                    self.run(options, directory)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def seed(self, options):
+        now = timezone.now()
+        users = User.objects.bulk_create([User(username=f'bench-snapshot-{i}') for i in range(options['users'])])
+        UserProfile.objects.bulk_create([UserProfile(user=user, full_name=f'User {user.pk}') for user in users])
+        events = Event.objects.bulk_create([
+            Event(
+                title=f'Snapshot Event {i}', description='Seeded for bench_snapshot',
+                organizer=users[i % len(users)], location=f'City {i % 50}',
+                start_time=now + timedelta(days=i % 365), end_time=now + timedelta(days=i % 365, hours=2),
+            )
+            for i in range(options['events'])
+        ])
+        RSVP.objects.bulk_create([
+            RSVP(event=event, user=users[(i + j) % len(users)])
+            for i, event in enumerate(events) for j in range(options['rsvps_per_event'])
+        ])
+        Review.objects.bulk_create([
+            Review(event=event, user=users[(i + j) % len(users)], rating=1 + (i + j) % 5, comment='Seeded review')
+            for i, event in enumerate(events) for j in range(options['reviews_per_event'])
+        ])
+        return users, events
+
+    def run(self, options, directory):
+        users, events = self.seed(options)
+        user_ids = [user.pk for user in users]
+        event_ids = [event.pk for event in events]
+        querysets = [
+            User.objects.filter(pk__in=user_ids),
+            UserProfile.objects.filter(user_id__in=user_ids),
+            Event.objects.filter(pk__in=event_ids),
+            RSVP.objects.filter(event_id__in=event_ids),
+            Review.objects.filter(event_id__in=event_ids),
+        ]
+        rows = sum(queryset.count() for queryset in querysets)
+        self.stdout.write(f'Seeded {rows:,} rows')
+
+        fixture_path = os.path.join(directory, 'events.json')
+        started = time.perf_counter()
+        with open(fixture_path, 'w') as stream:
+            serializers.serialize('json', chain(*(queryset.iterator() for queryset in querysets)), stream=stream)
+        json_dump = time.perf_counter() - started
+
+        # dump() covers the whole database, so the seeded rows are dumped alone by
+        # removing everything else inside a savepoint first
+        buffer = io.BytesIO()
+        sid = transaction.savepoint()
+        Event.objects.exclude(pk__in=event_ids).delete()
+        User.objects.exclude(pk__in=user_ids).delete()
+        started = time.perf_counter()
+        snapshot.dump(buffer)
+        binary_dump = time.perf_counter() - started
+        transaction.savepoint_rollback(sid)
+
+        User.objects.filter(pk__in=user_ids).delete()
+
+        sid = transaction.savepoint()
+        started = time.perf_counter()
+        call_command('loaddata', fixture_path, verbosity=0)
+        json_load = time.perf_counter() - started
+        transaction.savepoint_rollback(sid)
+
+        started = time.perf_counter()
+        buffer.seek(0)
+        snapshot.load(buffer)
+        binary_load = time.perf_counter() - started
+
+        self.stdout.write(f"{'':<10}{'JSON fixture':>16}{'binary snapshot':>18}")
+        self.stdout.write(f"{'size':<10}{os.path.getsize(fixture_path) / 1e6:>13.1f} MB{len(buffer.getvalue()) / 1e6:>15.1f} MB")
+        self.stdout.write(f"{'dump':<10}{json_dump:>14.2f} s{binary_dump:>16.2f} s")
+        self.stdout.write(f"{'load':<10}{json_load:>14.2f} s{binary_load:>16.2f} s")
+        self.stdout.write(f'Load speedup: {json_load / binary_load:.1f}x')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from events.analytics import analytics_setting, compact, hourly_horizon
+
+
+class Command(BaseCommand):
+    """
+    Fold hourly analytics rollups older than ANALYTICS['HOURLY_RETENTION_DAYS']
+    into daily rows. One transaction per day; safe to interrupt and re-run.
+    Schedule it daily (e.g. from cron).
+    """
+    help = 'Compact hourly analytics rollups into daily rollups.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Compacting hourly rollups before {hourly_horizon().isoformat()} "
+            f"({analytics_setting('HOURLY_RETENTION_DAYS')} days kept hourly)"
+        )
+
+        def progress(day, rows):
+            self.stdout.write(f'  {day:%Y-%m-%d}: {rows} hourly rows folded')
+
+        rows, days = compact(progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Folded {rows} hourly rows into {days} days.'))
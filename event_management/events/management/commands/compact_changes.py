@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.changelog import changes_setting, compact
+
+
+class Command(BaseCommand):
+    """
+    Keep the change log bounded: drop entries older than
+    CHANGES['RETENTION_DAYS'] that a later entry for the same object
+    supersedes, and deletions older than CHANGES['TOMBSTONE_RETENTION_DAYS'].
+    Safe to interrupt and re-run. Schedule it daily (e.g. from cron).
+    """
+    help = 'Compact the event, RSVP and review change log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Sequence numbers per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        self.stdout.write(
+            f"Compacting changes older than {changes_setting('RETENTION_DAYS')} days "
+            f"(tombstones kept {changes_setting('TOMBSTONE_RETENTION_DAYS')} days)"
+        )
+
+        def progress(seq, last, removed):
+            self.stdout.write(f'  up to seq {seq} of {last}: {removed} entries removed')
+
+        removed = compact(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} change log entries.'))
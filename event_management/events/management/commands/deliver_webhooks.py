@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.webhooks import WebhookDeliverer
+
+
+class Command(BaseCommand):
+    """
+    Drain the webhook outbox.
+    Runs a single round by default, or keeps polling with --loop.
+    """
+    help = 'Deliver pending organizer webhooks from the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--limit', type=int, default=1000, help='Max outbox rows per round.')
+
+    def handle(self, *args, **options):
+        deliverer = WebhookDeliverer()
+        try:
+            while True:
+                delivered, failed = deliverer.run_once(limit=options['limit'])
+                if delivered or failed:
+                    self.stdout.write(f'Delivered {delivered} event(s), {failed} failed.')
+                if not options['loop']:
+                    break
+                if not delivered and not failed:
+                    time.sleep(options['interval'])
+        finally:
+            deliverer.pool.close()
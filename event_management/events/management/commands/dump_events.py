@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from events.snapshot import dump
+
+
+class Command(BaseCommand):
+    """
+    Write users, events, RSVPs and reviews to a compact binary snapshot.
+    Load it into another database with `load_events`.
+    """
+    help = 'Dump events, RSVPs, reviews and their users to a binary snapshot file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file to write.')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per compressed chunk.')
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'wb') as stream:
+            totals = dump(stream, chunk_size=options['chunk_size'], progress=self.progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Dumped ' + ', '.join(f'{count} {name}' for name, count in totals.items()) + '.'
+        ))
+
+    def progress(self, name, done, total):
+        self.stdout.write(f'  {name}: {done}/{total}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.snapshot import SnapshotError, load
+
+
+class Command(BaseCommand):
+    """
+    Load a snapshot written by `dump_events`. Rows get new ids and foreign
+    keys are remapped; users are matched by username. Runs in a single
+    transaction, so a failed load leaves the database unchanged.
+    """
+    help = 'Load events, RSVPs, reviews and their users from a binary snapshot file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file to read.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        try:
+            with open(options['path'], 'rb') as stream:
+                totals = load(stream, batch_size=options['batch_size'], progress=self.progress)
+        except (OSError, SnapshotError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            'Loaded ' + ', '.join(f'{count} {name}' for name, count in totals.items()) + '.'
+        ))
+
+    def progress(self, name, done, total):
+        self.stdout.write(f'  {name}: {done}/{total}')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from events.profiling import endpoint_stats
+
+
+class Command(BaseCommand):
+    """
+    Show per-endpoint request timings recorded while PROFILING['ENABLED']
+    is on: average total, database time and queries, and the average of
+    each span. Every process flushes its totals to the cache backend, so
+    they are only shared when CACHES uses a shared backend.
+    """
+    help = 'Show (and optionally reset) per-endpoint span timings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the timings after printing them.')
+
+    def handle(self, *args, **options):
+        endpoint_stats.flush()
+        stats = endpoint_stats.shared_stats()
+        if not stats:
+            self.stdout.write('No requests recorded yet.')
+        for endpoint, totals in sorted(stats.items(), key=lambda item: -item[1].get('total', 0)):
+            requests = totals.get('requests', 0)
+            if not requests:
+                continue
+            spans = ', '.join(
+                f'{name} {value / requests / 1000:.2f}'
+                for name, value in sorted(totals.items())
+                if name not in ('requests', 'queries', 'total', 'db')
+            )
+            self.stdout.write(
+                f"{endpoint:<40}{requests:>8} requests  avg {totals.get('total', 0) / requests / 1000:8.2f} ms"
+                f"  db {totals.get('db', 0) / requests / 1000:.2f} ms / {totals.get('queries', 0) / requests:.1f} queries"
+            )
+            if spans:
+                self.stdout.write(f'    spans (ms): {spans}')
+        if options['reset']:
+            endpoint_stats.reset()
+            self.stdout.write('Timings reset.')
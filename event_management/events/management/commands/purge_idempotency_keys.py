@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    """
+    Delete Idempotency-Key records past their TTL. Schedule it regularly
+    (e.g. hourly from cron); expired keys are never replayed either way.
+    """
+    help = 'Delete expired Idempotency-Key records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Keys deleted per statement.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.webhooks import purge
+
+
+class Command(BaseCommand):
+    """
+    Delete webhook outbox rows that were delivered or gave up more than
+    WEBHOOKS['RETENTION_DAYS'] ago. Schedule it regularly (e.g. daily).
+    """
+    help = 'Delete delivered and failed webhook outbox rows past the retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        deleted = purge(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} webhook outbox rows.'))
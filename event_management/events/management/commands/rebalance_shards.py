@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from events.sharding import rebalance, shards
+
+
+class Command(BaseCommand):
+    """
+    Move RSVPs and reviews to the shard their event belongs on, after
+    SHARDING['SHARDS'] changed. One transaction per event and model; safe
+    to interrupt and re-run. To retire a shard, remove it from SHARDS and
+    pass it with --source.
+    """
+    help = 'Move RSVP and review rows to the shards their events hash to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', dest='sources', metavar='ALIAS',
+                            help='Database alias to scan (repeatable). Defaults to every shard.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per insert.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would move.')
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or shards()
+        unknown = [alias for alias in sources if alias not in settings.DATABASES]
+        if unknown:
+            raise CommandError(f"Unknown database alias(es): {', '.join(unknown)}.")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        self.stdout.write(f"Rebalancing {', '.join(sources)} over {len(shards())} shard(s)")
+
+        def progress(source, event_id, target, rsvps, reviews):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  event {event_id}: {source} -> {target}, {rsvps} RSVPs, {reviews} reviews')
+
+        events, rsvps, reviews = rebalance(
+            sources, batch_size=options['batch_size'], dry_run=options['dry_run'], progress=progress
+        )
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {rsvps} RSVPs and {reviews} reviews of {events} events.'))
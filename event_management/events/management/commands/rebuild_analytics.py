@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.analytics import rebuild
+
+
+class Command(BaseCommand):
+    """
+    Recompute the analytics rollups from RSVPs and reviews, archived ones
+    included. Use it to backfill, or after bulk loads that skip signals
+    (e.g. load_events). Run it while the API is quiet: writes to events in
+    the batch being rebuilt may be miscounted.
+    """
+    help = 'Rebuild hourly and daily analytics rollups from RSVP and review rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Event ids per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        def progress(event_id, last_id, rows):
+            self.stdout.write(f'  events up to id {event_id} of {last_id}: {rows} rollup rows written')
+
+        rows = rebuild(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt analytics: {rows} rollup rows.'))
@@ -0,0 +1,69 @@
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PHASES = ('setup', 'warm_up', 'first_request', 'second_request', 'worker_time_to_first_request')
+
+
+class Command(BaseCommand):
+    """
+    Measure worker cold start in fresh subprocesses (see events/startup.py):
+    import time per top-level package, and time-to-first-request for a cold
+    worker versus one forked after warm_up().
+    """
+    help = 'Report import time and time-to-first-request with and without the prefork warm-up.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Subprocesses per mode (medians are reported).')
+        parser.add_argument('--path', default='/api/events/', help='URL of the first request.')
+        parser.add_argument('--top', type=int, default=12, help='Packages to list by import time.')
+
+    def handle(self, *args, **options):
+        results = {'cold': [], 'warm': []}
+        imports = None
+        for _ in range(options['runs']):
+            for mode in results:
+                output, import_log = self.probe(mode, options['path'])
+                results[mode].append(output)
+                if imports is None:
+                    imports = import_log
+
+        self.report_imports(imports, options['top'])
+        self.stdout.write('')
+        self.stdout.write(f"Time to first request for GET {options['path']} (median of {options['runs']} runs, ms)")
+        self.stdout.write(f"{'':<30}{'cold worker':>14}{'warmed + fork':>16}")
+        for phase in PHASES:
+            cold = statistics.median(run[phase] for run in results['cold'])
+            warm = statistics.median(run[phase] for run in results['warm'])
+            self.stdout.write(f'{phase:<30}{cold:>14.1f}{warm:>16.1f}')
+
+    def probe(self, mode, path):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'events.startup', '--mode', mode, '--path', path],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f'{mode} probe failed:\n{process.stderr[-2000:]}')
+        result = json.loads(process.stdout)
+        if not result['status'].startswith('200'):
+            raise CommandError(f"GET {path} returned {result['status']}")
+        return result, process.stderr
+
+    def report_imports(self, log, top):
+        """Sum self import time per top-level package from -X importtime output."""
+        totals = defaultdict(int)
+        for line in log.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            totals[name.strip().split('.')[0]] += int(self_us)
+
+        self.stdout.write(f'Import time by package (cold worker, {sum(totals.values()) / 1000:.1f} ms total)')
+        for package, micros in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {package:<30}{micros / 1000:>8.1f} ms')
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.changelog import read, represent
+
+
+class Command(BaseCommand):
+    """
+    Stream the change log as JSON lines, oldest first. With --cursor-file
+    the position is saved after every batch, so a consumer piping the
+    output can stop and resume where it left off. Runs until caught up by
+    default, or keeps polling with --follow.
+    """
+    help = 'Print event, RSVP and review changes after a cursor as JSON lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=None, metavar='SEQ',
+                            help='Start after this sequence number (default: the cursor file, else 0).')
+        parser.add_argument('--cursor-file', help='File holding the last sequence number processed.')
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new changes.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when caught up.')
+        parser.add_argument('--limit', type=int, default=500, help='Changes per read.')
+
+    def handle(self, *args, **options):
+        if options['limit'] < 1:
+            raise CommandError('--limit must be at least 1.')
+        after = options['after']
+        if after is None:
+            after = self.load_cursor(options['cursor_file'])
+
+        while True:
+            entries, cursor = read(after, options['limit'])
+            for change in entries:
+                self.stdout.write(json.dumps(represent(change)))
+            if cursor != after:
+                self.stdout.flush()
+                after = cursor
+                self.save_cursor(options['cursor_file'], cursor)
+            if len(entries) < options['limit']:
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+
+    def load_cursor(self, path):
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as cursor_file:
+            try:
+                return int(cursor_file.read().strip() or 0)
+            except ValueError:
+                raise CommandError(f'{path} does not hold a sequence number.')
+
+    def save_cursor(self, path, cursor):
+        if not path:
+            return
+        # Replace atomically so a crash never leaves a truncated cursor
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as cursor_file:
+            cursor_file.write(str(cursor))
+        os.replace(temporary, path)
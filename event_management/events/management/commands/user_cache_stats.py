@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from events.cache import user_cache
+
+
+class Command(BaseCommand):
+    """
+    Show hit-rate counters of the user cache.
+    Counters are flushed to the shared cache backend by every process,
+    so the totals are only shared when CACHES uses a shared backend.
+    """
+    help = 'Show (and optionally reset) user cache hit-rate counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = user_cache.shared_stats()
+        total = sum(stats.values())
+        self.stdout.write(f"Local LRU hits:     {stats['local_hits']}")
+        self.stdout.write(f"Shared cache hits:  {stats['shared_hits']}")
+        self.stdout.write(f"Database loads:     {stats['misses']}")
+        if total:
+            hit_rate = (stats['local_hits'] + stats['shared_hits']) / total
+            self.stdout.write(f'Hit rate:           {hit_rate:.1%} of {total} lookups')
+        else:
+            self.stdout.write('No lookups recorded yet.')
+        if options['reset']:
+            user_cache.reset_stats()
+            self.stdout.write('Counters reset.')
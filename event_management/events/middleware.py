@@ -0,0 +1,161 @@
+"""
+Adaptive load shedding.
+
+Requests are rejected with 503 and Retry-After while too many requests are
+already in flight in this process, or while recent database queries have
+been slower than the configured threshold. Shedding early keeps latency
+bounded for the requests that are admitted instead of letting every
+request queue up behind an overloaded database.
+
+The middleware is sync and async capable, so async views (login,
+register, live streams) stay on the event loop under ASGI. Query times
+are taken by a hook on every connection, for queries made in an admitted
+request's context (including the sync_to_async threads its views run in).
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_IN_FLIGHT': 100,
+    'DB_LATENCY_THRESHOLD': 0.5,  # Seconds, smoothed average per query
+    'LATENCY_SAMPLE_TTL': 5.0,  # Seconds before a latency reading goes stale
+    'RETRY_AFTER': 5,
+    'EXEMPT_PATHS': ['/admin/', '/healthz'],
+}
+
+
+def shedding_setting(name):
+    """Read a LOAD_SHEDDING setting, falling back to the module default."""
+    return getattr(settings, 'LOAD_SHEDDING', {}).get(name, DEFAULTS[name])
+
+
+class LoadMonitor:
+    """Process-wide in-flight counter and smoothed database query latency."""
+    smoothing = 0.2
+
+    def __init__(self):
+        self.in_flight = 0
+        self.db_latency = 0.0
+        self.sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            return self.in_flight
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_query(self, duration):
+        with self._lock:
+            self.db_latency += self.smoothing * (duration - self.db_latency)
+            self.sampled_at = time.monotonic()
+
+    def current_db_latency(self):
+        if time.monotonic() - self.sampled_at > shedding_setting('LATENCY_SAMPLE_TTL'):
+            return 0.0
+        return self.db_latency
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.db_latency = 0.0
+            self.sampled_at = 0.0
+
+
+monitor = LoadMonitor()
+_admitted = ContextVar('load_shedding_admitted', default=False)
+
+
+def _timed_query(execute, sql, params, many, context):
+    if not _admitted.get():
+        return execute(sql, params, many, context)
+    start = time.monotonic()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        monitor.record_query(time.monotonic() - start)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    """Add the query timer to every connection, once."""
+    if _timed_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks open at connect time pop their own wrapper
+        connection.execute_wrappers.insert(0, _timed_query)
+
+
+class LoadSheddingMiddleware:
+    """Reject requests with 503 while the process or database is overloaded."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def exempt(self, request):
+        return not shedding_setting('ENABLED') or request.path.startswith(tuple(shedding_setting('EXEMPT_PATHS')))
+
+    def overloaded(self, in_flight):
+        if in_flight > shedding_setting('MAX_IN_FLIGHT'):
+            return 'Too many requests in flight.'
+        if monitor.current_db_latency() > shedding_setting('DB_LATENCY_THRESHOLD'):
+            return 'Database is responding slowly.'
+        return None
+
+    def shed(self, reason):
+        response = JsonResponse(
+            {'detail': f'Service temporarily overloaded. {reason}'},
+            status=503
+        )
+        response['Retry-After'] = str(shedding_setting('RETRY_AFTER'))
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.exempt(request):
+            return self.get_response(request)
+
+        in_flight = monitor.enter()
+        try:
+            reason = self.overloaded(in_flight)
+            if reason:
+                return self.shed(reason)
+            token = _admitted.set(True)
+            try:
+                return self.get_response(request)
+            finally:
+                _admitted.reset(token)
+        finally:
+            monitor.leave()
+
+    async def __acall__(self, request):
+        if self.exempt(request):
+            return await self.get_response(request)
+
+        in_flight = monitor.enter()
+        try:
+            reason = self.overloaded(in_flight)
+            if reason:
+                return self.shed(reason)
+            token = _admitted.set(True)
+            try:
+                return await self.get_response(request)
+            finally:
+                _admitted.reset(token)
+        finally:
+            monitor.leave()
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEventStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField()),
+                ('bucket', models.DateTimeField()),
+                ('new_rsvps', models.IntegerField(default=0)),
+                ('going', models.IntegerField(default=0)),
+                ('maybe', models.IntegerField(default=0)),
+                ('not_going', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('organizer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['organizer', 'bucket'], name='dailyeventstats_org_bucket'), models.Index(fields=['bucket'], name='dailyeventstats_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('event_id', 'bucket'), name='dailyeventstats_event_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyEventStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField()),
+                ('bucket', models.DateTimeField()),
+                ('new_rsvps', models.IntegerField(default=0)),
+                ('going', models.IntegerField(default=0)),
+                ('maybe', models.IntegerField(default=0)),
+                ('not_going', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('organizer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['organizer', 'bucket'], name='hourlyeventstats_org_bucket'), models.Index(fields=['bucket'], name='hourlyeventstats_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('event_id', 'bucket'), name='hourlyeventstats_event_bucket')],
+            },
+        ),
+    ]
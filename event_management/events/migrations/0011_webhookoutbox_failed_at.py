@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_idempotency_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookoutbox',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# The admin's '^title' / '^location' searches run UPPER(col) LIKE 'X%' on
+# PostgreSQL, which only an index on UPPER(col) with text_pattern_ops can
+# serve. MySQL's case-insensitive collations use the plain column index;
+# SQLite scans.
+INDEXES = [
+    ('event_title_upper_prefix', 'events_event', 'title'),
+    ('event_location_upper_prefix', 'events_event', 'location'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} (UPPER({quote(column)}) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_webhookoutbox_failed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -22,13 +24,20 @@ class Event(models.Model):
     Event model representing an event in the system.
     Can be public or private.
     """
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     description = models.TextField()
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_events')
     location = models.CharField(max_length=255)
-    start_time = models.DateTimeField()
-    end_time = models.DateTimeField()
+    start_time = models.DateTimeField(db_index=True)
+    end_time = models.DateTimeField(db_index=True)
     is_public = models.BooleanField(default=True)
+    # RRULE subset (see events.recurrence); blank for one-off events
+    recurrence = models.CharField(max_length=255, blank=True)
+    # Set on stored occurrences of a recurring event
+    series = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='occurrences'
+    )
+    occurrence_start = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,6 +46,22 @@ class Event(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'occurrence_start'], name='unique_series_occurrence'),
+        ]
+
+
+class EventChildQuerySet(models.QuerySet):
+    """
+    QuerySet for RSVPs and reviews. create() without using() writes to the
+    new row's shard (see events.sharding) instead of the default database.
+    """
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db or router.db_for_write(self.model, instance=obj))
+        return obj
 
 
 class RSVP(models.Model):
@@ -54,12 +79,15 @@ class RSVP(models.Model):
         (NOT_GOING, 'Not Going'),
     ]
 
-    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rsvps')
+    # No database constraints: the rows may live on another shard than events and users
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps', db_constraint=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rsvps', db_constraint=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=GOING)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventChildQuerySet.as_manager()
+
     class Meta:
         unique_together = ('event', 'user')
         ordering = ['-created_at']
@@ -73,15 +101,230 @@ class Review(models.Model):
     Review model for events.
     Users can leave ratings and comments for events.
     """
-    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reviews')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
+    # No database constraints: the rows may live on another shard than events and users
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reviews', db_constraint=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews', db_constraint=False)
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])  # 1-5 stars
     comment = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EventChildQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.event.title} - {self.rating} stars"
+
+
+class WebhookSubscription(models.Model):
+    """
+    Outbound webhook endpoint registered by an organizer.
+    Receives RSVP and review changes for the organizer's events.
+    """
+    organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=True)
+    max_concurrency = models.PositiveSmallIntegerField(default=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.organizer.username} - {self.url}"
+
+
+class WebhookOutbox(models.Model):
+    """
+    Pending webhook delivery.
+    Rows are written in the same transaction as the RSVP/Review change
+    and drained asynchronously by the delivery worker.
+    """
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='outbox')
+    event_type = models.CharField(max_length=50)
+    object_key = models.CharField(max_length=100)
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    delivered_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    failed_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Gave up after MAX_ATTEMPTS
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.event_type} -> {self.subscription.url}"
+
+
+class ArchivedEvent(models.Model):
+    """
+    Finished event moved out of the hot Event table by `archive_events`.
+    Keeps the original id and timestamps.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_events')
+    location = models.CharField(max_length=255)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    is_public = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedRSVP(models.Model):
+    """RSVP of an archived event."""
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='rsvps')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_rsvps')
+    status = models.CharField(max_length=20, choices=RSVP.STATUS_CHOICES, default=RSVP.GOING)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.event.title} - {self.status}"
+
+
+class ArchivedReview(models.Model):
+    """Review of an archived event."""
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_reviews')
+    rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])
+    comment = models.TextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title} - {self.rating} stars"
+
+
+class EventStats(models.Model):
+    """
+    Activity of one event in one time bucket, maintained by events.analytics.
+    Counters are net changes during the bucket, so summing every bucket of
+    an event gives its current RSVP breakdown and review totals.
+    """
+    # A plain id rather than a foreign key, so rollups outlive archived events
+    event_id = models.BigIntegerField()
+    organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    bucket = models.DateTimeField()
+    new_rsvps = models.IntegerField(default=0)
+    going = models.IntegerField(default=0)
+    maybe = models.IntegerField(default=0)
+    not_going = models.IntegerField(default=0)
+    reviews = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['event_id', 'bucket'], name='%(class)s_event_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['organizer', 'bucket'], name='%(class)s_org_bucket'),
+            models.Index(fields=['bucket'], name='%(class)s_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class HourlyEventStats(EventStats):
+    """Hourly rollup, updated on every RSVP/review write."""
+
+    class Meta(EventStats.Meta):
+        pass
+
+
+class DailyEventStats(EventStats):
+    """Daily rollup, filled by compacting hourly rows (`compact_analytics`)."""
+
+    class Meta(EventStats.Meta):
+        pass
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for a POST sent with an Idempotency-Key header
+    (see events.idempotency). A row without a status code belongs to a
+    request that is still being processed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+    @property
+    def is_complete(self):
+        return self.status_code is not None
+
+
+class ChangeLogEntry(models.Model):
+    """
+    One create, update, delete or archival of an event, RSVP or review
+    (see events.changelog). `seq` orders the log; `data` holds the row
+    after the change and is null for deletions and archivals.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ARCHIVED = 'archived'
+
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+        (ARCHIVED, 'Archived'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    object_type = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    event_id = models.BigIntegerField()
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['object_type', 'object_id', 'seq'], name='changelog_object_seq'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.object_type} {self.object_id} {self.action}"
+
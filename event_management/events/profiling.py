@@ -0,0 +1,440 @@
+"""
+Opt-in request tracing and sampling profiler.
+
+With PROFILING['ENABLED'], ProfilingMiddleware traces every request: named
+spans time the phases of a DRF request (auth, permissions, throttling,
+queryset, filters, pagination, serialization, rendering), SQL time and
+query counts are taken from every database alias, and the totals are
+sent back in a `Server-Timing` header and aggregated per endpoint (see
+`profile_stats`). Only the viewsets using TracedViewMixin and the
+projection, serializer and renderer paths record spans; other views
+report just `db` and `total`.
+
+Every connection gets a query hook when it connects, which adds to the
+trace in the current context. That covers the request's own thread and,
+under ASGI, the sync_to_async threads its views run in. Queries in other
+threads, such as authenticate() in the password hashing pool, do not
+carry the context and are not part of `db`. The middleware is sync and
+async capable, so async views are not moved into a thread by it.
+
+A request is also profiled when a staff user sends `X-Profile: 1`, or
+when it is picked by PROFILING['SAMPLE_RATE']. A sampler thread then
+reads the request thread's stack every PROFILING['INTERVAL'] seconds and
+writes the stacks to PROFILING['PROFILE_DIR'] as a collapsed-stack
+`.folded` file, which flamegraph.pl or speedscope turn into a flame
+graph. Each stack starts with the span it was taken in. Under ASGI a
+sampled profile starts once the view authenticates the request, in the
+thread it runs in, rather than on the event loop. At most
+PROFILING['MAX_CONCURRENT_PROFILES'] requests per process are profiled
+at once, each for at most PROFILING['MAX_SECONDS']; other requests that
+ask for a profile are only traced. A staff-requested profile starts once
+the user is authenticated, so it does not cover the middleware before it.
+
+When PROFILING['ENABLED'] is off the middleware costs one settings lookup
+per request, and span() and each query one context variable read; span()
+returns a shared no-op context manager.
+"""
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'SAMPLE_RATE': 0.0,
+    'HEADER': 'X-Profile',
+    'INTERVAL': 0.005,
+    'MAX_SECONDS': 30,
+    'MAX_CONCURRENT_PROFILES': 1,
+    'MAX_DEPTH': 128,
+    'PROFILE_DIR': 'profiles',
+    'CACHE_ALIAS': 'default',
+    'STATS_FLUSH_EVERY': 100,
+}
+
+_trace = ContextVar('profiling_trace', default=None)
+_NOOP = nullcontext()
+_profile_slots = None
+_profile_slots_lock = threading.Lock()
+
+
+def profiling_setting(name):
+    """Read a PROFILING setting, falling back to the module default."""
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def current_trace():
+    return _trace.get()
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'parent', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.parent = self.trace.current
+        self.trace.current = self.name
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        spans = self.trace.spans
+        spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.started
+        self.trace.current = self.parent
+        return False
+
+
+def span(name):
+    """
+    Context manager adding the time spent in its block to span `name` of
+    the current request's trace. A no-op outside a traced request. Spans
+    may nest, but a span should not contain another of the same name.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name)
+
+
+def traced(name):
+    """Decorator running the function in span `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record_query(execute, sql, params, many, context):
+    trace = _trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    return trace.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_hook(sender, connection, **kwargs):
+    """Add the tracing hook to every connection, once, on any alias."""
+    if _record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks open at connect time pop their own wrapper
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def _slots():
+    global _profile_slots
+    with _profile_slots_lock:
+        if _profile_slots is None:
+            _profile_slots = threading.BoundedSemaphore(profiling_setting('MAX_CONCURRENT_PROFILES'))
+        return _profile_slots
+
+
+class Sampler(threading.Thread):
+    """Counts the collapsed stacks of one thread until stopped."""
+
+    def __init__(self, trace, thread_id):
+        super().__init__(name='request-profiler', daemon=True)
+        self.trace = trace
+        self.thread_id = thread_id
+        self.interval = profiling_setting('INTERVAL')
+        self.max_seconds = profiling_setting('MAX_SECONDS')
+        self.max_depth = profiling_setting('MAX_DEPTH')
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[self.collapse(frame, self.trace.current or 'request')] += 1
+
+    def collapse(self, frame, phase):
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f'{getattr(code, "co_qualname", code.co_name)} ({_short_path(code.co_filename)})')
+            frame = frame.f_back
+        frames.append(f'[{phase}]')
+        return ';'.join(reversed(frames))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _short_path(filename):
+    """Path relative to the project or the site-packages directory it is in."""
+    for marker in ('site-packages' + os.sep, 'lib' + os.sep + 'python'):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    base = str(settings.BASE_DIR) + os.sep
+    return filename[len(base):] if filename.startswith(base) else filename
+
+
+class Trace:
+    """Span timings, query counts and the optional profile of one request."""
+
+    def __init__(self):
+        self.spans = {}
+        self.current = None
+        self.queries = 0
+        self.started = time.perf_counter()
+        self.duration = None
+        self.sampler = None
+        self.profile_requested = False
+        self.profile_sampled = False
+        self.profile_path = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.spans['db'] = self.spans.get('db', 0.0) + time.perf_counter() - started
+            self.queries += 1
+
+    def start_profiler(self):
+        """Start sampling the calling thread, unless every profile slot is taken."""
+        if self.sampler is not None or not _slots().acquire(blocking=False):
+            return False
+        self.sampler = Sampler(self, threading.get_ident())
+        self.sampler.start()
+        return True
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        if self.sampler is not None:
+            self.sampler.stop()
+            _slots().release()
+
+    def write_profile(self, endpoint):
+        """Write the sampled stacks as a collapsed-stack file and return its path."""
+        if self.sampler is None or not self.sampler.stacks:
+            return None
+        directory = profiling_setting('PROFILE_DIR')
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint.replace(':', '-')}-{uuid.uuid4().hex[:8]}.folded"
+        self.profile_path = os.path.join(directory, name)
+        with open(self.profile_path, 'w') as stream:
+            for stack, count in self.sampler.stacks.most_common():
+                stream.write(f'{stack} {count}\n')
+        return self.profile_path
+
+    def server_timing(self):
+        """`Server-Timing` header value, in milliseconds."""
+        metrics = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.spans.items() if name != 'db']
+        if self.queries:
+            metrics.append(f'db;dur={self.spans["db"] * 1000:.2f};desc="{self.queries} queries"')
+        metrics.append(f'total;dur={self.duration * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+class EndpointStats:
+    """
+    Per-endpoint request counts and span times, summed locally and added
+    to the cache backend every PROFILING['STATS_FLUSH_EVERY'] requests.
+    Times are stored in microseconds.
+    """
+    index_key = 'profile-stats:endpoints'
+
+    def __init__(self):
+        self.totals = defaultdict(Counter)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[profiling_setting('CACHE_ALIAS')]
+
+    def key(self, endpoint, name):
+        return f'profile-stats:{endpoint}:{name}'
+
+    def record(self, endpoint, trace):
+        with self._lock:
+            totals = self.totals[endpoint]
+            totals['requests'] += 1
+            totals['queries'] += trace.queries
+            totals['total'] += int(trace.duration * 1e6)
+            for name, seconds in trace.spans.items():
+                totals[name] += int(seconds * 1e6)
+            self._pending += 1
+            if self._pending < profiling_setting('STATS_FLUSH_EVERY'):
+                return
+            self._pending = 0
+            pending, self.totals = self.totals, defaultdict(Counter)
+        self.flush(pending)
+
+    def flush(self, pending=None):
+        if pending is None:
+            with self._lock:
+                pending, self.totals = self.totals, defaultdict(Counter)
+                self._pending = 0
+        if not pending:
+            return
+        backend = self.backend
+        index = backend.get(self.index_key) or {}
+        merged = {endpoint: sorted(set(index.get(endpoint, ())) | set(totals)) for endpoint, totals in pending.items()}
+        if any(merged[endpoint] != index.get(endpoint) for endpoint in merged):
+            backend.set(self.index_key, {**index, **merged}, timeout=None)
+        for endpoint, totals in pending.items():
+            for name, value in totals.items():
+                if value:
+                    key = self.key(endpoint, name)
+                    backend.add(key, 0, timeout=None)
+                    backend.incr(key, value)
+
+    def shared_stats(self):
+        """{endpoint: {name: total}} flushed to the shared backend by every process."""
+        index = self.backend.get(self.index_key) or {}
+        keys = {self.key(endpoint, name): (endpoint, name) for endpoint, names in index.items() for name in names}
+        values = self.backend.get_many(keys)
+        stats = defaultdict(dict)
+        for key, (endpoint, name) in keys.items():
+            stats[endpoint][name] = values.get(key, 0)
+        return dict(stats)
+
+    def reset(self):
+        with self._lock:
+            self.totals = defaultdict(Counter)
+            self._pending = 0
+        index = self.backend.get(self.index_key) or {}
+        self.backend.delete_many(
+            [self.key(endpoint, name) for endpoint, names in index.items() for name in names] + [self.index_key]
+        )
+
+
+endpoint_stats = EndpointStats()
+
+
+def endpoint_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method}:{match.view_name if match else 'unresolved'}"
+
+
+class ProfilingMiddleware:
+    """Trace requests, and profile some of them, while PROFILING['ENABLED'] is on."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start_trace(self, request, sample_here):
+        trace = Trace()
+        if request.headers.get(profiling_setting('HEADER')) == '1':
+            # Honoured for staff users once DRF has authenticated the request
+            trace.profile_requested = True
+        elif random.random() < profiling_setting('SAMPLE_RATE'):
+            if sample_here:
+                trace.start_profiler()
+            else:
+                trace.profile_sampled = True
+        return trace
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling_setting('ENABLED'):
+            return self.get_response(request)
+
+        trace = self.start_trace(request, sample_here=True)
+        token = _trace.set(trace)
+        try:
+            response = self.get_response(request)
+        finally:
+            _trace.reset(token)
+            trace.finish()
+        return self.finish_trace(request, trace, response)
+
+    async def __acall__(self, request):
+        if not profiling_setting('ENABLED'):
+            return await self.get_response(request)
+
+        # The event loop thread is not worth sampling; the view starts the profiler
+        trace = self.start_trace(request, sample_here=False)
+        token = _trace.set(trace)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _trace.reset(token)
+            trace.finish()
+        return self.finish_trace(request, trace, response)
+
+    def finish_trace(self, request, trace, response):
+        endpoint = endpoint_of(request)
+        path = trace.write_profile(endpoint)
+        if path and trace.profile_requested:
+            response['X-Profile-File'] = os.path.basename(path)
+        if profiling_setting('SERVER_TIMING'):
+            response['Server-Timing'] = trace.server_timing()
+        endpoint_stats.record(endpoint, trace)
+        return response
+
+
+class TracedViewMixin:
+    """
+    Viewset mixin timing the DRF request phases as profiling spans, and
+    starting the profiler for staff users who ask for it. Viewsets mark
+    their own get_queryset() with @traced('queryset'). The SQL that lazy
+    querysets run is counted where they are evaluated (pagination or
+    serialization) and in the `db` span.
+    """
+
+    def perform_authentication(self, request):
+        with span('auth'):
+            super().perform_authentication(request)
+        trace = _trace.get()
+        if trace is not None and (trace.profile_sampled or (trace.profile_requested and request.user.is_staff)):
+            trace.start_profiler()
+
+    def check_permissions(self, request):
+        with span('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        with span('throttling'):
+            super().check_throttles(request)
+
+    def filter_queryset(self, queryset):
+        with span('filters'):
+            return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        with span('pagination'):
+            return super().paginate_queryset(queryset)
+
+
+class TracedSerializerMixin:
+    """Serializer mixin timing `.data` as the serialization span."""
+
+    @property
+    def data(self):
+        with span('serialization'):
+            return super().data
@@ -0,0 +1,315 @@
+"""
+Read-optimized projections for the hot list/detail endpoints.
+
+Each projection turns a queryset into a values() query with the related
+and aggregate columns its serializer needs, then builds the response dicts
+with precompiled per-field converters. The output is identical to the
+matching ModelSerializer's `.data`, without instantiating models or
+running the serializer field machinery per object.
+
+A projection can be narrowed to a subset of fields (`?fields=`) and can
+replace foreign key ids with small nested objects (`?expand=`). Only the
+columns and aggregates backing the selected output are queried.
+
+Serializers remain the source of truth for writes and validation; keep
+the `fields` tuples below in the same order as their Meta.fields.
+
+When RSVPs and reviews are sharded (see events.sharding), nothing can join
+across databases: event counts, user names and event titles are looked
+up per page in prepare() instead.
+"""
+from django.db.models import CharField, Count, DateTimeField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from .cache import display_name, user_cache
+from .models import Event, RSVP, Review, ArchivedRSVP, ArchivedReview
+from .profiling import span
+from . import sharding
+
+
+_datetime = serializers.DateTimeField()
+
+
+def to_datetime(value):
+    return _datetime.to_representation(value)
+
+
+def parse_field_list(value):
+    """Split a comma-separated query parameter into a list, or None if absent."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _per_event(model, aggregate):
+    """Correlated subquery computing an aggregate over one event's rows."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(event=OuterRef('pk'))
+            .order_by()
+            .values('event')
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class Projection:
+    """
+    Base projection.
+
+    `sources` maps an output field to the values() keys it reads (default:
+    the field name itself); `converters` maps output fields to a callable
+    applied to the raw value; `computed` maps output fields to a callable
+    taking the whole row; `expansions` maps an expandable field to
+    (sources, callable(row)) producing its nested object; `annotations()`
+    returns the expressions for computed columns; `prepare()` can enrich
+    a whole page of rows before they are represented.
+    """
+    fields = ()
+    sources = {}
+    converters = {}
+    computed = {}
+    expansions = {}
+
+    def __init__(self, fields=None, expand=None):
+        unknown = set(fields or ()) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        unknown = set(expand or ()) - set(self.expansions)
+        if unknown:
+            raise serializers.ValidationError({'expand': f"Unknown expansion(s): {', '.join(sorted(unknown))}."})
+
+        # Expanding a field implies selecting it
+        selected = set(fields) | set(expand or ()) if fields else set(self.fields)
+        self.selected = tuple(name for name in self.fields if name in selected)
+        self.expanded = frozenset(expand or ())
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(
+            fields=parse_field_list(request.query_params.get('fields')),
+            expand=parse_field_list(request.query_params.get('expand')),
+        )
+
+    def annotations(self):
+        return {}
+
+    def columns(self):
+        """values() keys backing the selected output, in a stable order."""
+        keys = []
+        for name in self.selected:
+            if name in self.expanded:
+                keys.extend(self.expansions[name][0])
+            else:
+                keys.extend(self.sources.get(name, (name,)))
+        return list(dict.fromkeys(keys))
+
+    def project(self, queryset, extra=()):
+        """
+        Return a values() queryset with only the columns the output needs,
+        plus any `extra` columns (e.g. for ordering a union).
+        """
+        available = self.annotations()
+        columns = list(dict.fromkeys([*self.columns(), *extra]))
+        annotations = {key: available[key] for key in columns if key in available}
+        return queryset.annotate(**annotations).values(*columns)
+
+    def prepare(self, rows):
+        pass
+
+    def represent(self, row):
+        data = {}
+        for name in self.selected:
+            if name in self.expanded:
+                data[name] = self.expansions[name][1](row)
+                continue
+            if name in self.computed:
+                data[name] = self.computed[name](row)
+                continue
+            value = row[name]
+            converter = self.converters.get(name)
+            data[name] = converter(value) if converter is not None and value is not None else value
+        return data
+
+    def represent_many(self, rows):
+        with span('serialization'):
+            rows = list(rows)
+            self.prepare(rows)
+            represent = self.represent
+            return [represent(row) for row in rows]
+
+
+def _average_rating(row):
+    """Mirror EventSerializer.get_average_rating."""
+    if row['review_count']:
+        return round(row['rating_sum'] / row['review_count'], 2)
+    return None
+
+
+COUNT_COLUMNS = ('rsvp_count', 'review_count', 'rating_sum')
+
+
+class EventProjection(Projection):
+    """Projection matching EventSerializer output."""
+    rsvp_model = RSVP
+    review_model = Review
+    fields = (
+        'id', 'title', 'description', 'organizer', 'organizer_username',
+        'organizer_name', 'location', 'start_time', 'end_time', 'is_public',
+        'recurrence', 'series', 'occurrence_start',
+        'created_at', 'updated_at', 'rsvp_count', 'review_count', 'average_rating'
+    )
+    sources = {
+        'organizer_username': ('organizer',),
+        'organizer_name': ('organizer',),
+        'average_rating': ('review_count', 'rating_sum'),
+    }
+    converters = {
+        'start_time': to_datetime,
+        'end_time': to_datetime,
+        'occurrence_start': to_datetime,
+        'created_at': to_datetime,
+        'updated_at': to_datetime,
+    }
+    computed = {
+        'organizer_username': lambda row: row['_organizer']['username'],
+        'organizer_name': lambda row: display_name(row['_organizer']),
+        'average_rating': _average_rating,
+    }
+    expansions = {
+        'organizer': (
+            ('organizer',),
+            lambda row: {
+                'id': row['organizer'],
+                'username': row['_organizer']['username'],
+                'name': display_name(row['_organizer']),
+            },
+        ),
+    }
+
+    def columns(self):
+        keys = super().columns()
+        if sharding.is_sharded() and 'id' not in keys and set(COUNT_COLUMNS) & set(keys):
+            # Shard counts are looked up by event id
+            keys.append('id')
+        return keys
+
+    def prepare(self, rows):
+        """
+        Resolve organizer names for the whole page from the user cache, and
+        fill in counts left to the shards.
+        """
+        pending = [row for row in rows if any(row.get(key, 0) is None for key in COUNT_COLUMNS)]
+        if pending:
+            counts = sharding.event_counts({row['id'] for row in pending})
+            for row in pending:
+                row.update((key, value) for key, value in counts[row['id']].items() if key in row)
+
+        if not ({'organizer_username', 'organizer_name'} & set(self.selected) or 'organizer' in self.expanded):
+            return
+        organizers = user_cache.get_many({row['organizer'] for row in rows})
+        for row in rows:
+            row['_organizer'] = organizers[row['organizer']]
+
+    def annotations(self):
+        if sharding.is_sharded() and self.rsvp_model is RSVP:
+            # Counted on the shards in prepare()
+            return {key: Value(None, output_field=IntegerField()) for key in COUNT_COLUMNS}
+        return {
+            'rsvp_count': _per_event(self.rsvp_model, Count('pk')),
+            'review_count': _per_event(self.review_model, Count('pk')),
+            'rating_sum': _per_event(self.review_model, Sum('rating')),
+        }
+
+
+class ArchivedEventProjection(EventProjection):
+    """EventProjection over the archive tables."""
+    rsvp_model = ArchivedRSVP
+    review_model = ArchivedReview
+
+    def annotations(self):
+        # Recurring series and their stored occurrences are never archived
+        return {
+            **super().annotations(),
+            'recurrence': Value('', output_field=CharField()),
+            'series': Value(None, output_field=IntegerField()),
+            'occurrence_start': Value(None, output_field=DateTimeField()),
+        }
+
+
+# Joined columns and the foreign key prepare() resolves them from
+_RELATED = {'user__username': 'user', 'event__title': 'event', 'event__start_time': 'event'}
+
+
+class _EventChildProjection(Projection):
+    """Shared sources and expansions for RSVP and Review projections."""
+    joined = True
+    sources = {
+        'user_username': ('user__username',),
+        'event_title': ('event__title',),
+    }
+    converters = {
+        'created_at': to_datetime,
+        'updated_at': to_datetime,
+    }
+    computed = {
+        'user_username': lambda row: row['user__username'],
+        'event_title': lambda row: row['event__title'],
+    }
+    expansions = {
+        'user': (
+            ('user', 'user__username'),
+            lambda row: {'id': row['user'], 'username': row['user__username']},
+        ),
+        'event': (
+            ('event', 'event__title', 'event__start_time'),
+            lambda row: {
+                'id': row['event'],
+                'title': row['event__title'],
+                'start_time': to_datetime(row['event__start_time']),
+            },
+        ),
+    }
+
+    def project(self, queryset, extra=()):
+        # Rows on the shards cannot join users and events
+        self.joined = not (sharding.is_sharded() and queryset.model in sharding.SHARDED_MODELS)
+        return super().project(queryset, extra)
+
+    def columns(self):
+        keys = super().columns()
+        if self.joined:
+            return keys
+        return list(dict.fromkeys(_RELATED.get(key, key) for key in keys))
+
+    def prepare(self, rows):
+        """Look up the user names and event fields the shards cannot join."""
+        if self.joined or not rows:
+            return
+        needed = set(super().columns()) & set(_RELATED)
+        if 'user__username' in needed:
+            users = user_cache.get_many({row['user'] for row in rows})
+            for row in rows:
+                row['user__username'] = users[row['user']]['username']
+        if needed & {'event__title', 'event__start_time'}:
+            events = Event.objects.only('title', 'start_time').in_bulk({row['event'] for row in rows})
+            for row in rows:
+                event = events[row['event']]
+                row['event__title'], row['event__start_time'] = event.title, event.start_time
+
+
+class RSVPProjection(_EventChildProjection):
+    """Projection matching RSVPSerializer output."""
+    fields = ('id', 'event', 'user', 'user_username', 'event_title', 'status', 'created_at', 'updated_at')
+
+
+class ReviewProjection(_EventChildProjection):
+    """Projection matching ReviewSerializer output."""
+    fields = (
+        'id', 'event', 'user', 'user_username', 'event_title', 'rating', 'comment',
+        'created_at', 'updated_at'
+    )
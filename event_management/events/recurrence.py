@@ -0,0 +1,311 @@
+"""
+Recurring events.
+
+A series is a single Event row with a `recurrence` rule. Its occurrences
+are expanded lazily, only for the window being read; an occurrence is
+stored as its own Event row (linked through `series`/`occurrence_start`)
+only once it gets RSVPs, reviews or organizer overrides.
+
+Supported RRULE subset:
+
+    FREQ=DAILY|WEEKLY|MONTHLY   required
+    INTERVAL=n                  default 1
+    BYDAY=MO,TU,...             WEEKLY only
+    COUNT=n or UNTIL=YYYYMMDD[THHMMSSZ]
+
+Occurrences keep the series' start time of day and duration, and are
+expanded in UTC. Like dateutil, monthly rules skip months without the
+start day, and weekly BYDAY rules only yield the listed weekdays.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.db import models
+
+from .models import Event
+from .projections import to_datetime
+
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+class RecurrenceRule:
+    """Parsed recurrence rule."""
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = tuple(sorted(set(byday)))
+
+    @classmethod
+    def parse(cls, text):
+        """Parse an RRULE string, raising ValueError on anything outside the subset."""
+        parts = {}
+        for part in text.upper().removeprefix('RRULE:').split(';'):
+            if not part:
+                continue
+            name, sep, value = part.partition('=')
+            if not sep or not value:
+                raise ValueError(f'Malformed rule part "{part}".')
+            if name in parts:
+                raise ValueError(f'{name} is given more than once.')
+            parts[name] = value
+
+        unknown = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+        if unknown:
+            raise ValueError(f"Unsupported rule part(s): {', '.join(sorted(unknown))}.")
+        freq = parts.get('FREQ')
+        if freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}.")
+        if 'COUNT' in parts and 'UNTIL' in parts:
+            raise ValueError('COUNT and UNTIL cannot be combined.')
+
+        interval = _positive_int(parts, 'INTERVAL', default=1)
+        count = _positive_int(parts, 'COUNT')
+        until = _parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+
+        byday = ()
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise ValueError('BYDAY is only supported with FREQ=WEEKLY.')
+            names = parts['BYDAY'].split(',')
+            if not set(names) <= set(WEEKDAYS):
+                raise ValueError(f"BYDAY days must be among {', '.join(WEEKDAYS)}.")
+            byday = [WEEKDAYS.index(name) for name in names]
+
+        return cls(freq, interval, count, until, byday)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append(f"BYDAY={','.join(WEEKDAYS[day] for day in self.byday)}")
+        if self.count:
+            parts.append(f'COUNT={self.count}')
+        if self.until:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%SZ')}")
+        return ';'.join(parts)
+
+    def between(self, dtstart, start=None, end=None):
+        """
+        Yield occurrence start times from dtstart, in order, that fall in
+        [start, end). Unbounded rules without `end` yield forever, so the
+        caller must bound iteration.
+        """
+        if self.freq == 'MONTHLY':
+            candidates = self._monthly(dtstart)
+        elif self.byday:
+            candidates = self._weekly_byday(dtstart, start)
+        else:
+            step = timedelta(days=self.interval * (7 if self.freq == 'WEEKLY' else 1))
+            candidates = self._fixed_step(dtstart, step, start)
+
+        for index, value in candidates:
+            if self.count is not None and index >= self.count:
+                return
+            if self.until is not None and value > self.until:
+                return
+            if end is not None and value >= end:
+                return
+            if start is None or value >= start:
+                yield value
+
+    def includes(self, dtstart, value):
+        """Whether value is one of the rule's occurrences."""
+        return next(self.between(dtstart, value, value + timedelta(microseconds=1)), None) == value
+
+    # Each generator yields (index, start) with index counting occurrences
+    # from dtstart, so COUNT holds even when the window skips ahead.
+
+    def _fixed_step(self, dtstart, step, start):
+        index = 0
+        if start is not None and start > dtstart:
+            steps, remainder = divmod(start - dtstart, step)
+            index = steps + (1 if remainder else 0)
+        while True:
+            yield index, dtstart + index * step
+            index += 1
+
+    def _weekly_byday(self, dtstart, start):
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        step = timedelta(weeks=self.interval)
+        first_week = sum(1 for day in self.byday if day >= dtstart.weekday())
+        week = 0
+        if start is not None and start > week_start:
+            week = (start - week_start) // step
+        while True:
+            base = week_start + week * step
+            index = first_week + (week - 1) * len(self.byday) if week else 0
+            for day in self.byday:
+                if week == 0 and day < dtstart.weekday():
+                    continue
+                yield index, base + timedelta(days=day)
+                index += 1
+            week += 1
+
+    def _monthly(self, dtstart):
+        index = 0
+        month = 0
+        while True:
+            year, month_of_year = divmod(dtstart.month - 1 + month, 12)
+            try:
+                value = dtstart.replace(year=dtstart.year + year, month=month_of_year + 1)
+            except ValueError:
+                # Month without this day, e.g. the 31st
+                value = None
+            if value is not None:
+                yield index, value
+                index += 1
+            month += self.interval
+
+
+def _positive_int(parts, name, default=None):
+    if name not in parts:
+        return default
+    try:
+        value = int(parts[name])
+    except ValueError:
+        raise ValueError(f'{name} must be an integer.')
+    if value < 1:
+        raise ValueError(f'{name} must be at least 1.')
+    return value
+
+
+def _parse_until(value):
+    for fmt in ('%Y%m%dT%H%M%SZ', '%Y%m%d'):
+        try:
+            until = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == '%Y%m%d':
+            until += timedelta(days=1, microseconds=-1)
+        return until.replace(tzinfo=dt_timezone.utc)
+    raise ValueError('UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ.')
+
+
+def materialize(series, original_start):
+    """
+    Return the stored Event row for one occurrence of a series, creating
+    it from the series on first use. Raises ValueError if original_start
+    is not an occurrence of the series.
+    """
+    if not series.recurrence:
+        raise ValueError('This event does not recur.')
+    if not RecurrenceRule.parse(series.recurrence).includes(series.start_time, original_start):
+        raise ValueError('occurrence_start is not an occurrence of this event.')
+    event, _ = Event.objects.get_or_create(
+        series=series,
+        occurrence_start=original_start,
+        defaults={
+            'title': series.title,
+            'description': series.description,
+            'organizer_id': series.organizer_id,
+            'location': series.location,
+            'start_time': original_start,
+            'end_time': original_start + (series.end_time - series.start_time),
+            'is_public': series.is_public,
+        },
+    )
+    return event
+
+
+def occurrence(series, original_start, stored=None):
+    """Calendar entry for one occurrence of a series, virtual or stored."""
+    source = stored or series
+    start_time = stored.start_time if stored else original_start
+    end_time = stored.end_time if stored else original_start + (series.end_time - series.start_time)
+    return {
+        'event': stored.id if stored else None,
+        'series': series.id,
+        'occurrence_start': original_start,
+        'title': source.title,
+        'location': source.location,
+        'start_time': start_time,
+        'end_time': end_time,
+        'is_public': source.is_public,
+        'organizer': source.organizer_id,
+    }
+
+
+def single(event):
+    """Calendar entry for an event that is not part of a series."""
+    return {
+        'event': event.id,
+        'series': event.series_id,
+        'occurrence_start': event.occurrence_start,
+        'title': event.title,
+        'location': event.location,
+        'start_time': event.start_time,
+        'end_time': event.end_time,
+        'is_public': event.is_public,
+        'organizer': event.organizer_id,
+    }
+
+
+def expand_series(series, start=None, end=None):
+    """
+    Lazily yield calendar entries for one series in [start, end).
+    Stored occurrences are listed in place of their virtual counterpart,
+    at their (possibly moved) time. One query loads the stored rows whose
+    original start falls in the window.
+    """
+    rule = RecurrenceRule.parse(series.recurrence)
+    stored = series.occurrences.all()
+    if start is not None:
+        stored = stored.filter(occurrence_start__gte=start)
+    if end is not None:
+        stored = stored.filter(occurrence_start__lt=end)
+    stored = {event.occurrence_start: event for event in stored}
+    for original_start in rule.between(series.start_time, start, end):
+        yield occurrence(series, original_start, stored.get(original_start))
+
+
+def calendar(events, start, end=None, limit=100):
+    """
+    Entries for every event in `events` in [start, end), ordered by start
+    time and capped at `limit`. One-off events (including stored
+    occurrences) are read from the table; series are expanded lazily, so
+    the cost depends on `limit` and the number of series, not on how far
+    ahead the window is.
+    """
+    window = events.filter(start_time__gte=start)
+    if end is not None:
+        window = window.filter(start_time__lt=end)
+    singles = (
+        single(event)
+        for event in window.filter(recurrence='').order_by('start_time', 'id')[:limit].iterator()
+    )
+
+    series = events.exclude(recurrence='').filter(models.Q(start_time__lt=end) if end else models.Q())
+    stored_in_window = set(
+        events.filter(series__in=series, occurrence_start__gte=start)
+        .filter(models.Q(occurrence_start__lt=end) if end else models.Q())
+        .values_list('series', 'occurrence_start')
+    )
+    streams = [singles]
+    for item in series.order_by('id'):
+        rule = RecurrenceRule.parse(item.recurrence)
+        streams.append(
+            occurrence(item, original_start)
+            for original_start in rule.between(item.start_time, start, end)
+            if (item.id, original_start) not in stored_in_window
+        )
+    return list(islice(heapq.merge(*streams, key=lambda entry: entry['start_time']), limit))
+
+
+def represent(entries):
+    """Render calendar entries with the API's datetime format."""
+    return [
+        {
+            **entry,
+            'occurrence_start': to_datetime(entry['occurrence_start']) if entry['occurrence_start'] else None,
+            'start_time': to_datetime(entry['start_time']),
+            'end_time': to_datetime(entry['end_time']),
+        }
+        for entry in entries
+    ]
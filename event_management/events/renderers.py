@@ -0,0 +1,46 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+Produces the same bytes as DRF's JSONRenderer for compact output (the
+default), and falls back to it for indented output, when orjson is not
+installed, or for data orjson cannot encode. Floats that need exponent
+notation (|x| >= 1e16 or < 1e-4) are formatted differently by orjson;
+the API only emits ratings, which are always in plain notation.
+"""
+from rest_framework import renderers
+
+from .profiling import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Drop-in replacement for JSONRenderer that encodes with orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('rendering'):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match JSONRenderer's escaping of the JavaScript line terminators.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -1,6 +1,24 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Event, RSVP, Review
+from django.db import models, transaction
+from .cache import display_name, user_cache
+from .models import UserProfile, Event, RSVP, Review, WebhookSubscription
+from .profiling import TracedSerializerMixin
+from .recurrence import RecurrenceRule
+from . import webhooks
+
+
+class UserCacheListSerializer(TracedSerializerMixin, serializers.ListSerializer):
+    """
+    List serializer that fills the user cache for the whole page in one
+    lookup before each item is serialized. The child serializer provides
+    `cached_user_id(obj)`.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        user_cache.get_many([self.child.cached_user_id(item) for item in items])
+        return super().to_representation(items)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,13 +31,25 @@ class UserSerializer(serializers.ModelSerializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for UserProfile model with nested user information."""
-    username = serializers.CharField(source='user.username', read_only=True)
-    email = serializers.EmailField(source='user.email', read_only=True)
+    username = serializers.SerializerMethodField()
+    email = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
         fields = ['id', 'user', 'username', 'email', 'full_name', 'bio', 'location', 'profile_picture']
         read_only_fields = ['id', 'user']
+        list_serializer_class = UserCacheListSerializer
+
+    def cached_user_id(self, obj):
+        return obj.user_id
+
+    def get_username(self, obj):
+        """Get the user's username from the user cache."""
+        return user_cache.get(obj.user_id)['username']
+
+    def get_email(self, obj):
+        """Get the user's email from the user cache."""
+        return user_cache.get(obj.user_id)['email']
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -38,19 +68,26 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
+        # The async registration view hashes the password in the hashing pool
+        password_hash = validated_data.pop('password_hash', None)
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email', '')),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
-            password=validated_data['password']
         )
-        # Create user profile
-        UserProfile.objects.create(user=user)
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(validated_data['password'])
+        with transaction.atomic():
+            user.save()
+            # Create user profile
+            UserProfile.objects.create(user=user)
         return user
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Event model with nested organizer information."""
     organizer_username = serializers.CharField(source='organizer.username', read_only=True)
     organizer_name = serializers.SerializerMethodField()
@@ -63,15 +100,29 @@ class EventSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'organizer', 'organizer_username', 
             'organizer_name', 'location', 'start_time', 'end_time', 'is_public',
+            'recurrence', 'series', 'occurrence_start',
             'created_at', 'updated_at', 'rsvp_count', 'review_count', 'average_rating'
         ]
-        read_only_fields = ['id', 'organizer', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'organizer', 'series', 'occurrence_start', 'created_at', 'updated_at']
+        list_serializer_class = UserCacheListSerializer
+
+    def validate_recurrence(self, value):
+        """Validate the rule and store it in normalized form."""
+        if not value:
+            return ''
+        if self.instance is not None and self.instance.series_id:
+            raise serializers.ValidationError("An occurrence of a recurring event cannot recur itself.")
+        try:
+            return str(RecurrenceRule.parse(value))
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def cached_user_id(self, obj):
+        return obj.organizer_id
 
     def get_organizer_name(self, obj):
-        """Get organizer's full name or username."""
-        if hasattr(obj.organizer, 'profile') and obj.organizer.profile.full_name:
-            return obj.organizer.profile.full_name
-        return obj.organizer.get_full_name() or obj.organizer.username
+        """Get organizer's full name or username from the user cache."""
+        return display_name(user_cache.get(obj.organizer_id))
 
     def get_rsvp_count(self, obj):
         """Get total RSVP count for the event."""
@@ -89,7 +140,7 @@ class EventSerializer(serializers.ModelSerializer):
         return None
 
 
-class RSVPSerializer(serializers.ModelSerializer):
+class RSVPSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Serializer for RSVP model."""
     user_username = serializers.CharField(source='user.username', read_only=True)
     event_title = serializers.CharField(source='event.title', read_only=True)
@@ -113,7 +164,7 @@ class RSVPSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Review model."""
     user_username = serializers.CharField(source='user.username', read_only=True)
     event_title = serializers.CharField(source='event.title', read_only=True)
@@ -128,3 +179,27 @@ class ReviewSerializer(serializers.ModelSerializer):
         if value < 1 or value > 5:
             raise serializers.ValidationError("Rating must be between 1 and 5.")
         return value
+
+
+class WebhookSubscriptionSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for an organizer's webhook subscriptions."""
+    secret = serializers.CharField(write_only=True, required=False, allow_blank=True)
+
+    class Meta:
+        model = WebhookSubscription
+        fields = ['id', 'url', 'secret', 'is_active', 'max_concurrency', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_url(self, value):
+        """Validate that the endpoint is http(s) on a public address."""
+        try:
+            webhooks.validate_url(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+    def validate_max_concurrency(self, value):
+        """Validate that concurrency is between 1 and 10."""
+        if value < 1 or value > 10:
+            raise serializers.ValidationError("max_concurrency must be between 1 and 10.")
+        return value
@@ -0,0 +1,328 @@
+"""
+Sharding of RSVPs and reviews by event id.
+
+SHARDING['SHARDS'] lists the database aliases holding RSVP and review rows.
+An event's rows all live on shard_for(event_id), chosen by jump consistent
+hashing, so growing from N to N + 1 shards moves only about 1/(N + 1) of
+the events, all of them onto the new shard. Everything else (users,
+events, the archive, webhooks, analytics, idempotency keys) stays on the
+default database.
+
+ShardRouter sends reads and writes of a row (and `event.rsvps` /
+`event.reviews`) to the event's shard. Queries that are not scoped to one
+event, like a user's RSVPs, use fan_out() and ShardedRows to read every
+shard and merge the results. Row ids stay unique across shards because
+shard N issues ids from N * SHARDING['ID_RANGE'] (see reserve_id_ranges()).
+
+With a single shard ('default') every query runs exactly as unsharded.
+
+To add a shard, configure its alias, append it to SHARDS, run `migrate
+--database=<alias>` and then `rebalance_shards`. Until an event's rows
+have been moved they are not visible; writes to it go to the new shard
+and win over the copy being moved.
+
+Writes to a shard other than 'default' do not share a transaction with
+the webhook outbox and analytics rows written on 'default' next to them.
+The admin only shows the default shard's rows. Id ranges can be reserved
+on SQLite, PostgreSQL and MySQL; check_shards() reports other backends
+and unknown aliases as configuration errors when the project starts.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import checks
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+
+from .models import Event, RSVP, Review
+
+
+DEFAULTS = {
+    'SHARDS': [DEFAULT_DB_ALIAS],
+    'ID_RANGE': 10 ** 12,
+}
+
+# Backends reserve_id_ranges() can set id sequences on
+ID_RANGE_VENDORS = ('sqlite', 'postgresql', 'mysql')
+
+SHARDED_MODELS = (RSVP, Review)
+_SHARDED_LABELS = frozenset(model._meta.label_lower for model in SHARDED_MODELS)
+
+
+def shard_setting(name):
+    """Read a SHARDING setting, falling back to the module default."""
+    return getattr(settings, 'SHARDING', {}).get(name, DEFAULTS[name])
+
+
+def shards():
+    return shard_setting('SHARDS')
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping & Veach, 2014) of an integer key."""
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(event_id):
+    """Alias of the shard holding an event's RSVPs and reviews."""
+    aliases = shards()
+    if len(aliases) == 1:
+        return aliases[0]
+    return aliases[jump_hash(int(event_id), len(aliases))]
+
+
+def group_by_shard(event_ids):
+    """{alias: [event ids]} for the shards holding the given events."""
+    groups = defaultdict(list)
+    for event_id in event_ids:
+        groups[shard_for(event_id)].append(event_id)
+    return dict(groups)
+
+
+def for_event(model, event_id):
+    """An event's RSVPs or reviews, read from its shard."""
+    return model.objects.using(shard_for(event_id)).filter(event_id=event_id)
+
+
+def fan_out(queryset):
+    """The queryset once per shard."""
+    return [queryset.using(alias) for alias in shards()]
+
+
+def find(queryset, **lookup):
+    """The first row matching `lookup` on any shard, or None."""
+    for alias in shards():
+        obj = queryset.using(alias).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def event_counts(event_ids):
+    """
+    {event_id: {'rsvp_count', 'review_count', 'rating_sum'}} with one
+    grouped query per model and shard.
+    """
+    counts = {event_id: {'rsvp_count': 0, 'review_count': 0, 'rating_sum': 0} for event_id in event_ids}
+    for alias, ids in group_by_shard(counts).items():
+        rsvps = RSVP.objects.using(alias).filter(event_id__in=ids).order_by()
+        for event_id, count in rsvps.values_list('event_id').annotate(Count('pk')):
+            counts[event_id]['rsvp_count'] = count
+        reviews = Review.objects.using(alias).filter(event_id__in=ids).order_by()
+        for event_id, count, total in reviews.values_list('event_id').annotate(Count('pk'), Sum('rating')):
+            counts[event_id]['review_count'] = count
+            counts[event_id]['rating_sum'] = total or 0
+    return counts
+
+
+def delete_event_rows(event_id):
+    """
+    Delete an event's rows on a shard the default database's cascade does
+    not reach. Runs through delete() so the usual delete signals fire.
+    """
+    alias = shard_for(event_id)
+    if alias != DEFAULT_DB_ALIAS:
+        for model in SHARDED_MODELS:
+            model.objects.using(alias).filter(event_id=event_id).delete()
+
+
+def delete_user_rows(user_id):
+    """Delete a user's rows on every shard other than the default database."""
+    for alias in shards():
+        if alias != DEFAULT_DB_ALIAS:
+            for model in SHARDED_MODELS:
+                model.objects.using(alias).filter(user_id=user_id).delete()
+
+
+class ShardedRows:
+    """
+    Read-only merge of the same values() query on several shards, ordered
+    by `ordering` (which should end in a unique key). Supports count() and
+    slicing, so Django's Paginator can page through it. Items are
+    (stream index, row) pairs, where the index is the position of the
+    row's queryset in `querysets`.
+
+    Slicing [start:stop] reads the first `stop` rows of every queryset, so
+    deep pages cost more than with a single database.
+    """
+    ordered = True
+
+    def __init__(self, querysets, ordering):
+        self.querysets = [queryset.order_by(*ordering) for queryset in querysets]
+        self.ordering = ordering
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        items = [
+            (stream, row)
+            for stream, queryset in enumerate(self.querysets)
+            for row in (queryset[:stop] if stop is not None else queryset)
+        ]
+        # Stable sorts from the last key to the first give a multi-key order
+        for key in reversed(self.ordering):
+            name = key.lstrip('-')
+            items.sort(key=lambda item: (item[1][name] is None, item[1][name]), reverse=key.startswith('-'))
+        return items[start:stop]
+
+
+class ShardRouter:
+    """
+    Routes RSVPs and reviews to their event's shard; every other model
+    lives on the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in _SHARDED_LABELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if isinstance(instance, Event):
+            # event.rsvps / event.reviews
+            return shard_for(instance.pk) if instance.pk is not None else DEFAULT_DB_ALIAS
+        event_id = getattr(instance, 'event_id', None)
+        if event_id is not None:
+            return shard_for(event_id)
+        # Unscoped querysets; use for_event(), fan_out() or using() to reach other shards
+        return DEFAULT_DB_ALIAS
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._meta.label_lower, obj2._meta.label_lower} & _SHARDED_LABELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in shards():
+            return None
+        return f'{app_label}.{model_name}' in _SHARDED_LABELS
+
+
+def reserve_id_ranges(using):
+    """
+    Start the id sequences of the shard `using` at its index * ID_RANGE,
+    unless they are already past it. Called after migrate.
+    """
+    aliases = shards()
+    if using not in aliases or not aliases.index(using):
+        return
+    floor = aliases.index(using) * shard_setting('ID_RANGE')
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model in SHARDED_MODELS:
+            table = model._meta.db_table
+            quoted = connection.ops.quote_name(table)
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, floor])
+                elif row[0] < floor:
+                    cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [floor, table])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {quoted})))",
+                    [table, floor],
+                )
+            elif connection.vendor == 'mysql':
+                # MySQL never sets AUTO_INCREMENT below the current maximum
+                cursor.execute(f'ALTER TABLE {quoted} AUTO_INCREMENT = {floor + 1}')
+            else:
+                raise NotImplementedError(f'Cannot reserve id ranges on {connection.vendor}.')
+
+
+@checks.register()
+def check_shards(app_configs, **kwargs):
+    """Every shard must be a configured database whose id ranges can be reserved."""
+    errors = []
+    for index, alias in enumerate(shards()):
+        if alias not in settings.DATABASES:
+            errors.append(checks.Error(
+                f"SHARDING['SHARDS'] lists '{alias}', which is not in DATABASES.",
+                id='events.E001',
+            ))
+        elif index and connections[alias].vendor not in ID_RANGE_VENDORS:
+            errors.append(checks.Error(
+                f"Shard '{alias}' uses {connections[alias].vendor}; RSVP and review id ranges "
+                f"can only be reserved on {', '.join(ID_RANGE_VENDORS)}.",
+                hint='Use a supported backend for the shard, or extend reserve_id_ranges().',
+                id='events.E002',
+            ))
+    return errors
+
+
+# Rebalancing
+
+def misplaced_events(alias, batch_size=1000):
+    """Yield the ids of events with rows on `alias` that belong on another shard."""
+    for model in SHARDED_MODELS:
+        last = 0
+        while True:
+            event_ids = list(
+                model.objects.using(alias).filter(event_id__gt=last).order_by('event_id')
+                .values_list('event_id', flat=True).distinct()[:batch_size]
+            )
+            if not event_ids:
+                break
+            last = event_ids[-1]
+            yield from (event_id for event_id in event_ids if shard_for(event_id) != alias)
+
+
+def move_event(event_id, source, batch_size=1000):
+    """
+    Move one event's rows from `source` to the event's shard, keeping their
+    ids. The copy commits before the source rows are deleted, so a crash
+    in between leaves duplicates that the next run cleans up; rows already
+    written on the target for the same event and user are kept.
+    Returns (rsvps, reviews) moved.
+    """
+    from .archive import RSVP_FIELDS, REVIEW_FIELDS, _copy, _delete_rows
+
+    target = shard_for(event_id)
+    moved = []
+    for model, fields in ((RSVP, RSVP_FIELDS), (Review, REVIEW_FIELDS)):
+        with transaction.atomic(using=source), transaction.atomic(using=target):
+            rows = model.objects.using(source).filter(event_id=event_id)
+            moved.append(_copy(rows, model, fields, batch_size, using=target))
+            _delete_rows(model, [event_id], using=source)
+    return tuple(moved)
+
+
+def rebalance(sources=None, batch_size=1000, dry_run=False, progress=None):
+    """
+    Move every event's rows to the shard it belongs on. `sources` are the
+    aliases to scan (default: all shards; include retired aliases when
+    shrinking). Returns (events, rsvps, reviews) moved.
+    """
+    totals = [0, 0, 0]
+    for alias in sources or shards():
+        for event_id in list(dict.fromkeys(misplaced_events(alias, batch_size))):
+            if dry_run:
+                rsvps, reviews = (model.objects.using(alias).filter(event_id=event_id).count()
+                                  for model in SHARDED_MODELS)
+            else:
+                rsvps, reviews = move_event(event_id, alias, batch_size)
+            totals = [totals[0] + 1, totals[1] + rsvps, totals[2] + reviews]
+            if progress:
+                progress(alias, event_id, shard_for(event_id), rsvps, reviews)
+    return tuple(totals)
@@ -0,0 +1,115 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, post_migrate
+from django.dispatch import receiver
+
+from .cache import user_cache
+from .models import Event, RSVP, Review, UserProfile
+from . import analytics, changelog, live, sharding, webhooks
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_save, sender=Review)
+def enqueue_webhook_on_save(sender, instance, created, **kwargs):
+    """Queue outbound webhooks for a created or updated RSVP/Review."""
+    webhooks.enqueue(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=Review)
+def enqueue_webhook_on_delete(sender, instance, **kwargs):
+    """Queue outbound webhooks for a deleted RSVP/Review."""
+    webhooks.enqueue(instance, 'deleted')
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=Review)
+def publish_live_update(sender, instance, **kwargs):
+    """Notify live event streams once the change is committed."""
+    event_id = instance.event_id
+    transaction.on_commit(lambda: live.get_hub().notify(event_id))
+
+
+@receiver(post_init, sender=RSVP)
+@receiver(post_init, sender=Review)
+def remember_analytics_state(sender, instance, **kwargs):
+    """Keep what a loaded RSVP/Review adds to the analytics rollups."""
+    instance._analytics_state = analytics.state(instance)
+
+
+@receiver(pre_save, sender=RSVP)
+@receiver(pre_save, sender=Review)
+def load_analytics_state(sender, instance, **kwargs):
+    """Read the stored row when the instance was loaded with deferred fields."""
+    if not instance._state.adding and instance._analytics_state is None:
+        instance._analytics_state = analytics.stored_state(instance)
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_save, sender=Review)
+def track_analytics_on_save(sender, instance, created, raw, **kwargs):
+    """Add the change to the event's hourly rollup in the same transaction."""
+    if raw:
+        return
+    current = analytics.state(instance)
+    analytics.track(instance, None if created else instance._analytics_state, current, created=created)
+    instance._analytics_state = current
+
+
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=Review)
+def track_analytics_on_delete(sender, instance, **kwargs):
+    """Subtract a deleted RSVP/Review from the event's hourly rollup."""
+    analytics.track(instance, analytics.state(instance) or instance._analytics_state, None)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=RSVP)
+@receiver(post_save, sender=Review)
+def log_change_on_save(sender, instance, created, raw, **kwargs):
+    """Append the write to the change log in the same transaction."""
+    if not raw:
+        changelog.record(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=Review)
+def log_change_on_delete(sender, instance, **kwargs):
+    """Append the deletion to the change log in the same transaction."""
+    changelog.record(instance, 'deleted')
+
+
+@receiver(pre_delete, sender=Event)
+def delete_sharded_event_rows(sender, instance, **kwargs):
+    """Cascade an event's deletion to its RSVPs and reviews on another shard."""
+    sharding.delete_event_rows(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_user_rows(sender, instance, **kwargs):
+    """Cascade a user's deletion to their RSVPs and reviews on other shards."""
+    sharding.delete_user_rows(instance.pk)
+
+
+@receiver(post_migrate)
+def reserve_shard_id_ranges(sender, using, **kwargs):
+    """Give a migrated shard its own range of RSVP/review ids."""
+    if sender.name == 'events':
+        sharding.reserve_id_ranges(using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop a changed user from the user cache."""
+    user_cache.invalidate_on_commit(instance.pk, using=instance._state.db)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    """Drop the profile's user from the user cache."""
+    user_cache.invalidate_on_commit(instance.user_id, using=instance._state.db)
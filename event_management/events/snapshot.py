@@ -0,0 +1,376 @@
+"""
+Compact binary snapshots of users, events, RSVPs and reviews.
+
+Used by `dump_events` and `load_events` to seed staging and benchmark
+databases much faster than JSON fixtures. A snapshot is a sequence of
+table sections:
+
+    MAGIC
+    section:  name, row count, columns (name, type code)
+              chunks: <row count><compressed length><zlib data>, ending with 0
+    end:      empty section name
+
+Each chunk stores up to `chunk_size` rows column by column: integers and
+datetimes (microseconds since the epoch, UTC) as little-endian int64
+arrays, booleans as bytes, and strings as a uint32 length array followed by
+the UTF-8 data. Nulls are stored as NULL_INT.
+
+Loading maps users by username and gives every row a new primary key,
+remapping foreign keys as it goes, so a snapshot can be loaded into a
+database that already has data. Passwords are not exported; users created
+by a load get unusable passwords.
+
+Dumps read every database in one read-only transaction (REPEATABLE READ
+on PostgreSQL), so the tables agree with each other. Each shard has its
+own snapshot, so a dump of a sharded setup taken under write load may
+still see a shard's RSVPs or reviews slightly before or after the events.
+
+RSVPs and reviews are read from and loaded into their event's shard (see
+events.sharding); rows on a shard other than 'default' are committed as
+they are inserted, outside the load's transaction.
+"""
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import ExitStack, contextmanager
+from itertools import chain
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+
+from .models import Event, RSVP, Review, UserProfile
+from .sharding import SHARDED_MODELS, fan_out, shard_for, shards
+
+
+MAGIC = b'EVSNAP\x01\n'
+NULL_INT = -(2 ** 63)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Sections in load order: (name, model, [(column, values() key, type code)])
+SECTIONS = [
+    ('users', User, [
+        ('id', 'id', 'i'), ('username', 'username', 's'), ('email', 'email', 's'),
+        ('first_name', 'first_name', 's'), ('last_name', 'last_name', 's'),
+        ('full_name', 'profile__full_name', 's'),
+    ]),
+    ('events', Event, [
+        ('id', 'id', 'i'), ('title', 'title', 's'), ('description', 'description', 's'),
+        ('organizer_id', 'organizer_id', 'i'), ('location', 'location', 's'),
+        ('start_time', 'start_time', 't'), ('end_time', 'end_time', 't'),
+        ('is_public', 'is_public', 'b'), ('recurrence', 'recurrence', 's'),
+        ('series_id', 'series_id', 'i'), ('occurrence_start', 'occurrence_start', 't'),
+        ('created_at', 'created_at', 't'), ('updated_at', 'updated_at', 't'),
+    ]),
+    ('rsvps', RSVP, [
+        ('id', 'id', 'i'), ('event_id', 'event_id', 'i'), ('user_id', 'user_id', 'i'),
+        ('status', 'status', 's'), ('created_at', 'created_at', 't'), ('updated_at', 'updated_at', 't'),
+    ]),
+    ('reviews', Review, [
+        ('id', 'id', 'i'), ('event_id', 'event_id', 'i'), ('user_id', 'user_id', 'i'),
+        ('rating', 'rating', 'i'), ('comment', 'comment', 's'),
+        ('created_at', 'created_at', 't'), ('updated_at', 'updated_at', 't'),
+    ]),
+]
+
+# Foreign key columns and the section whose ids they refer to
+REMAP = {
+    'organizer_id': 'users',
+    'user_id': 'users',
+    'event_id': 'events',
+    'series_id': 'events',
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _int64(values):
+    data = array('q', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _from_int64(buffer):
+    data = array('q')
+    data.frombytes(buffer)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data
+
+
+def _to_micros(value):
+    if value is None:
+        return NULL_INT
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(value):
+    return None if value == NULL_INT else EPOCH + timedelta(microseconds=value)
+
+
+def encode_column(type_code, values):
+    if type_code == 'i':
+        return _int64([NULL_INT if value is None else value for value in values])
+    if type_code == 't':
+        return _int64([_to_micros(value) for value in values])
+    if type_code == 'b':
+        return bytes(bytearray(1 if value else 0 for value in values))
+    encoded = [(value or '').encode() for value in values]
+    lengths = array('I', [len(value) for value in encoded])
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+    return lengths.tobytes() + b''.join(encoded)
+
+
+def decode_column(type_code, buffer, offset, count):
+    """Decode `count` values starting at offset; returns (values, new_offset)."""
+    if type_code in ('i', 't'):
+        data = _from_int64(buffer[offset:offset + count * 8])
+        offset += count * 8
+        if type_code == 'i':
+            return [None if value == NULL_INT else value for value in data], offset
+        return [_from_micros(value) for value in data], offset
+    if type_code == 'b':
+        return [bool(value) for value in buffer[offset:offset + count]], offset + count
+    lengths = array('I')
+    lengths.frombytes(buffer[offset:offset + count * 4])
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+    offset += count * 4
+    values = []
+    for length in lengths:
+        values.append(buffer[offset:offset + length].decode())
+        offset += length
+    return values, offset
+
+
+def _write_str(stream, value):
+    data = value.encode()
+    stream.write(struct.pack('<H', len(data)))
+    stream.write(data)
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise SnapshotError('Unexpected end of snapshot.')
+    return data
+
+
+def _read_str(stream):
+    (length,) = struct.unpack('<H', _read_exact(stream, 2))
+    return _read_exact(stream, length).decode()
+
+
+def dump(stream, chunk_size=10000, progress=None):
+    """
+    Write a snapshot of all users, events, RSVPs and reviews to a binary
+    stream. Rows are streamed with iterator() and never all held in memory.
+    Returns {section: rows written}.
+    """
+    with _read_snapshot(dict.fromkeys([DEFAULT_DB_ALIAS, *shards()])):
+        return _dump(stream, chunk_size, progress)
+
+
+@contextmanager
+def _read_snapshot(aliases):
+    """
+    Hold one transaction per database for the whole dump. On PostgreSQL
+    it is REPEATABLE READ and READ ONLY, so every query sees the data as
+    of the first one; SQLite and MySQL's default isolation already do.
+    """
+    with ExitStack() as stack:
+        for alias in aliases:
+            outermost = not connections[alias].in_atomic_block
+            stack.enter_context(transaction.atomic(using=alias))
+            if outermost and connections[alias].vendor == 'postgresql':
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        yield
+
+
+def _dump(stream, chunk_size, progress):
+    stream.write(MAGIC)
+    totals = {}
+    for name, model, columns in SECTIONS:
+        queryset = model.objects.order_by('id')
+        if model is Event:
+            # Series before their stored occurrences, so loading can remap series ids
+            queryset = model.objects.order_by(models.F('series').asc(nulls_first=True), 'id')
+        querysets = fan_out(queryset) if model in SHARDED_MODELS else [queryset]
+        total = sum(queryset.count() for queryset in querysets)
+        _write_str(stream, name)
+        stream.write(struct.pack('<QH', total, len(columns)))
+        for column, _, type_code in columns:
+            _write_str(stream, column)
+            stream.write(type_code.encode())
+
+        keys = [key for _, key, _ in columns]
+        written = 0
+        chunk = []
+        rows = chain.from_iterable(
+            queryset.values_list(*keys).iterator(chunk_size=chunk_size) for queryset in querysets
+        )
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                _write_chunk(stream, columns, chunk)
+                written += len(chunk)
+                chunk = []
+                if progress:
+                    progress(name, written, total)
+        if chunk:
+            _write_chunk(stream, columns, chunk)
+            written += len(chunk)
+            if progress:
+                progress(name, written, total)
+        stream.write(struct.pack('<I', 0))
+        totals[name] = written
+    _write_str(stream, '')
+    return totals
+
+
+def _write_chunk(stream, columns, rows):
+    values = list(zip(*rows))
+    body = b''.join(
+        encode_column(type_code, values[index]) for index, (_, _, type_code) in enumerate(columns)
+    )
+    data = zlib.compress(body, 1)
+    stream.write(struct.pack('<II', len(rows), len(data)))
+    stream.write(data)
+
+
+def read_sections(stream):
+    """Yield (name, total, columns, chunks) where chunks yields lists of row dicts."""
+    if _read_exact(stream, len(MAGIC)) != MAGIC:
+        raise SnapshotError('Not an event snapshot.')
+    while True:
+        name = _read_str(stream)
+        if not name:
+            return
+        total, column_count = struct.unpack('<QH', _read_exact(stream, 10))
+        columns = [(_read_str(stream), _read_exact(stream, 1).decode()) for _ in range(column_count)]
+        yield name, total, columns, _read_chunks(stream, columns)
+
+
+def _read_chunks(stream, columns):
+    while True:
+        (count,) = struct.unpack('<I', _read_exact(stream, 4))
+        if not count:
+            return
+        (length,) = struct.unpack('<I', _read_exact(stream, 4))
+        buffer = zlib.decompress(_read_exact(stream, length))
+        offset = 0
+        values = {}
+        for column, type_code in columns:
+            values[column], offset = decode_column(type_code, buffer, offset, count)
+        names = list(values)
+        yield [dict(zip(names, row)) for row in zip(*values.values())]
+
+
+class _KeepTimestamps:
+    """Stop auto_now/auto_now_add from overwriting loaded timestamps."""
+
+    def __init__(self, *model_classes):
+        self.fields = [
+            field for model in model_classes for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+
+    def __enter__(self):
+        self.saved = [(field, field.auto_now, field.auto_now_add) for field in self.fields]
+        for field in self.fields:
+            field.auto_now = field.auto_now_add = False
+
+    def __exit__(self, *exc_info):
+        for field, auto_now, auto_now_add in self.saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def load(stream, batch_size=5000, progress=None):
+    """
+    Load a snapshot written by dump(). Runs in one transaction with
+    constraint checks disabled while inserting (like loaddata) and checked
+    once at the end. Returns {section: rows loaded}.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        raise SnapshotError('Loading needs a database that returns ids from bulk inserts.')
+
+    id_maps = {name: {} for name, _, _ in SECTIONS}
+    models_by_name = {name: model for name, model, _ in SECTIONS}
+    totals = {}
+    with transaction.atomic(), connection.constraint_checks_disabled(), _KeepTimestamps(Event, RSVP, Review):
+        for name, total, columns, chunks in read_sections(stream):
+            if name not in models_by_name:
+                raise SnapshotError(f'Unknown section "{name}".')
+            loaded = 0
+            for rows in chunks:
+                if name == 'users':
+                    _load_users(rows, id_maps['users'], batch_size)
+                else:
+                    _load_rows(models_by_name[name], rows, id_maps, id_maps[name], batch_size)
+                loaded += len(rows)
+                if progress:
+                    progress(name, loaded, total)
+            totals[name] = loaded
+        connection.check_constraints(table_names=[model._meta.db_table for model in models_by_name.values()])
+    return totals
+
+
+def _load_users(rows, id_map, batch_size):
+    existing = dict(
+        User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', 'id')
+    )
+    new_rows = [row for row in rows if row['username'] not in existing]
+    users = User.objects.bulk_create([
+        User(
+            username=row['username'], email=row['email'], first_name=row['first_name'],
+            last_name=row['last_name'], password=make_password(None),
+        )
+        for row in new_rows
+    ], batch_size=batch_size)
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, full_name=row['full_name']) for user, row in zip(users, new_rows)
+    ], batch_size=batch_size)
+    existing.update((user.username, user.id) for user in users)
+    for row in rows:
+        id_map[row['id']] = existing[row['username']]
+
+
+def _load_rows(model, rows, id_maps, id_map, batch_size):
+    if model is Event:
+        # A chunk may hold a series and its occurrences; insert the series first
+        series = [row for row in rows if row['series_id'] is None]
+        if len(series) != len(rows):
+            _insert_rows(model, series, id_maps, id_map, batch_size)
+            rows = [row for row in rows if row['series_id'] is not None]
+    _insert_rows(model, rows, id_maps, id_map, batch_size)
+
+
+def _insert_rows(model, rows, id_maps, id_map, batch_size):
+    objects = []
+    for row in rows:
+        row = dict(row)
+        old_id = row.pop('id')
+        for column, section in REMAP.items():
+            if row.get(column) is not None:
+                try:
+                    row[column] = id_maps[section][row[column]]
+                except KeyError:
+                    raise SnapshotError(f'{model.__name__} {old_id} refers to a missing {column} {row[column]}.')
+        objects.append((old_id, model(**row)))
+    if model in SHARDED_MODELS:
+        shards = {}
+        for _, obj in objects:
+            shards.setdefault(shard_for(obj.event_id), []).append(obj)
+        for alias, shard_objects in shards.items():
+            model.objects.using(alias).bulk_create(shard_objects, batch_size=batch_size)
+    else:
+        model.objects.bulk_create([obj for _, obj in objects], batch_size=batch_size)
+    id_map.update((old_id, obj.pk) for old_id, obj in objects)
@@ -0,0 +1,140 @@
+"""
+Worker start-up: a prefork warm-up hook and a cold-start probe.
+
+warm_up() does the one-off work a worker would otherwise do on its first
+request. wsgi.py/asgi.py call it when settings.WARM_UP_ON_START is set, so
+with a preloading server (e.g. `gunicorn --preload`) it runs once in the
+master and every forked worker starts warm.
+
+Running this module (`python -m events.startup --mode cold|warm`) times
+setup and the first request of a fresh process and prints the result as
+JSON; `manage.py startup_report` runs it in subprocesses and summarizes.
+Django is imported inside functions so the probe's clock starts before it.
+"""
+import gc
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+_started = time.perf_counter()
+
+
+def warm_up():
+    """
+    Load the URLconf, view/serializer modules, DRF and JWT settings,
+    translations and browsable API templates, and verify the database
+    connection. Connections are closed again so forked workers never share
+    a socket; the per-connection feature detection stays cached.
+    """
+    from django.conf import settings
+    from django.db import DatabaseError, connections
+    from django.template.loader import get_template
+    from django.urls import get_resolver, reverse
+    from django.utils import translation
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+    get_resolver().url_patterns
+    reverse('api-root')  # populates the resolver's reverse lookup tables
+
+    # DRF and simplejwt import their configured classes on first access
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_PAGINATION_CLASS',
+                 'DEFAULT_FILTER_BACKENDS', 'DEFAULT_CONTENT_NEGOTIATION_CLASS'):
+        getattr(api_settings, name)
+    for name in ('AUTH_TOKEN_CLASSES', 'TOKEN_USER_CLASS'):
+        getattr(jwt_settings, name)
+
+    from .serializers import EventSerializer, RSVPSerializer, ReviewSerializer
+    for serializer_class in (EventSerializer, RSVPSerializer, ReviewSerializer):
+        serializer_class().fields
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext('Not found.')
+    translation.deactivate()
+    get_template('rest_framework/api.html')
+
+    try:
+        for connection in connections.all():
+            connection.ensure_connection()
+            connection.features.supports_transactions
+    except DatabaseError:
+        # Not fatal: the worker connects on demand and /readyz reports the outage
+        logger.warning('Database unavailable during warm-up', exc_info=True)
+    finally:
+        connections.close_all()
+
+    # Keep the warmed objects out of future collections so forked workers
+    # do not touch (and copy) those pages
+    gc.freeze()
+
+
+def _request(application, path):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'HTTP_ACCEPT': 'application/json'}
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    for _ in body:
+        pass
+    if hasattr(body, 'close'):
+        body.close()
+    return (time.perf_counter() - started) * 1000, status[0]
+
+
+def probe(mode, path):
+    """
+    Time a fresh worker. In `warm` mode the process warms up and forks, and
+    the first request is served by the forked child, as under a preloading
+    server. Returns timings in milliseconds.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    result = {'mode': mode, 'path': path, 'setup': (time.perf_counter() - _started) * 1000, 'warm_up': 0.0}
+
+    if mode == 'warm':
+        started = time.perf_counter()
+        warm_up()
+        result['warm_up'] = (time.perf_counter() - started) * 1000
+        if hasattr(os, 'fork'):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                timings = _serve(application, path)
+                os.write(write_fd, json.dumps(timings).encode())
+                os._exit(0)
+            os.close(write_fd)
+            with os.fdopen(read_fd) as pipe:
+                result.update(json.loads(pipe.read()))
+            os.waitpid(pid, 0)
+            result['worker_time_to_first_request'] = result['first_request']
+            return result
+
+    result.update(_serve(application, path))
+    result['worker_time_to_first_request'] = result['setup'] + result['warm_up'] + result['first_request']
+    return result
+
+
+def _serve(application, path):
+    first, status = _request(application, path)
+    second, _ = _request(application, path)
+    return {'first_request': first, 'second_request': second, 'status': status}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=('cold', 'warm'), default='cold')
+    parser.add_argument('--path', default='/api/events/')
+    options = parser.parse_args()
+    sys.stdout.write(json.dumps(probe(options.mode, options.path)))
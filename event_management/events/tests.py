@@ -1,9 +1,48 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, tag
 from django.contrib.auth.models import User
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
 from rest_framework import status
-from datetime import datetime, timedelta
-from .models import Event, RSVP, Review, UserProfile
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction, DatabaseError, OperationalError
+from django.contrib.auth.signals import user_login_failed
+from django.utils import timezone
+from asgiref.sync import iscoroutinefunction, sync_to_async
+import asyncio
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf, skipUnless
+from .models import Event, RSVP, Review, UserProfile, WebhookSubscription, WebhookOutbox
+from .models import ArchivedEvent, ArchivedRSVP, ArchivedReview
+from .webhooks import WebhookDeliverer, sign, purge as purge_webhooks
+from .live import InProcessBroker, LiveEventHub, get_hub, channel_name
+from .middleware import LoadSheddingMiddleware, monitor
+from .throttling import get_store
+from .projections import EventProjection, RSVPProjection, ReviewProjection
+from .renderers import FastJSONRenderer
+from .cache import user_cache
+from .recurrence import RecurrenceRule
+from .api_views import _discovery, readiness
+from .models import HourlyEventStats, DailyEventStats, IdempotencyKey, ChangeLogEntry
+from .idempotency import KeyInProgress, claim, complete, purge_expired, renew
+from . import analytics, changelog, sharding, snapshot
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from .serializers import EventSerializer, RSVPSerializer, ReviewSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.pagination import PageNumberPagination
+from .views import EventViewSet
+from .profiling import ProfilingMiddleware, endpoint_stats, span
+from django.test import RequestFactory
+from django.http import JsonResponse
 
 
 class EventModelTest(TestCase):
@@ -154,3 +193,1914 @@ class ReviewAPITest(APITestCase):
         }
         response = self.client.post('/api/reviews/', data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """Local stub endpoint that records webhook deliveries."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers, json.loads(body), body))
+        self.server.connections.add(self.client_address)
+        self.send_response(self.server.status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOKS={'ALLOW_PRIVATE_ADDRESSES': True})
+class WebhookDeliveryTest(TestCase):
+    """Test cases for the webhook outbox and delivery worker."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+        self.server.received = []
+        self.server.connections = set()
+        self.server.status_code = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.attendee = User.objects.create_user(username='attendee', password='testpass123')
+        self.event = Event.objects.create(
+            title='Hooked Event',
+            description='Description',
+            organizer=self.organizer,
+            location='Location',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=2),
+        )
+        self.subscription = WebhookSubscription.objects.create(
+            organizer=self.organizer,
+            url=f'http://127.0.0.1:{self.server.server_port}/hook',
+            secret='s3cret',
+        )
+
+    def test_rsvp_change_writes_outbox(self):
+        """Test RSVP create writes an outbox row for the organizer."""
+        client = APIClient()
+        client.force_authenticate(user=self.attendee)
+        response = client.post('/api/rsvps/', {'event': self.event.id, 'status': 'going'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        row = WebhookOutbox.objects.get()
+        self.assertEqual(row.event_type, 'rsvp.created')
+        self.assertEqual(row.payload['event'], self.event.id)
+
+    def test_delivery_coalesces_and_batches(self):
+        """Test pending changes to one RSVP collapse into one signed POST."""
+        rsvp = RSVP.objects.create(event=self.event, user=self.attendee, status='going')
+        rsvp.status = 'maybe'
+        rsvp.save()
+        Review.objects.create(event=self.event, user=self.attendee, rating=4, comment='Nice')
+
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        self.assertEqual(deliverer.run_once(), (2, 0))
+
+        self.assertEqual(len(self.server.received), 1)
+        headers, payload, body = self.server.received[0]
+        self.assertEqual([e['type'] for e in payload['events']], ['rsvp.updated', 'review.created'])
+        self.assertEqual(payload['events'][0]['status'], 'maybe')
+        self.assertEqual(headers['X-Webhook-Signature'], sign('s3cret', body))
+        self.assertFalse(WebhookOutbox.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_connections_are_reused(self):
+        """Test consecutive batches share a keep-alive connection."""
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        for rating in (3, 5):
+            Review.objects.create(event=self.event, user=self.attendee, rating=rating, comment='Again')
+            deliverer.run_once()
+        self.assertEqual(len(self.server.received), 2)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_failed_delivery_is_retried_later(self):
+        """Test a failing endpoint schedules a jittered retry."""
+        self.server.status_code = 500
+        RSVP.objects.create(event=self.event, user=self.attendee)
+
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        self.assertEqual(deliverer.run_once(), (0, 1))
+
+        row = WebhookOutbox.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.last_error, 'HTTP 500')
+        self.assertIsNone(row.delivered_at)
+        self.assertEqual(deliverer.run_once(), (0, 0))
+
+    def test_row_in_backoff_holds_back_newer_changes(self):
+        """Test a newer change waits for an older one in backoff and is then sent instead of it."""
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        self.server.status_code = 500
+        rsvp = RSVP.objects.create(event=self.event, user=self.attendee, status='going')
+        self.assertEqual(deliverer.run_once(), (0, 1))
+
+        self.server.status_code = 200
+        rsvp.status = 'maybe'
+        rsvp.save()
+        self.assertEqual(deliverer.run_once(), (0, 0))
+
+        WebhookOutbox.objects.filter(attempts=1).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliverer.run_once(), (1, 0))
+        self.assertEqual([e['status'] for e in self.server.received[-1][1]['events']], ['maybe'])
+        self.assertFalse(WebhookOutbox.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_claimed_rows_are_not_sent_twice(self):
+        """Test rows leased by one worker are skipped by another."""
+        RSVP.objects.create(event=self.event, user=self.attendee)
+        first, second = WebhookDeliverer(), WebhookDeliverer()
+        self.addCleanup(first.pool.close)
+        self.addCleanup(second.pool.close)
+        self.assertEqual(len(first.claim(timezone.now(), 10)), 1)
+        self.assertEqual(second.run_once(), (0, 0))
+        self.assertEqual(self.server.received, [])
+
+    @override_settings(WEBHOOKS={'ALLOW_PRIVATE_ADDRESSES': True, 'MAX_ATTEMPTS': 1, 'RETENTION_DAYS': 7})
+    def test_exhausted_rows_fail_and_are_purged(self):
+        """Test a row out of attempts is marked failed, no longer retried, and purged after the retention."""
+        self.server.status_code = 500
+        RSVP.objects.create(event=self.event, user=self.attendee)
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        self.assertEqual(deliverer.run_once(), (0, 1))
+        self.assertIsNotNone(WebhookOutbox.objects.get().failed_at)
+
+        WebhookOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliverer.run_once(), (0, 0))
+        self.assertEqual(purge_webhooks(), 0)
+        out = StringIO()
+        with mock.patch('events.webhooks.timezone.now', return_value=timezone.now() + timedelta(days=8)):
+            call_command('purge_webhook_outbox', stdout=out)
+        self.assertIn('Deleted 1 webhook outbox rows.', out.getvalue())
+
+    @override_settings(WEBHOOKS={'ALLOW_PRIVATE_ADDRESSES': False, 'BATCH_SIZE': 1})
+    def test_delivery_connects_to_the_checked_address(self):
+        """Test a round resolves the host once and connects to that address, not to a fresh lookup."""
+        getaddrinfo = socket.getaddrinfo
+        lookups = []
+
+        def rebinding_getaddrinfo(host, *args, **kwargs):
+            if host != 'hooks.example':
+                return getaddrinfo(host, *args, **kwargs)
+            lookups.append(host)
+            # The checked lookup sees the stub server; any later one would see metadata
+            address = '127.0.0.1' if len(lookups) == 1 else '169.254.169.254'
+            return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, args[0]))]
+
+        self.subscription.url = f'http://hooks.example:{self.server.server_port}/hook'
+        self.subscription.save()
+        for rating in (3, 5):
+            Review.objects.create(event=self.event, user=User.objects.create_user(f'reviewer{rating}'),
+                                  rating=rating, comment='Pinned')
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        with mock.patch('socket.getaddrinfo', rebinding_getaddrinfo), \
+                mock.patch('events.webhooks.public_address', lambda address: address == '127.0.0.1'):
+            self.assertEqual(deliverer.run_once(), (2, 0))
+
+        self.assertEqual(lookups, ['hooks.example'])
+        self.assertEqual(len(self.server.received), 2)
+        self.assertEqual(self.server.received[0][0]['Host'], f'hooks.example:{self.server.server_port}')
+
+    @override_settings(WEBHOOKS={'ALLOW_PRIVATE_ADDRESSES': False})
+    def test_private_endpoints_are_rejected(self):
+        """Test subscriptions to loopback, private or non-http URLs are refused and never delivered to."""
+        client = APIClient()
+        client.force_authenticate(user=self.organizer)
+        for url in ('http://127.0.0.1/hook', 'http://10.0.0.5/hook', 'http://169.254.169.254/latest',
+                    'http://[::1]/hook', 'ftp://93.184.216.34/hook'):
+            response = client.post('/api/webhooks/', {'url': url}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, url)
+        response = client.post('/api/webhooks/', {'url': 'https://93.184.216.34/hook'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        WebhookSubscription.objects.exclude(pk=self.subscription.pk).delete()
+        RSVP.objects.create(event=self.event, user=self.attendee)
+        deliverer = WebhookDeliverer()
+        self.addCleanup(deliverer.pool.close)
+        self.assertEqual(deliverer.run_once(), (0, 1))
+        self.assertEqual(self.server.received, [])
+        self.assertIn('private', WebhookOutbox.objects.get().last_error)
+
+
+@override_settings(LIVE_UPDATES={'COALESCE_INTERVAL': 0.05, 'HEARTBEAT_INTERVAL': 5})
+class LiveUpdatesTest(TestCase):
+    """Test cases for the live RSVP count stream."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.event = Event.objects.create(
+            title='Live Event',
+            description='Description',
+            organizer=self.user,
+            location='Location',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=2),
+        )
+
+    def test_rsvp_commit_publishes_notice(self):
+        """Test saving an RSVP publishes a notice after commit."""
+        received = []
+        broker = get_hub().broker
+        token = broker.subscribe(channel_name(self.event.id), received.append)
+        self.addCleanup(broker.unsubscribe, channel_name(self.event.id), token)
+        with self.captureOnCommitCallbacks(execute=True):
+            RSVP.objects.create(event=self.event, user=self.user)
+        self.assertEqual(received, [{'event': self.event.id}])
+
+    async def test_notices_are_coalesced(self):
+        """Test a burst of notices produces a single snapshot push."""
+        hub = LiveEventHub(InProcessBroker())
+        queue = hub.listen(self.event.id)
+        await sync_to_async(RSVP.objects.create)(event=self.event, user=self.user)
+        for _ in range(10):
+            hub.notify(self.event.id)
+        data = await asyncio.wait_for(queue.get(), timeout=2)
+        self.assertEqual(data['rsvp_count'], 1)
+        await asyncio.sleep(0.1)
+        self.assertTrue(queue.empty())
+        hub.unlisten(self.event.id, queue)
+        self.assertEqual(hub._channels, {})
+
+    async def test_stream_sends_snapshot_then_updates(self):
+        """Test the SSE endpoint streams the current counts and later changes."""
+        response = await self.async_client.get(f'/api/events/{self.event.id}/live/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = response.streaming_content
+        first = await anext(frames)
+        self.assertIn('"rsvp_count": 0', first.decode())
+
+        await sync_to_async(Review.objects.create)(event=self.event, user=self.user, rating=4, comment='Good')
+        get_hub().notify(self.event.id)
+        second = await asyncio.wait_for(anext(frames), timeout=2)
+        self.assertIn('"average_rating": 4.0', second.decode())
+        await frames.aclose()
+
+    async def test_private_event_stream_requires_organizer(self):
+        """Test anonymous clients cannot stream a private event."""
+        self.event.is_public = False
+        await self.event.asave()
+        response = await self.async_client.get(f'/api/events/{self.event.id}/live/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(THROTTLING={'RATES': {'rsvps.create': {'user': '5/min', 'ip': '20/min'}}})
+class ThrottlingTest(APITestCase):
+    """Test cases for token-bucket throttling of write endpoints."""
+    databases = '__all__'
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                description='Description',
+                organizer=self.organizer,
+                location='Location',
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=2),
+            )
+            for i in range(3)
+        ]
+
+    def _client(self, user, ip):
+        client = APIClient(REMOTE_ADDR=ip)
+        client.force_authenticate(user=user)
+        return client
+
+    def test_abusive_client_is_throttled_while_others_proceed(self):
+        """Test a flooding client gets 429s without affecting well-behaved clients."""
+        abuser = self._client(User.objects.create_user(username='abuser'), '10.0.0.1')
+        good_clients = [
+            self._client(User.objects.create_user(username=f'user{i}'), f'10.0.1.{i}')
+            for i in range(5)
+        ]
+
+        abuser_codes = []
+        good_codes = []
+        for round_number in range(3):
+            for _ in range(10):
+                abuser_codes.append(
+                    abuser.post('/api/rsvps/', {'event': self.events[0].id, 'status': 'going'}).status_code
+                )
+            for client in good_clients:
+                response = client.post('/api/rsvps/', {'event': self.events[round_number].id, 'status': 'going'})
+                good_codes.append(response.status_code)
+
+        self.assertEqual(abuser_codes.count(status.HTTP_429_TOO_MANY_REQUESTS), 25)
+        self.assertEqual(len(good_codes), 15)
+        self.assertTrue(all(code == status.HTTP_201_CREATED for code in good_codes))
+
+    def test_throttled_response_has_retry_after(self):
+        """Test throttled responses tell the client when to retry."""
+        client = self._client(self.organizer, '10.0.0.2')
+        for _ in range(5):
+            client.post('/api/rsvps/', {'event': self.events[0].id, 'status': 'maybe'})
+        response = client.post('/api/rsvps/', {'event': self.events[0].id, 'status': 'going'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_forwarded_for_is_only_trusted_behind_proxies(self):
+        """Test a rotating X-Forwarded-For header does not escape the per-IP register limit."""
+        def register(i, forwarded_for):
+            return self.client.post(
+                '/api/auth/register/',
+                {'username': f'flood{i}', 'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!'},
+                format='json', REMOTE_ADDR='10.0.0.3', HTTP_X_FORWARDED_FOR=forwarded_for,
+            ).status_code
+
+        with override_settings(THROTTLING={'RATES': {'register': {'ip': '3/hour'}}}):
+            codes = [register(i, f'203.0.113.{i}') for i in range(5)]
+        self.assertEqual(codes, [201, 201, 201, 429, 429])
+
+        get_store().clear()
+        with override_settings(THROTTLING={'NUM_PROXIES': 1, 'RATES': {'register': {'ip': '3/hour'}}}):
+            # The proxy appends the real client address after whatever the client sent
+            codes = [register(i, f'198.51.100.{i}, 203.0.113.7') for i in range(5, 10)]
+            codes.append(register(10, '203.0.113.8'))
+        self.assertEqual(codes, [201, 201, 201, 429, 429, 201])
+
+    def test_reads_are_not_throttled(self):
+        """Test scopes without a configured rate are never throttled."""
+        for _ in range(30):
+            self.assertEqual(self.client.get('/api/events/').status_code, status.HTTP_200_OK)
+
+
+class LoadSheddingTest(APITestCase):
+    """Test cases for the load-shedding middleware."""
+
+    def setUp(self):
+        monitor.reset()
+        self.addCleanup(monitor.reset)
+
+    @override_settings(LOAD_SHEDDING={'MAX_IN_FLIGHT': 0})
+    def test_sheds_when_too_many_in_flight(self):
+        """Test requests beyond the in-flight limit get 503 with Retry-After."""
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(monitor.in_flight, 0)
+
+    def test_sheds_when_database_is_slow(self):
+        """Test requests are shed while recent queries are slow, and admin is exempt."""
+        for _ in range(50):
+            monitor.record_query(2.0)
+        self.assertEqual(self.client.get('/api/events/').status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertNotEqual(self.client.get('/admin/login/').status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    async def test_async_handler_stays_async(self):
+        """Test an async handler is awaited directly, with its queries timed and the same shedding."""
+        async def view(request):
+            await sync_to_async(Event.objects.count)()
+            return JsonResponse({'in_flight': monitor.in_flight})
+
+        middleware = LoadSheddingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/api/events/')
+        await sync_to_async(Event.objects.count)()
+        self.assertEqual(monitor.sampled_at, 0.0)
+        response = await middleware(request)
+        self.assertEqual(json.loads(response.content), {'in_flight': 1})
+        self.assertGreater(monitor.sampled_at, 0.0)
+        with self.settings(LOAD_SHEDDING={'MAX_IN_FLIGHT': 0}):
+            response = await middleware(request)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(monitor.in_flight, 0)
+
+
+class ProjectionContractTest(APITestCase):
+    """Contract tests: projections and FastJSONRenderer must match the serializers byte for byte."""
+    databases = '__all__'
+
+    def setUp(self):
+        plain = User.objects.create_user(username='plain')
+        named = User.objects.create_user(username='named', first_name='Ada', last_name='Lovelace')
+        profiled = User.objects.create_user(username='profiled', first_name='Grace')
+        UserProfile.objects.create(user=profiled, full_name='Grace Hopper \u00e9\u2028')
+        UserProfile.objects.create(user=named)
+        for i, organizer in enumerate([plain, named, profiled]):
+            event = Event.objects.create(
+                title=f'Event {i} \u2603',
+                description='Line one\nLine two \u2029 "quoted"',
+                organizer=organizer,
+                location='Z\u00fcrich',
+                start_time=timezone.now() + timedelta(days=i),
+                end_time=timezone.now() + timedelta(days=i, hours=3),
+                is_public=bool(i % 2),
+            )
+            for j, user in enumerate([plain, named, profiled][:i + 1]):
+                RSVP.objects.create(event=event, user=user, status=RSVP.MAYBE if j else RSVP.GOING)
+                Review.objects.create(event=event, user=user, rating=j + i + 1, comment=f'Comment {j}')
+
+    def assertSameJSON(self, serializer_class, projection, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = projection.represent_many(projection.project(queryset))
+        self.assertEqual(JSONRenderer().render(rows), expected)
+        self.assertEqual(FastJSONRenderer().render(rows), expected)
+
+    def test_event_projection_matches_serializer(self):
+        """Test EventProjection output is byte-identical to EventSerializer."""
+        self.assertSameJSON(EventSerializer, EventProjection(), Event.objects.all())
+
+    def test_rsvp_projection_matches_serializer(self):
+        """Test RSVPProjection output is byte-identical to RSVPSerializer."""
+        self.assertSameJSON(RSVPSerializer, RSVPProjection(), RSVP.objects.all())
+
+    def test_review_projection_matches_serializer(self):
+        """Test ReviewProjection output is byte-identical to ReviewSerializer."""
+        self.assertSameJSON(ReviewSerializer, ReviewProjection(), Review.objects.all())
+
+    def test_event_list_response_matches_serializer(self):
+        """Test the paginated /api/events/ body is unchanged by the projection path."""
+        response = self.client.get('/api/events/?ordering=title', HTTP_ACCEPT='application/json')
+        events = Event.objects.filter(is_public=True).order_by('title')
+        expected = JSONRenderer().render({
+            'count': events.count(),
+            'next': None,
+            'previous': None,
+            'results': EventSerializer(events, many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+
+    def test_event_detail_response_matches_serializer(self):
+        """Test /api/events/{id}/ is unchanged by the projection path."""
+        event = Event.objects.filter(is_public=True).first()
+        response = self.client.get(f'/api/events/{event.id}/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.content, JSONRenderer().render(EventSerializer(event).data))
+
+
+class SparseFieldsetTest(APITestCase):
+    """Test cases for ?fields= and ?expand= on event endpoints."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer', first_name='Org', last_name='Anizer')
+        for i in range(3):
+            event = Event.objects.create(
+                title=f'Event {i}',
+                description='A long description',
+                organizer=self.user,
+                location='Location',
+                start_time=timezone.now() + timedelta(days=i),
+                end_time=timezone.now() + timedelta(days=i + 1),
+            )
+            RSVP.objects.create(event=event, user=self.user)
+            Review.objects.create(event=event, user=self.user, rating=4, comment='Good')
+        self.event = event
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Last query against the endpoint's own table (user cache fills are separate)
+        sql = [query['sql'] for query in queries.captured_queries]
+        return response, [query for query in sql if not query.startswith('SELECT "auth_user"')]
+
+    def test_fields_limit_output_and_columns(self):
+        """Test unrequested fields are dropped from the response and the SQL."""
+        full, full_sql = self._get('/api/events/')
+        sparse, sparse_sql = self._get('/api/events/?fields=id,title,start_time')
+
+        self.assertEqual(list(sparse.data['results'][0]), ['id', 'title', 'start_time'])
+        # The page query; counts are a subquery, or separate queries when sharded
+        page_sql = [query for query in sparse_sql if query.startswith('SELECT "events_event"')][-1]
+        select = page_sql.split(' FROM ')[0]
+        self.assertEqual(set(re.findall(r' AS "(\w+)"', select)), {'id', 'title', 'start_time'})
+        self.assertNotIn('description', select)
+        self.assertNotIn('events_review', ' '.join(sparse_sql))
+        self.assertNotIn('auth_user', page_sql)
+        self.assertIn('events_review', ' '.join(full_sql))
+        self.assertLess(len(page_sql), len(full_sql[1]))
+
+    @skipIf(sharding.is_sharded(), 'counts are read with separate queries per shard')
+    def test_fields_save_queries(self):
+        """Test leaving out the organizer and counts saves the user and aggregate queries."""
+        # Cold user cache, so the full list also loads the organizers
+        user_cache.local.clear()
+        user_cache.backend.clear()
+        with self.assertNumQueries(3):
+            self._get('/api/events/')
+        user_cache.local.clear()
+        user_cache.backend.clear()
+        with self.assertNumQueries(2):
+            self._get('/api/events/?fields=id,title,start_time')
+
+    def test_expensive_fields_only_computed_when_requested(self):
+        """Test average_rating pulls in review aggregates only when asked for."""
+        response, sql = self._get('/api/events/?fields=id,average_rating')
+        self.assertEqual(response.data['results'][0], {'id': self.event.id, 'average_rating': 4.0})
+        self.assertIn('events_review', sql[-1])
+        self.assertNotIn('events_rsvp', sql[-1])
+
+    def test_expand_organizer(self):
+        """Test expand replaces the organizer id with a nested object."""
+        response, sql = self._get(f'/api/events/{self.event.id}/?fields=id&expand=organizer')
+        self.assertEqual(response.data, {
+            'id': self.event.id,
+            'organizer': {'id': self.user.id, 'username': 'organizer', 'name': 'Org Anizer'},
+        })
+
+    def test_nested_actions_support_fields(self):
+        """Test the rsvps and reviews actions honour fields and expand."""
+        response, sql = self._get(f'/api/events/{self.event.id}/rsvps/?fields=id,status')
+        self.assertEqual(list(response.data[0]), ['id', 'status'])
+        self.assertNotIn('auth_user', sql[-1])
+
+        response, sql = self._get(f'/api/events/{self.event.id}/reviews/?fields=rating&expand=user')
+        self.assertEqual(response.data[0], {'user': {'id': self.user.id, 'username': 'organizer'}, 'rating': 4})
+
+    def test_unknown_field_is_rejected(self):
+        """Test unknown fields and expansions return 400."""
+        self.assertEqual(self.client.get('/api/events/?fields=id,nope').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/events/?expand=title').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventBatchTest(APITestCase):
+    """Test cases for /api/events/batch/."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                description='Description',
+                organizer=self.organizer,
+                location='Location',
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=2),
+                is_public=i != 0,
+            )
+            for i in range(10)
+        ]
+
+    def test_results_in_request_order_with_per_id_errors(self):
+        """Test each id gets its own status, in the order requested."""
+        private, public = self.events[0], self.events[1]
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(f'/api/events/batch/?ids={public.id},999999,{private.id},{public.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['id'] for r in results], [public.id, 999999, private.id, public.id])
+        self.assertEqual([r['status'] for r in results], [200, 404, 404, 200])
+        self.assertEqual(results[0]['data'], EventSerializer(public).data)
+
+    def test_private_ids_are_reported_as_not_found(self):
+        """Test a private event looks the same as a missing one to anonymous users and non-organizers."""
+        private = self.events[0]
+        for user in (None, self.other):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.get(f'/api/events/{private.id}/').status_code, status.HTTP_404_NOT_FOUND)
+            response = self.client.get(f'/api/events/batch/?ids={private.id},999999')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [(r['status'], r['detail']) for r in response.data['results']],
+                [(404, 'Not found.'), (404, 'Not found.')]
+            )
+
+    def test_organizer_sees_private_event(self):
+        """Test the organizer can fetch their private event in a batch."""
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.get(f'/api/events/batch/?ids={self.events[0].id}&fields=id,title')
+        self.assertEqual(response.data['results'][0]['data'], {'id': self.events[0].id, 'title': 'Event 0'})
+
+    @skipIf(sharding.is_sharded(), 'counts are read with separate queries per shard')
+    def test_query_count_is_constant(self):
+        """Test a batch costs the same number of queries for 1 or 10 ids."""
+        self.client.force_authenticate(user=self.organizer)
+        ids = ','.join(str(event.id) for event in self.events)
+        self.client.get(f'/api/events/batch/?ids={ids}')  # Warm the user cache
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/events/batch/?ids={self.events[1].id}')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/events/batch/?ids={ids}')
+
+    @override_settings(EVENT_BATCH_MAX_SIZE=3)
+    def test_batch_size_and_ids_are_validated(self):
+        """Test oversized batches and malformed ids are rejected."""
+        self.assertEqual(self.client.get('/api/events/batch/?ids=1,2,3,4').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/events/batch/?ids=1,x').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/events/batch/').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserCacheTest(APITestCase):
+    """Test cases for the two-tier user cache."""
+
+    def setUp(self):
+        user_cache.local.clear()
+        user_cache.backend.clear()
+        user_cache.reset_stats()
+        self.users = [User.objects.create_user(username=f'user{i}', first_name=f'First{i}') for i in range(5)]
+        self.ids = [user.id for user in self.users]
+
+    def test_bulk_fill_and_tiers(self):
+        """Test a page of users is loaded in one query and then served without queries."""
+        with self.assertNumQueries(1):
+            entries = user_cache.get_many(self.ids)
+        self.assertEqual(entries[self.ids[0]]['username'], 'user0')
+        with self.assertNumQueries(0):
+            user_cache.get_many(self.ids)
+        user_cache.local.clear()
+        with self.assertNumQueries(0):
+            user_cache.get_many(self.ids)
+        self.assertEqual(user_cache.stats, {'local_hits': 5, 'shared_hits': 5, 'misses': 5})
+
+    def test_profile_save_invalidates_organizer_name(self):
+        """Test organizer_name reflects a profile change on the next request."""
+        event = Event.objects.create(
+            title='Cached Event',
+            description='Description',
+            organizer=self.users[0],
+            location='Location',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=2),
+        )
+        self.assertEqual(self.client.get(f'/api/events/{event.id}/').data['organizer_name'], 'First0')
+        UserProfile.objects.create(user=self.users[0], full_name='Renamed Organizer')
+        self.assertEqual(self.client.get(f'/api/events/{event.id}/').data['organizer_name'], 'Renamed Organizer')
+
+    def test_read_during_write_transaction_is_invalidated_on_commit(self):
+        """Test an entry cached from the pre-commit row is dropped when the write commits."""
+        user = self.users[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                user.first_name = 'Renamed'
+                user.save()
+                # A concurrent request still sees the old row and caches it
+                stale = dict(user_cache.get(user.pk), first_name='First1')
+                user_cache.backend.set(user_cache.key(user.pk), stale)
+                user_cache.local.set(user.pk, stale)
+        self.assertEqual(user_cache.get(user.pk)['first_name'], 'Renamed')
+
+    def test_stats_command(self):
+        """Test the stats command reports flushed hit-rate counters."""
+        user_cache.get_many(self.ids)
+        user_cache.get_many(self.ids)
+        user_cache.flush_stats()
+        out = StringIO()
+        call_command('user_cache_stats', '--reset', stdout=out)
+        self.assertIn('Hit rate:           50.0% of 10 lookups', out.getvalue())
+        self.assertEqual(user_cache.shared_stats(), {'local_hits': 0, 'shared_hits': 0, 'misses': 0})
+
+
+@override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000, 'WORKERS': 2})
+class AsyncAuthTest(TransactionTestCase):
+    """
+    Test cases for the async register/login views and configurable hashing.
+    Logins authenticate in the hashing pool's own database connections, so
+    the test data has to be committed.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def test_register_hashes_with_configured_cost(self):
+        """Test registration stores a hash with the configured iteration count."""
+        response = self.client.post('/api/auth/register/', {
+            'username': 'newuser', 'email': 'new@example.com',
+            'password': 'pass12345', 'password2': 'pass12345',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['user']['username'], 'newuser')
+        user = User.objects.get(username='newuser')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('pass12345'))
+
+    def test_register_validation_errors(self):
+        """Test mismatched passwords return serializer errors."""
+        response = self.client.post('/api/auth/register/', {
+            'username': 'newuser', 'password': 'pass12345', 'password2': 'other',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.json())
+
+    def test_login_returns_tokens(self):
+        """Test login returns a JWT pair that authenticates API calls."""
+        User.objects.create_user(username='testuser', password='testpass123')
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'testuser', 'password': 'testpass123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(client.get('/api/rsvps/').status_code, status.HTTP_200_OK)
+
+    def test_login_rejects_bad_credentials(self):
+        """Test wrong passwords and unknown users get the same 401."""
+        User.objects.create_user(username='testuser', password='testpass123')
+        for username in ('testuser', 'nobody'):
+            response = self.client.post('/api/auth/login/', {'username': username, 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_upgrades_outdated_hash(self):
+        """Test a hash with an old work factor is re-encoded on login."""
+        with self.settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 500}):
+            user = User.objects.create_user(username='testuser', password='testpass123')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$500$'))
+        response = self.client.post('/api/auth/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_login_goes_through_authentication_backends(self):
+        """Test login uses authenticate(): failures signal user_login_failed and inactive users are refused."""
+        User.objects.create_user(username='inactive', password='testpass123', is_active=False)
+        failures = []
+        receiver = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+
+        for username, password in (('nobody', 'wrong'), ('inactive', 'testpass123')):
+            response = self.client.post('/api/auth/login/', {'username': username, 'password': password})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(failures, ['nobody', 'inactive'])
+
+    def test_malformed_bodies_are_rejected(self):
+        """Test bodies that are not JSON objects of strings get 400, not a server error."""
+        for path in ('/api/auth/login/', '/api/auth/register/'):
+            for body in ('[1]', '"x"', '{"username": "someone", "password": 1}', '{'):
+                response = self.client.post(path, body, content_type='application/json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (path, body))
+
+    def test_register_is_atomic(self):
+        """Test a failed profile insert leaves no user behind."""
+        with mock.patch.object(UserProfile.objects, 'create', side_effect=DatabaseError('boom')):
+            with self.assertRaises(DatabaseError):
+                self.client.post('/api/auth/register/', {
+                    'username': 'newuser', 'password': 'pass12345', 'password2': 'pass12345',
+                })
+        self.assertFalse(User.objects.filter(username='newuser').exists())
+
+    @override_settings(THROTTLING={'RATES': {'login': {'ip': '2/min'}}})
+    def test_login_is_throttled(self):
+        """Test the login view applies the per-IP throttle."""
+        codes = [
+            self.client.post('/api/auth/login/', {'username': 'x', 'password': 'y'}).status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(codes[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class ArchiveTest(APITestCase):
+    """Test cases for archiving finished events."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer', password='testpass123')
+        now = timezone.now()
+        self.past = []
+        for i in range(3):
+            event = Event.objects.create(
+                title=f'Past Event {i}',
+                description='Description',
+                organizer=self.user,
+                location='Old Town',
+                start_time=now - timedelta(days=60 + i),
+                end_time=now - timedelta(days=59 + i),
+            )
+            RSVP.objects.create(event=event, user=self.user)
+            Review.objects.create(event=event, user=self.user, rating=3, comment='It was fine')
+            self.past.append(event)
+        self.upcoming = Event.objects.create(
+            title='Upcoming Event',
+            description='Description',
+            organizer=self.user,
+            location='New Town',
+            start_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=2),
+        )
+        RSVP.objects.create(event=self.upcoming, user=self.user)
+
+    def test_archive_moves_finished_events(self):
+        """Test finished events and their rows move to the archive unchanged."""
+        WebhookSubscription.objects.create(organizer=self.user, url='http://127.0.0.1:9/hook')
+        created_at = self.past[0].created_at
+        out = StringIO()
+        call_command('archive_events', '--older-than', '30', stdout=out)
+        self.assertIn('Archived 3 events, 3 RSVPs and 3 reviews.', out.getvalue())
+
+        self.assertEqual(list(Event.objects.values_list('id', flat=True)), [self.upcoming.id])
+        self.assertEqual(sum(queryset.count() for queryset in sharding.fan_out(RSVP.objects.all())), 1)
+        self.assertEqual(sum(queryset.count() for queryset in sharding.fan_out(Review.objects.all())), 0)
+        archived = ArchivedEvent.objects.get(id=self.past[0].id)
+        self.assertEqual(archived.created_at, created_at)
+        self.assertEqual(ArchivedRSVP.objects.filter(event=archived).count(), 1)
+        self.assertEqual(ArchivedReview.objects.filter(event=archived).count(), 1)
+        self.assertFalse(WebhookOutbox.objects.exists())
+
+    def test_archive_is_resumable(self):
+        """Test an interrupted run picks up the remaining events."""
+        call_command('archive_events', '--older-than', '30', '--batch-size', '1', '--max-batches', '2', stdout=StringIO())
+        self.assertEqual(ArchivedEvent.objects.count(), 2)
+        call_command('archive_events', '--older-than', '30', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(ArchivedEvent.objects.count(), 3)
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_include_archived_lists_both_tables(self):
+        """Test archived rows are hidden by default and returned on request."""
+        call_command('archive_events', '--older-than', '30', stdout=StringIO())
+
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.get('/api/events/?include_archived=true&ordering=start_time')
+        self.assertEqual(response.data['count'], 4)
+        titles = [event['title'] for event in response.data['results']]
+        self.assertEqual(titles, ['Past Event 2', 'Past Event 1', 'Past Event 0', 'Upcoming Event'])
+        self.assertEqual(response.data['results'][0]['rsvp_count'], 1)
+        self.assertEqual(response.data['results'][0]['average_rating'], 3.0)
+
+        response = self.client.get('/api/events/?include_archived=true&search=Old Town&fields=id')
+        self.assertEqual(response.data['count'], 3)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/rsvps/?include_archived=true')
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0]['event_title'], 'Upcoming Event')
+
+
+class AdminChangelistTest(TestCase):
+    """Test cases for the admin changelists on large tables."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_login(self.admin)
+        self.event = Event.objects.create(
+            title='Admin Event',
+            description='Description',
+            organizer=self.admin,
+            location='Hall',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=2),
+        )
+        users = User.objects.bulk_create([User(username=f'guest{i}') for i in range(30)])
+        RSVP.objects.bulk_create([RSVP(event=self.event, user=user) for user in users])
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test RSVP changelist loads related rows in the page query."""
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/admin/events/rsvp/?p=1&status=going')
+        RSVP.objects.bulk_create([
+            RSVP(event=self.event, user=user)
+            for user in User.objects.bulk_create([User(username=f'extra{i}') for i in range(30)])
+        ])
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/admin/events/rsvp/?p=1&status=going')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    @override_settings(ADMIN_COUNT_LIMIT=10)
+    def test_count_is_capped(self):
+        """Test changelist counts stop at ADMIN_COUNT_LIMIT."""
+        response = self.client.get('/admin/events/rsvp/')
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+    def test_bulk_status_action_is_single_update(self):
+        """Test the status action updates every selected RSVP in one statement."""
+        ids = [str(pk) for pk in RSVP.objects.values_list('pk', flat=True)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/events/rsvp/', {
+                'action': 'set_status_maybe',
+                '_selected_action': ids,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RSVP.objects.filter(status=RSVP.MAYBE).count(), 30)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "events_rsvp"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_search_uses_indexable_lookups(self):
+        """Test admin search matches title prefixes and exact usernames only."""
+        for query, count in (('adm', 1), ('Event', 0)):
+            response = self.client.get('/admin/events/event/', {'q': query})
+            self.assertEqual(response.context['cl'].result_count, count, query)
+        for query, count in (('guest', 0), ('GUEST7', 0)):
+            response = self.client.get('/admin/events/rsvp/', {'q': query})
+            self.assertEqual(response.context['cl'].result_count, count, query)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/events/rsvp/', {'q': 'guest7'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        page = next(q['sql'] for q in queries if 'FROM "events_rsvp"' in q['sql'] and 'guest7' in q['sql'])
+        self.assertIn('"auth_user"."username" = \'guest7\'', page)
+
+
+class RecurrenceTest(APITestCase):
+    """Test cases for recurring events."""
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        self.start = datetime(2030, 1, 1, 18, 0, tzinfo=dt_timezone.utc)  # a Tuesday
+        self.series = Event.objects.create(
+            title='Weekly Meetup',
+            description='Description',
+            organizer=self.organizer,
+            location='Library',
+            start_time=self.start,
+            end_time=self.start + timedelta(hours=2),
+            recurrence='FREQ=WEEKLY',
+        )
+
+    def test_rule_expansion(self):
+        """Test rule parsing and expansion, including windows that skip ahead."""
+        rule = RecurrenceRule.parse('FREQ=WEEKLY;BYDAY=TU,TH;COUNT=5')
+        self.assertEqual(
+            [value.day for value in rule.between(self.start)],
+            [1, 3, 8, 10, 15]
+        )
+        self.assertEqual(
+            [value.day for value in rule.between(self.start, start=self.start + timedelta(days=6))],
+            [8, 10, 15]
+        )
+        rule = RecurrenceRule.parse('FREQ=MONTHLY;UNTIL=20300501')
+        dtstart = datetime(2030, 1, 31, 9, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual([value.month for value in rule.between(dtstart)], [1, 3])
+        for text in ('FREQ=YEARLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=DAILY;COUNT=0', 'FREQ=DAILY;BYHOUR=1'):
+            with self.assertRaises(ValueError):
+                RecurrenceRule.parse(text)
+
+    def test_invalid_recurrence_rejected(self):
+        """Test creating an event with an unsupported rule fails."""
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.post('/api/events/', {
+            'title': 'Yearly', 'description': 'Description', 'location': 'Hall',
+            'start_time': self.start.isoformat(), 'end_time': (self.start + timedelta(hours=1)).isoformat(),
+            'recurrence': 'FREQ=YEARLY',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence', response.data)
+
+    def test_list_10k_occurrences_without_rows(self):
+        """Test the next 10k occurrences are expanded lazily without storing rows."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f'/api/events/{self.series.id}/occurrences/',
+                {'start': self.start.isoformat(), 'limit': 10000}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 10000)
+        self.assertEqual(results[1]['start_time'], '2030-01-08T18:00:00Z')
+        self.assertEqual(results[-1]['end_time'], (self.start + timedelta(weeks=9999, hours=2)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+        self.assertTrue(all(entry['event'] is None for entry in results))
+        self.assertLessEqual(len(queries), 2)
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_rsvp_stores_single_occurrence(self):
+        """Test an RSVP to one occurrence stores only that occurrence."""
+        occurrence_start = self.start + timedelta(weeks=2)
+        self.client.force_authenticate(user=self.guest)
+        response = self.client.post('/api/rsvps/', {
+            'event': self.series.id, 'occurrence_start': occurrence_start.isoformat(), 'status': 'going'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        stored = Event.objects.get(series=self.series)
+        self.assertEqual(stored.occurrence_start, occurrence_start)
+        self.assertEqual(response.data['event'], stored.id)
+
+        response = self.client.post('/api/rsvps/', {
+            'event': self.series.id, 'occurrence_start': occurrence_start.isoformat(), 'status': 'maybe'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Event.objects.count(), 2)
+
+        response = self.client.post('/api/rsvps/', {
+            'event': self.series.id, 'occurrence_start': (occurrence_start + timedelta(hours=1)).isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get('/api/events/calendar/', {'start': self.start.isoformat(), 'limit': 4})
+        entries = response.data['results']
+        self.assertEqual([entry['event'] for entry in entries], [None, None, stored.id, None])
+        self.assertEqual(entries[2]['series'], self.series.id)
+
+    def test_organizer_overrides_occurrence(self):
+        """Test only the organizer can store an occurrence with overrides."""
+        occurrence_start = self.start + timedelta(weeks=1)
+        url = f'/api/events/{self.series.id}/occurrences/'
+        data = {'occurrence_start': occurrence_start.isoformat(), 'location': 'Town Hall'}
+
+        self.client.force_authenticate(user=self.guest)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['location'], 'Town Hall')
+        self.assertEqual(response.data['series'], self.series.id)
+
+        response = self.client.get(url, {'start': self.start.isoformat(), 'limit': 3})
+        self.assertEqual(
+            [entry['location'] for entry in response.data['results']],
+            ['Library', 'Town Hall', 'Library']
+        )
+
+    def test_calendar_merges_one_off_events(self):
+        """Test the calendar interleaves one-off events with occurrences."""
+        Event.objects.create(
+            title='Launch Party', description='Description', organizer=self.organizer,
+            location='Rooftop', start_time=self.start + timedelta(days=3),
+            end_time=self.start + timedelta(days=3, hours=3),
+        )
+        response = self.client.get('/api/events/calendar/', {
+            'start': self.start.isoformat(),
+            'end': (self.start + timedelta(weeks=2)).isoformat(),
+        })
+        self.assertEqual(
+            [entry['title'] for entry in response.data['results']],
+            ['Weekly Meetup', 'Launch Party', 'Weekly Meetup']
+        )
+
+    def test_list_expands_recurring_events(self):
+        """Test ?expand_recurring=true expands series in the event list, after filters."""
+        Event.objects.create(
+            title='Launch Party', description='Description', organizer=self.organizer,
+            location='Rooftop', start_time=self.start + timedelta(days=3),
+            end_time=self.start + timedelta(days=3, hours=3),
+        )
+        window = {'start': self.start.isoformat(), 'end': (self.start + timedelta(weeks=2)).isoformat()}
+        response = self.client.get('/api/events/', window)
+        self.assertEqual(response.data['count'], 2)
+
+        response = self.client.get('/api/events/', {'expand_recurring': 'true', **window})
+        self.assertEqual(
+            [entry['title'] for entry in response.data['results']],
+            ['Weekly Meetup', 'Launch Party', 'Weekly Meetup']
+        )
+        self.assertEqual(response.data['results'][1]['occurrence_start'], None)
+
+        response = self.client.get('/api/events/', {'expand_recurring': 'true', 'location': 'Library', **window})
+        self.assertEqual(
+            [entry['location'] for entry in response.data['results']],
+            ['Library', 'Library']
+        )
+
+
+class SnapshotTest(TestCase):
+    """Test cases for binary event snapshots."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        UserProfile.objects.create(user=self.guest, full_name='Guest Person')
+        start = timezone.now() + timedelta(days=1)
+        self.series = Event.objects.create(
+            title='Weekly Meetup', description='Description', organizer=self.organizer,
+            location='Library', start_time=start, end_time=start + timedelta(hours=2),
+            recurrence='FREQ=WEEKLY',
+        )
+        self.occurrence = Event.objects.create(
+            title='Weekly Meetup', description='Description', organizer=self.organizer,
+            location='Town Hall', start_time=start + timedelta(weeks=1),
+            end_time=start + timedelta(weeks=1, hours=2),
+            series=self.series, occurrence_start=start + timedelta(weeks=1),
+        )
+        RSVP.objects.create(event=self.occurrence, user=self.guest, status='maybe')
+        Review.objects.create(event=self.series, user=self.guest, rating=4, comment='Nice ✓')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'events.snap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_remaps_keys(self):
+        """Test a loaded snapshot copies every row with remapped foreign keys."""
+        call_command('dump_events', self.path, '--chunk-size', '1', stdout=StringIO())
+        out = StringIO()
+        call_command('load_events', self.path, '--batch-size', '1', stdout=out)
+        self.assertIn('Loaded 2 users, 2 events, 1 rsvps, 1 reviews.', out.getvalue())
+
+        # Users are matched by username, events get new ids
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Event.objects.count(), 4)
+        copy = Event.objects.exclude(pk=self.occurrence.pk).get(location='Town Hall')
+        self.assertNotEqual(copy.series_id, self.series.pk)
+        self.assertEqual(copy.series.recurrence, 'FREQ=WEEKLY')
+        self.assertEqual(copy.occurrence_start, self.occurrence.occurrence_start)
+        self.assertEqual(copy.created_at, self.occurrence.created_at)
+
+        rsvp = sharding.for_event(RSVP, copy.pk).get()
+        self.assertEqual((rsvp.user, rsvp.status), (self.guest, 'maybe'))
+        self.assertEqual(sharding.for_event(Review, copy.series_id).get().comment, 'Nice ✓')
+
+    def test_dump_reads_in_one_transaction(self):
+        """Test every section is read inside the same transaction."""
+        depth = len(connection.atomic_blocks)
+        seen = set()
+        with open(self.path, 'wb') as stream:
+            snapshot.dump(stream, chunk_size=1, progress=lambda *args: seen.add(len(connection.atomic_blocks)))
+        self.assertEqual(seen, {depth + 1})
+        self.assertEqual(len(connection.atomic_blocks), depth)
+
+    def test_load_creates_missing_users(self):
+        """Test users missing from the target are created without usable passwords."""
+        call_command('dump_events', self.path, stdout=StringIO())
+        Event.objects.all().delete()
+        self.guest.delete()
+        call_command('load_events', self.path, stdout=StringIO())
+
+        guest = User.objects.get(username='guest')
+        self.assertFalse(guest.has_usable_password())
+        self.assertEqual(guest.profile.full_name, 'Guest Person')
+        [rsvp] = [rsvp for queryset in sharding.fan_out(RSVP.objects.all()) for rsvp in queryset]
+        self.assertEqual(rsvp.user, guest)
+
+    def test_rejects_other_files(self):
+        """Test loading a file that is not a snapshot fails cleanly."""
+        with open(self.path, 'wb') as stream:
+            stream.write(b'[{"model": "events.event"}]')
+        with self.assertRaises(CommandError):
+            call_command('load_events', self.path, stdout=StringIO())
+        self.assertEqual(Event.objects.count(), 2)
+
+
+PERFORMANCE_BUDGETS = os.path.join(os.path.dirname(__file__), 'performance_budgets.json')
+
+
+def build_dataset(events=120, users=20, rsvps_per_event=5, reviews_per_event=3):
+    """
+    Bulk-create a mid-size dataset for performance tests. Users get
+    unusable passwords so no hashing is involved.
+    """
+    now = timezone.now()
+    people = User.objects.bulk_create([User(username=f'perf{i}', password='!') for i in range(users)])
+    UserProfile.objects.bulk_create([UserProfile(user=user, full_name=f'Perf User {i}') for i, user in enumerate(people)])
+    created = Event.objects.bulk_create([
+        Event(
+            title=f'Perf Event {i}',
+            description='Performance test event',
+            organizer=people[i % users],
+            location=f'City {i % 10}',
+            start_time=now + timedelta(days=i),
+            end_time=now + timedelta(days=i, hours=2),
+            is_public=i % 7 != 0,
+        )
+        for i in range(events)
+    ])
+    RSVP.objects.bulk_create([
+        RSVP(event=event, user=people[(i + j) % users])
+        for i, event in enumerate(created) for j in range(rsvps_per_event)
+    ])
+    Review.objects.bulk_create([
+        Review(event=event, user=people[(i + j) % users], rating=1 + (i + j) % 5, comment='Perf review')
+        for i, event in enumerate(created) for j in range(reviews_per_event)
+    ])
+    return people, created
+
+
+@tag('performance')
+@skipIf(sharding.is_sharded(), 'budgets are for a single database')
+class QueryBudgetTest(APITestCase):
+    """
+    Per-endpoint query budgets from performance_budgets.json. Each budget
+    must hold for page sizes 5 and 100, so a per-row query fails the test.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.events = build_dataset()
+        with open(PERFORMANCE_BUDGETS) as stream:
+            cls.budgets = json.load(stream)['queries']
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.event = self.events[1]
+
+    def assertQueryBudget(self, name, url, page_sizes=(5, 100)):
+        for page_size in page_sizes:
+            # A cold user cache is part of the budget
+            user_cache.local.clear()
+            user_cache.backend.clear()
+            with self.subTest(endpoint=name, page_size=page_size), \
+                    mock.patch.object(PageNumberPagination, 'page_size', page_size), \
+                    self.assertNumQueries(self.budgets[name]):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_event_list(self):
+        """Test the event list query budget."""
+        self.assertQueryBudget('event-list', '/api/events/')
+        self.assertQueryBudget('event-list', '/api/events/?search=Perf&ordering=-start_time')
+
+    def test_event_detail(self):
+        """Test the event detail query budget."""
+        self.assertQueryBudget('event-detail', f'/api/events/{self.event.id}/', page_sizes=(5,))
+
+    def test_event_rsvps_and_reviews(self):
+        """Test the nested rsvps/reviews actions do not query per row."""
+        RSVP.objects.bulk_create([RSVP(event=self.event, user=user) for user in self.users[6:]])
+        self.assertQueryBudget('event-rsvps', f'/api/events/{self.event.id}/rsvps/', page_sizes=(5,))
+        self.assertQueryBudget('event-reviews', f'/api/events/{self.event.id}/reviews/', page_sizes=(5,))
+
+    def test_rsvp_and_review_lists(self):
+        """Test the RSVP and review list query budgets."""
+        self.assertQueryBudget('rsvp-list', '/api/rsvps/')
+        self.assertQueryBudget('review-list', '/api/reviews/')
+
+    def test_event_batch(self):
+        """Test the batch endpoint query budget."""
+        ids = ','.join(str(event.id) for event in self.events[:100])
+        self.assertQueryBudget('event-batch', f'/api/events/batch/?ids={ids}', page_sizes=(5,))
+
+
+@tag('performance')
+class MicrobenchmarkTest(TestCase):
+    """
+    Timed serialization and filter paths compared with the thresholds in
+    performance_budgets.json. Set PERF_THRESHOLD_FACTOR to scale them on
+    slower machines.
+    """
+    databases = '__all__'
+    repeat = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.events = build_dataset()
+        with open(PERFORMANCE_BUDGETS) as stream:
+            cls.thresholds = json.load(stream)['timings_ms']
+        cls.factor = float(os.environ.get('PERF_THRESHOLD_FACTOR', 1))
+
+    def assertFasterThan(self, name, func):
+        func()  # warm up
+        samples = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        median = sorted(samples)[len(samples) // 2]
+        limit = self.thresholds[name] * self.factor
+        self.assertLess(median, limit, f'{name} took {median:.1f} ms (threshold {limit:.1f} ms)')
+
+    def test_projection_serialization(self):
+        """Test projecting and rendering 100 events stays under its threshold."""
+        projection = EventProjection()
+        renderer = FastJSONRenderer()
+
+        def serialize():
+            rows = projection.project(Event.objects.all()[:100])
+            renderer.render(projection.represent_many(rows))
+
+        self.assertFasterThan('event-projection-100', serialize)
+
+    def event_list_queryset(self, params):
+        """The /api/events/ list queryset after EventViewSet's own filter backends."""
+        view = EventViewSet(action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={})
+        view.request = view.initialize_request(APIRequestFactory().get('/api/events/', params))
+        return view.filter_queryset(view.get_queryset())
+
+    def test_search_filter(self):
+        """Test ?search= through the list view's SearchFilter stays under its threshold."""
+        def search():
+            queryset = self.event_list_queryset({'search': 'Event 1', 'ordering': '-start_time'})
+            list(EventProjection(fields=['id', 'title']).project(queryset)[:100])
+
+        self.assertFasterThan('event-search', search)
+
+    def test_organizer_filter(self):
+        """Test filtering by organizer through the list view's filterset stays under its threshold."""
+        def filter_events():
+            queryset = self.event_list_queryset({'organizer__username': 'perf1', 'is_public': 'true'})
+            list(queryset.values_list('id', flat=True))
+
+        self.assertFasterThan('event-filter', filter_events)
+
+    def test_list_filters_are_applied(self):
+        """Test the benchmarked filter paths actually narrow the list."""
+        titles = set(self.event_list_queryset({'search': 'Perf Event 11'}).values_list('title', flat=True))
+        self.assertIn('Perf Event 11', titles)
+        self.assertNotIn('Perf Event 12', titles)
+        organized = self.event_list_queryset({'organizer__username': 'perf1', 'is_public': 'true'})
+        self.assertEqual(set(organized.values_list('organizer__username', flat=True)), {'perf1'})
+
+    def test_profiling_off_overhead(self):
+        """Test the profiling middleware and spans stay under their threshold while disabled."""
+        def view(request):
+            for name in ('auth', 'permissions', 'throttling', 'queryset', 'pagination', 'serialization'):
+                with span(name):
+                    pass
+
+        middleware = ProfilingMiddleware(view)
+        request = RequestFactory().get('/api/events/')
+
+        def requests():
+            for _ in range(1000):
+                middleware(request)
+
+        self.assertFasterThan('profiling-off-1000-requests', requests)
+
+
+class DiscoveryAndHealthTest(APITestCase):
+    """Test cases for cached discovery responses and health checks."""
+    databases = '__all__'
+
+    def setUp(self):
+        readiness.reset()
+
+    def test_api_root_is_cached_per_host(self):
+        """Test discovery documents are built once per host and cacheable."""
+        self.client.get('/api/')
+        hits = _discovery.cache_info().hits
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/')
+        self.assertEqual(_discovery.cache_info().hits, hits + 1)
+        self.assertEqual(response.data['endpoints']['events']['filter'], 'http://testserver/api/events/?location=New%20York')
+        self.assertEqual(response.data['version'], '1.0')
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get('/', secure=True)
+        self.assertEqual(response.data['quick_links']['events'], 'https://testserver/api/events/')
+        self.assertEqual(response.data['status'], 'Running')
+
+    def test_healthz_skips_database(self):
+        """Test the liveness check does no database work."""
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    def test_readyz_caches_database_probe(self):
+        """Test the readiness probe hits the database at most once per TTL."""
+        with self.assertNumQueries(1):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.client.get('/readyz')
+
+    def test_readyz_reports_database_errors(self):
+        """Test readiness fails with 503 when the database is unreachable."""
+        with mock.patch.object(connection, 'cursor', side_effect=OperationalError('database is down')), \
+                self.assertLogs('events.api_views', 'WARNING'):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'database': 'unavailable'})
+
+    @override_settings(SHARDING={'SHARDS': ['default', 'shard1']})
+    def test_readyz_probes_every_shard(self):
+        """Test readiness fails when an RSVP/review shard is unreachable."""
+        shard = mock.Mock()
+        shard.cursor.side_effect = OperationalError('shard is down')
+        with mock.patch('events.api_views.connections', {'default': connection, 'shard1': shard}), \
+                self.assertLogs('events.api_views', 'WARNING') as logs:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("'shard1'", logs.output[0])
+
+
+class AnalyticsTest(APITestCase):
+    """Test cases for the analytics rollups and endpoints."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.guests = [User.objects.create_user(username=f'guest{i}', password='testpass123') for i in range(3)]
+        self.event = Event.objects.create(
+            title='Launch Party',
+            description='Description',
+            organizer=self.organizer,
+            location='Rooftop',
+            start_time=timezone.now() + timedelta(days=7),
+            end_time=timezone.now() + timedelta(days=7, hours=3),
+        )
+
+    def rsvp(self, guest, rsvp_status):
+        self.client.force_authenticate(user=guest)
+        response = self.client.post('/api/rsvps/', {'event': self.event.id, 'status': rsvp_status})
+        self.assertIn(response.status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED))
+        return response.data['id']
+
+    def event_analytics(self, **params):
+        self.client.force_authenticate(user=self.organizer)
+        return self.client.get(f'/api/events/{self.event.id}/analytics/', params)
+
+    def test_writes_update_rollups(self):
+        """Test RSVP and review writes are reflected in the event's analytics."""
+        first = self.rsvp(self.guests[0], 'going')
+        self.rsvp(self.guests[1], 'going')
+        self.rsvp(self.guests[1], 'maybe')  # status change
+        self.rsvp(self.guests[2], 'not_going')
+        self.client.force_authenticate(user=self.guests[0])
+        self.client.delete(f'/api/rsvps/{first}/')
+        for guest, rating in zip(self.guests, (5, 4)):
+            self.client.force_authenticate(user=guest)
+            self.client.post('/api/reviews/', {'event': self.event.id, 'rating': rating, 'comment': 'Nice'})
+
+        response = self.event_analytics()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = {
+            'rsvps': 2, 'new_rsvps': 3, 'going': 0, 'maybe': 1, 'not_going': 1,
+            'reviews': 2, 'average_rating': 4.5,
+        }
+        self.assertEqual(response.data['totals'], expected)
+        self.assertEqual(len(response.data['buckets']), 1)
+        self.assertEqual(HourlyEventStats.objects.count(), 1)
+
+        hourly = self.event_analytics(granularity='hour').data
+        self.assertEqual(hourly['buckets'][0]['maybe'], 1)
+
+    def test_permissions_and_window(self):
+        """Test only the organizer gets event analytics and windows are validated."""
+        self.client.force_authenticate(user=self.guests[0])
+        response = self.client.get(f'/api/events/{self.event.id}/analytics/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        too_old = (timezone.now() - timedelta(days=60)).isoformat()
+        for params in ({'granularity': 'week'}, {'granularity': 'hour', 'start': too_old},
+                       {'start': (timezone.now() - timedelta(days=5000)).isoformat()}):
+            self.assertEqual(self.event_analytics(**params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_organizer_wide_analytics(self):
+        """Test /api/me/analytics/ sums every event of the organizer."""
+        other = Event.objects.create(
+            title='Other', description='Description', organizer=self.organizer, location='Hall',
+            start_time=self.event.start_time, end_time=self.event.end_time,
+        )
+        self.rsvp(self.guests[0], 'going')
+        self.client.force_authenticate(user=self.guests[1])
+        self.client.post('/api/rsvps/', {'event': other.id, 'status': 'going'})
+
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.get('/api/me/analytics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals']['going'], 2)
+        self.client.force_authenticate(user=self.guests[0])
+        self.assertEqual(self.client.get('/api/me/analytics/').data['totals']['rsvps'], 0)
+
+    def test_compact_and_rebuild(self):
+        """Test compaction and rebuilds keep totals and daily buckets."""
+        old = timezone.now() - timedelta(days=30)
+        rsvps = [
+            RSVP.objects.create(event=self.event, user=guest, status=rsvp_status)
+            for guest, rsvp_status in zip(self.guests, ('going', 'going', 'maybe'))
+        ]
+        RSVP.objects.filter(pk__in=[rsvp.pk for rsvp in rsvps[:2]]).update(created_at=old)
+        HourlyEventStats.objects.all().delete()
+        for rsvp in rsvps:
+            analytics.record(
+                self.event.id, self.organizer.id, when=old if rsvp in rsvps[:2] else None,
+                new_rsvps=1, **{analytics.STATUS_COUNTERS[rsvp.status]: 1}
+            )
+        before = self.event_analytics(start=(old - timedelta(days=1)).isoformat()).data
+
+        self.assertEqual(analytics.compact(), (1, 1))
+        self.assertEqual(DailyEventStats.objects.get().going, 2)
+        compacted = self.event_analytics(start=(old - timedelta(days=1)).isoformat()).data
+        self.assertEqual(compacted, before)
+
+        self.assertEqual(analytics.rebuild(), 2)
+        rebuilt = self.event_analytics(start=(old - timedelta(days=1)).isoformat()).data
+        self.assertEqual(rebuilt, before)
+
+
+class IdempotencyKeyTest(APITestCase):
+    """Test cases for Idempotency-Key handling on POST endpoints."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='mobile', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.event = Event.objects.create(
+            title='Test Event',
+            description='Test Description',
+            organizer=self.other,
+            location='Test Location',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=2),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, url, data, key='retry-1'):
+        return self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        """Test a retried POST gets the first response without touching domain tables."""
+        first = self.post('/api/reviews/', {'event': self.event.id, 'rating': 5, 'comment': 'Great'})
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post('/api/reviews/', {'event': self.event.id, 'rating': 5, 'comment': 'Great'})
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertTrue(all('events_idempotencykey' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(Review.objects.count(), 1)
+
+        event_data = {
+            'title': 'Launch', 'description': 'Description', 'location': 'Hall',
+            'start_time': self.event.start_time.isoformat(), 'end_time': self.event.end_time.isoformat(),
+        }
+        self.post('/api/events/', event_data, key='event-1')
+        self.post('/api/events/', event_data, key='event-1')
+        self.assertEqual(Event.objects.filter(title='Launch').count(), 1)
+
+    def test_keys_are_scoped_and_checked(self):
+        """Test keys are per user and cannot be reused for a different request."""
+        self.post('/api/rsvps/', {'event': self.event.id, 'status': 'going'})
+        response = self.post('/api/rsvps/', {'event': self.event.id, 'status': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        self.client.force_authenticate(user=self.other)
+        response = self.post('/api/rsvps/', {'event': self.event.id, 'status': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(RSVP.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY={'WAIT': 0.1, 'LOCK_TIMEOUT': 60})
+    def test_in_progress_and_abandoned_keys(self):
+        """Test a duplicate of a running request gets 409 and abandoned claims are taken over."""
+        data = {'event': self.event.id, 'status': 'going'}
+        self.post('/api/rsvps/', data)
+        # Turn the stored key back into the claim of a request still running
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+
+        response = self.post('/api/rsvps/', data)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        response = self.post('/api/rsvps/', data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # ran again: existing RSVP updated
+        self.assertEqual(IdempotencyKey.objects.get().status_code, status.HTTP_200_OK)
+
+    @override_settings(IDEMPOTENCY={'WAIT': 0, 'LOCK_TIMEOUT': 60})
+    def test_heartbeat_and_late_completion(self):
+        """Test a renewed claim is not taken over, and a taken-over request still completes."""
+        record, _ = claim(self.user, 'slow', 'hash')
+        IdempotencyKey.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertTrue(renew(record))
+        with self.assertRaises(KeyInProgress):
+            claim(self.user, 'slow', 'hash')
+
+        # The original request stalls past the lock timeout and is taken over
+        IdempotencyKey.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        takeover, completed = claim(self.user, 'slow', 'hash')
+        self.assertFalse(completed)
+        self.assertNotEqual(takeover.pk, record.pk)
+        self.assertFalse(renew(record))
+        self.assertFalse(complete(record, 201, {'id': 1}))
+        self.assertTrue(complete(takeover, 201, {'id': 2}))
+        self.assertEqual(IdempotencyKey.objects.get().response_body, {'id': 2})
+
+    def test_expired_keys_are_purged(self):
+        """Test the sweeper removes expired keys and an expired key runs again."""
+        self.post('/api/rsvps/', {'event': self.event.id, 'status': 'going'})
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.post('/api/rsvps/', {'event': self.event.id, 'status': 'going'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # existing RSVP updated
+
+
+class ShardingTest(APITestCase):
+    """
+    Test cases for sharding RSVPs and reviews by event id. The API tests
+    need several shards: DJANGO_RSVP_SHARDS=3 python manage.py test events.tests.ShardingTest
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                description='Description',
+                organizer=self.organizer,
+                location='Hall',
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=2),
+            )
+            for i in range(12)
+        ]
+        self.client.force_authenticate(user=self.guest)
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def test_jump_hash(self):
+        """Test shards are stable and growing the cluster only moves keys to the new shard."""
+        before = [sharding.jump_hash(key, 3) for key in range(3000)]
+        after = [sharding.jump_hash(key, 4) for key in range(3000)]
+        self.assertEqual(set(before), {0, 1, 2})
+        moved = [(old, new) for old, new in zip(before, after) if old != new]
+        self.assertTrue(all(new == 3 for _, new in moved))
+        self.assertLess(abs(len(moved) - 750), 150)
+
+    def test_merged_rows(self):
+        """Test ShardedRows merges ordered querysets and pages like one queryset."""
+        rows = sharding.ShardedRows(
+            [Event.objects.filter(id__in=[event.id for event in self.events[:4]]).values('id'),
+             Event.objects.filter(id__in=[event.id for event in self.events[4:]]).values('id')],
+            ['-id'],
+        )
+        ids = sorted((event.id for event in self.events), reverse=True)
+        self.assertEqual(rows.count(), 12)
+        self.assertEqual([row['id'] for _, row in rows[3:8]], ids[3:8])
+        self.assertEqual({stream for stream, _ in rows}, {0, 1})
+
+    def test_shard_configuration_is_checked(self):
+        """Test unknown shard aliases and backends without id ranges fail the system checks."""
+        self.assertEqual(sharding.check_shards(None), [])
+        with override_settings(SHARDING={'SHARDS': ['default', 'missing']}):
+            self.assertEqual([error.id for error in sharding.check_shards(None)], ['events.E001'])
+        # The first shard keeps its own sequences; later ones need a supported backend
+        with override_settings(SHARDING={'SHARDS': ['default', 'default']}), \
+                mock.patch.object(connection, 'vendor', 'oracle'):
+            self.assertEqual([error.id for error in sharding.check_shards(None)], ['events.E002'])
+
+    @skipUnless(sharding.is_sharded(), 'needs DJANGO_RSVP_SHARDS > 1')
+    def test_rows_are_routed_by_event(self):
+        """Test RSVPs and reviews are stored on their event's shard with disjoint ids."""
+        for event in self.events:
+            self.client.post('/api/rsvps/', {'event': event.id, 'status': 'going'})
+            Review.objects.create(event=event, user=self.guest, rating=4, comment='Fine')
+
+        used = set()
+        for event in self.events:
+            alias = sharding.shard_for(event.id)
+            used.add(alias)
+            rsvp = RSVP.objects.using(alias).get(event=event)
+            floor = sharding.shards().index(alias) * sharding.shard_setting('ID_RANGE')
+            self.assertGreater(rsvp.id, floor)
+            self.assertEqual(Review.objects.using(alias).filter(event=event).count(), 1)
+            for other in sharding.shards():
+                if other != alias:
+                    self.assertFalse(RSVP.objects.using(other).filter(event=event).exists())
+        self.assertGreater(len(used), 1)
+
+        # Counts come from the shards, with or without archived events
+        response = self.client.get('/api/events/', {'page_size': 20, 'include_archived': 'true'})
+        self.assertEqual(response.data['count'], 12)
+        for row in response.data['results']:
+            self.assertEqual((row['rsvp_count'], row['review_count'], row['average_rating']), (1, 1, 4.0))
+
+    @skipUnless(sharding.is_sharded(), 'needs DJANGO_RSVP_SHARDS > 1')
+    def test_lists_merge_shards(self):
+        """Test the per-user listing merges every shard in order and per-event listings read one shard."""
+        for event in self.events:
+            self.client.post('/api/rsvps/', {'event': event.id, 'status': 'maybe'})
+        expected = sorted(
+            (row for queryset in sharding.fan_out(RSVP.objects.all()) for row in queryset.values('id', 'created_at')),
+            key=lambda row: (row['created_at'], row['id']), reverse=True,
+        )
+
+        listed = []
+        page = self.client.get('/api/rsvps/')
+        self.assertEqual(page.data['count'], 12)
+        while True:
+            listed.extend(page.data['results'])
+            if not page.data['next']:
+                break
+            page = self.client.get(page.data['next'])
+        self.assertEqual([row['id'] for row in listed], [row['id'] for row in expected])
+        by_event = {row['event']: row for row in listed}
+        self.assertEqual(by_event[self.events[3].id]['event_title'], 'Event 3')
+        self.assertEqual(by_event[self.events[3].id]['user_username'], 'guest')
+
+        event = self.events[5]
+        response = self.client.get(f'/api/events/{event.id}/rsvps/', {'expand': 'event'})
+        self.assertEqual([row['event']['title'] for row in response.data], ['Event 5'])
+        self.client.post('/api/reviews/', {'event': event.id, 'rating': 3, 'comment': 'Okay'})
+        response = self.client.get('/api/reviews/', {'event': event.id})
+        self.assertEqual([row['event_title'] for row in response.data['results']], ['Event 5'])
+
+    @skipUnless(sharding.is_sharded(), 'needs DJANGO_RSVP_SHARDS > 1')
+    def test_detail_and_cascades(self):
+        """Test detail routes find rows on any shard and deletions cascade across shards."""
+        event = next(event for event in self.events if sharding.shard_for(event.id) != 'default')
+        rsvp_id = self.client.post('/api/rsvps/', {'event': event.id, 'status': 'going'}).data['id']
+        self.assertEqual(self.client.get(f'/api/rsvps/{rsvp_id}/').data['event_title'], event.title)
+        response = self.client.patch(f'/api/rsvps/{rsvp_id}/', {'event': event.id, 'status': 'maybe'})
+        self.assertEqual(response.data['status'], 'maybe')
+        self.assertEqual(sharding.for_event(RSVP, event.id).get().status, 'maybe')
+        self.assertEqual(self.client.get('/api/rsvps/999999999/').status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.post('/api/reviews/', {'event': event.id, 'rating': 5, 'comment': 'Great'})
+        self.client.force_authenticate(user=self.organizer)
+        self.client.delete(f'/api/events/{event.id}/')
+        self.assertFalse(sharding.for_event(RSVP, event.id).exists())
+        self.assertFalse(sharding.for_event(Review, event.id).exists())
+
+    @skipUnless(sharding.is_sharded(), 'needs DJANGO_RSVP_SHARDS > 1')
+    def test_rebalance_moves_misplaced_rows(self):
+        """Test rebalance_shards moves rows written under an older layout."""
+        misplaced = [event for event in self.events if sharding.shard_for(event.id) != 'default']
+        RSVP.objects.using('default').bulk_create([
+            RSVP(event=event, user=self.guest, status='going') for event in misplaced
+        ])
+
+        out = StringIO()
+        call_command('rebalance_shards', '--dry-run', stdout=out)
+        self.assertIn(f'Would move {len(misplaced)} RSVPs and 0 reviews of {len(misplaced)} events.', out.getvalue())
+        self.assertEqual(RSVP.objects.using('default').count(), len(misplaced))
+
+        call_command('rebalance_shards', stdout=StringIO())
+        self.assertFalse(RSVP.objects.using('default').exists())
+        for event in misplaced:
+            self.assertTrue(sharding.for_event(RSVP, event.id).filter(user=self.guest).exists())
+        self.assertEqual(self.client.get('/api/rsvps/').data['count'], len(misplaced))
+
+
+class ChangeLogTest(APITestCase):
+    """Test cases for the change data capture log."""
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='testpass123')
+        self.consumer = User.objects.create_user(username='indexer', password='testpass123', is_staff=True)
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def changes(self, **params):
+        self.client.force_authenticate(user=self.consumer)
+        return self.client.get('/api/changes/', params)
+
+    def test_writes_are_logged_in_order(self):
+        """Test API writes append entries with the row data, and deletions cascade into the log."""
+        self.client.force_authenticate(user=self.organizer)
+        event_id = self.client.post('/api/events/', {
+            'title': 'Launch', 'description': 'Description', 'location': 'Hall',
+            'start_time': (timezone.now() + timedelta(days=1)).isoformat(),
+            'end_time': (timezone.now() + timedelta(days=2)).isoformat(),
+        }).data['id']
+        rsvp_id = self.client.post('/api/rsvps/', {'event': event_id, 'status': 'going'}).data['id']
+        self.client.post('/api/rsvps/', {'event': event_id, 'status': 'maybe'})
+        self.client.delete(f'/api/events/{event_id}/')
+
+        response = self.changes()
+        self.assertEqual(
+            [(row['type'], row['id'], row['action']) for row in response.data['results']],
+            [('event', event_id, 'created'), ('rsvp', rsvp_id, 'created'), ('rsvp', rsvp_id, 'updated'),
+             ('rsvp', rsvp_id, 'deleted'), ('event', event_id, 'deleted')],
+        )
+        self.assertEqual(response.data['results'][2]['data']['status'], 'maybe')
+        self.assertEqual(response.data['results'][2]['event'], event_id)
+        self.assertIsNone(response.data['results'][3]['data'])
+        self.assertFalse(response.data['has_more'])
+
+        page = self.changes(after=response.data['results'][1]['seq'], limit=2)
+        self.assertEqual([row['action'] for row in page.data['results']], ['updated', 'deleted'])
+        self.assertTrue(page.data['has_more'])
+        self.assertEqual(page.data['cursor'], page.data['results'][-1]['seq'])
+
+        self.client.force_authenticate(user=self.organizer)
+        self.assertEqual(self.client.get('/api/changes/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.changes(limit=0).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reader_waits_for_young_gaps(self):
+        """Test reads stop before a gap until the entry after it has settled."""
+        entries = ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(object_type='event', object_id=i, action='created', event_id=i) for i in range(1, 5)
+        ])
+        ChangeLogEntry.objects.filter(seq=entries[1].seq).delete()  # a transaction still committing
+
+        found, cursor = changelog.read(after=0)
+        self.assertEqual([entry.seq for entry in found], [entries[0].seq])
+        self.assertEqual(cursor, entries[0].seq)
+        found, cursor = changelog.read(after=cursor, now=timezone.now() + timedelta(seconds=60))
+        self.assertEqual([entry.seq for entry in found], [entries[2].seq, entries[3].seq])
+
+    def test_compaction_keeps_latest_change(self):
+        """Test compaction drops superseded entries and old tombstones but keeps each latest change."""
+        def log(object_id, action, age_days):
+            entry = ChangeLogEntry.objects.create(object_type='rsvp', object_id=object_id, action=action, event_id=1)
+            ChangeLogEntry.objects.filter(pk=entry.pk).update(changed_at=timezone.now() - timedelta(days=age_days))
+            return entry.seq
+
+        log(1, 'created', 40)
+        kept_old = log(1, 'updated', 20)
+        log(2, 'created', 40)
+        log(2, 'deleted', 40)
+        log(3, 'created', 10)
+        recent = log(3, 'updated', 1)
+        young = log(4, 'created', 3)
+        young_update = log(4, 'updated', 2)
+
+        out = StringIO()
+        call_command('compact_changes', stdout=out)
+        self.assertIn('Removed 4 change log entries.', out.getvalue())
+        self.assertEqual(
+            list(ChangeLogEntry.objects.values_list('seq', flat=True)), [kept_old, recent, young, young_update]
+        )
+
+    def test_tail_changes_resumes_from_cursor_file(self):
+        """Test tail_changes prints JSON lines and continues after the saved cursor."""
+        for i in range(3):
+            Event.objects.create(
+                title=f'Event {i}', description='Description', organizer=self.organizer, location='Hall',
+                start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1),
+            )
+        with tempfile.TemporaryDirectory() as directory:
+            cursor_file = os.path.join(directory, 'cursor')
+            out = StringIO()
+            call_command('tail_changes', cursor_file=cursor_file, limit=2, stdout=out)
+            lines = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertEqual([line['data']['title'] for line in lines], ['Event 0', 'Event 1', 'Event 2'])
+
+            Event.objects.filter(title='Event 1').get().delete()
+            out = StringIO()
+            call_command('tail_changes', cursor_file=cursor_file, stdout=out)
+            lines = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertEqual([line['action'] for line in lines], ['deleted'])
+
+
+class ProfilingTest(APITestCase):
+    """Test request spans, Server-Timing, per-endpoint stats and sampled profiles."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user(username='member', password='pass12345')
+        for i in range(3):
+            Event.objects.create(
+                title=f'Event {i}', description='Description', organizer=self.user, location='Hall',
+                start_time=timezone.now() + timedelta(days=1), end_time=timezone.now() + timedelta(days=1, hours=1),
+            )
+        endpoint_stats.reset()
+        self.addCleanup(endpoint_stats.reset)
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def test_server_timing_only_when_enabled(self):
+        """Test span timings are sent in Server-Timing only while profiling is enabled."""
+        self.assertNotIn('Server-Timing', self.client.get('/api/events/'))
+
+        with override_settings(PROFILING={'ENABLED': True}):
+            response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response['Server-Timing']
+        for name in ('auth', 'permissions', 'queryset', 'filters', 'pagination', 'serialization', 'rendering'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('total;dur=', timing)
+
+    async def test_async_requests_are_traced(self):
+        """Test requests through the ASGI handler are traced, with queries from the view's thread."""
+        async def view(request):
+            return JsonResponse({})
+
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(view)))
+        with override_settings(PROFILING={'ENABLED': True}):
+            response = await self.async_client.get('/api/events/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialization;dur=', response['Server-Timing'])
+
+    def test_staff_header_writes_folded_profile(self):
+        """Test X-Profile: 1 from a staff user writes a collapsed-stack file; other users are ignored."""
+        prepare = EventProjection.prepare
+
+        def slow_prepare(projection, rows):
+            time.sleep(0.05)
+            return prepare(projection, rows)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(PROFILING={'ENABLED': True, 'PROFILE_DIR': directory, 'INTERVAL': 0.001}), \
+                mock.patch.object(EventProjection, 'prepare', slow_prepare):
+            self.client.force_authenticate(user=self.user)
+            response = self.client.get('/api/events/', HTTP_X_PROFILE='1')
+            self.assertNotIn('X-Profile-File', response)
+            self.assertEqual(os.listdir(directory), [])
+
+            self.client.force_authenticate(user=self.staff)
+            response = self.client.get('/api/events/', HTTP_X_PROFILE='1')
+            path = os.path.join(directory, response['X-Profile-File'])
+            with open(path) as stream:
+                stacks = [line.rsplit(' ', 1) for line in stream.read().splitlines()]
+
+        self.assertTrue(path.endswith('.folded'))
+        self.assertTrue(all(int(count) > 0 for _, count in stacks))
+        self.assertTrue(any(
+            stack.startswith('[serialization];') and 'slow_prepare' in stack for stack, _ in stacks
+        ))
+
+    def test_endpoint_stats(self):
+        """Test timings are aggregated per endpoint and shown by profile_stats."""
+        with override_settings(PROFILING={'ENABLED': True, 'STATS_FLUSH_EVERY': 1}):
+            self.client.get('/api/events/')
+            self.client.get('/api/events/')
+            self.client.get(f'/api/events/{Event.objects.first().pk}/')
+
+        stats = endpoint_stats.shared_stats()
+        self.assertEqual(stats['GET:events-list']['requests'], 2)
+        self.assertEqual(stats['GET:events-detail']['requests'], 1)
+        self.assertGreater(stats['GET:events-list']['serialization'], 0)
+
+        out = StringIO()
+        call_command('profile_stats', reset=True, stdout=out)
+        self.assertRegex(out.getvalue(), r'GET:events-list\s+2 requests')
+        self.assertEqual(endpoint_stats.shared_stats(), {})
@@ -0,0 +1,167 @@
+"""
+Token-bucket throttles for write endpoints.
+
+Rates are configured per scope in settings.THROTTLING['RATES']. A viewset
+action's scope is "<basename>.<action>" (e.g. "rsvps.create"); other views
+set a `throttle_scope` attribute. Scopes without a configured rate are not
+throttled, so read endpoints stay unthrottled by default.
+
+Clients are identified by REMOTE_ADDR. X-Forwarded-For is only trusted
+behind THROTTLING['NUM_PROXIES'] reverse proxies, which each append the
+address they received the request from; otherwise a client could pick a
+new identity for every request.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+DEFAULTS = {
+    'STORE': 'events.throttling.InMemoryBucketStore',
+    'CACHE_ALIAS': 'default',
+    'MAX_KEYS': 100000,
+    'NUM_PROXIES': 0,
+    'RATES': {},
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttle_setting(name):
+    """Read a THROTTLING setting, falling back to the module default."""
+    return getattr(settings, 'THROTTLING', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """Parse '30/min' into (capacity, tokens_per_second)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+def take_token(bucket, capacity, refill, now):
+    """
+    Refill a (tokens, timestamp) bucket and try to take one token.
+    Returns (new_bucket, wait) where wait is 0 when the token was granted.
+    """
+    tokens, stamp = bucket if bucket else (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill
+
+
+class InMemoryBucketStore:
+    """Per-process bucket store, bounded to MAX_KEYS least recently used keys."""
+
+    def __init__(self):
+        self.max_keys = throttle_setting('MAX_KEYS')
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill, now):
+        with self._lock:
+            bucket, wait = take_token(self._buckets.pop(key, None), capacity, refill, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Bucket store shared between processes through a Django cache backend.
+    The read-modify-write is not atomic, so concurrent requests for one key
+    may occasionally both be admitted.
+    """
+
+    def __init__(self):
+        self.cache = caches[throttle_setting('CACHE_ALIAS')]
+
+    def consume(self, key, capacity, refill, now):
+        cache_key = f'throttle:{key}'
+        bucket, wait = take_token(self.cache.get(cache_key), capacity, refill, now)
+        self.cache.set(cache_key, bucket, timeout=int(capacity / refill) + 1)
+        return wait
+
+    def clear(self):
+        self.cache.clear()
+
+
+_stores = {}
+
+
+def get_store():
+    """Return the configured bucket store, shared by all throttle instances."""
+    path = throttle_setting('STORE')
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base token-bucket throttle; subclasses pick the rate key and identity."""
+    rate_key = None
+    timer = time.time
+
+    def get_scope(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        action = getattr(view, 'action', None)
+        basename = getattr(view, 'basename', None)
+        if action and basename:
+            return f'{basename}.{action}'
+        return None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        scope = self.get_scope(view)
+        rate = throttle_setting('RATES').get(scope, {}).get(self.rate_key) if scope else None
+        if not rate:
+            return True
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        capacity, refill = parse_rate(rate)
+        self.wait_time = get_store().consume(f'{scope}:{self.rate_key}:{ident}', capacity, refill, self.timer())
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time or None
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle authenticated users by user id."""
+    rate_key = 'user'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle every client by IP address."""
+    rate_key = 'ip'
+
+    def get_ident_key(self, request):
+        num_proxies = throttle_setting('NUM_PROXIES')
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if num_proxies and forwarded:
+            # The address our outermost trusted proxy received the request from
+            addresses = [address.strip() for address in forwarded.split(',')]
+            return addresses[-min(num_proxies, len(addresses))]
+        return request.META.get('REMOTE_ADDR')
@@ -1,13 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EventViewSet, RSVPViewSet, ReviewViewSet
+from .views import EventViewSet, RSVPViewSet, ReviewViewSet, WebhookSubscriptionViewSet, changes, my_analytics
 
-# Create a router for the events app
+# The only router for the API; included under api/ by event_management/urls.py.
+# Basenames double as throttle scope prefixes (see events/throttling.py).
 router = DefaultRouter()
-router.register(r'events', EventViewSet, basename='event')
-router.register(r'rsvps', RSVPViewSet, basename='rsvp')
-router.register(r'reviews', ReviewViewSet, basename='review')
+router.register(r'events', EventViewSet, basename='events')
+router.register(r'rsvps', RSVPViewSet, basename='rsvps')
+router.register(r'reviews', ReviewViewSet, basename='reviews')
+router.register(r'webhooks', WebhookSubscriptionViewSet, basename='webhooks')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('me/analytics/', my_analytics, name='my-analytics'),
+    path('changes/', changes, name='changes'),
 ]
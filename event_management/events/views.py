@@ -1,61 +1,229 @@
-from rest_framework import viewsets, status, generics
-from rest_framework.decorators import action
+from rest_framework import viewsets, status, serializers
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import Http404
+from django.db import transaction
+from django.utils import timezone
+from itertools import islice
 
-from .models import Event, RSVP, Review, UserProfile
+from .models import (
+    Event, RSVP, Review, WebhookSubscription,
+    ArchivedEvent, ArchivedRSVP, ArchivedReview
+)
 from .serializers import (
-    EventSerializer, RSVPSerializer, ReviewSerializer, 
-    RegisterSerializer, UserProfileSerializer
+    EventSerializer, RSVPSerializer, ReviewSerializer, WebhookSubscriptionSerializer
 )
 from .permissions import IsOrganizerOrReadOnly, IsInvitedOrPublic
+from .projections import (
+    EventProjection, ArchivedEventProjection, RSVPProjection, ReviewProjection, parse_field_list
+)
+from .idempotency import IdempotentCreateMixin
+from .profiling import TracedViewMixin, span, traced
+from .sharding import ShardedRows
+from . import analytics, changelog, recurrence, sharding
+
+
+def parse_datetime_param(data, name, required=False):
+    """Parse an ISO 8601 datetime from request data or query params."""
+    value = data.get(name)
+    if not value:
+        if required:
+            raise serializers.ValidationError({name: ['This field is required.']})
+        return None
+    try:
+        return serializers.DateTimeField().to_internal_value(value)
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({name: exc.detail})
 
 
-class RegisterView(generics.CreateAPIView):
+def analytics_window(params):
     """
-    API view for user registration.
-    Allows anyone to create a new user account.
+    Parse ?granularity=, ?start= and ?end= for the analytics endpoints.
+    The window is widened to whole buckets.
     """
-    serializer_class = RegisterSerializer
-    permission_classes = [AllowAny]
+    granularity = params.get('granularity', 'day')
+    if granularity not in analytics.GRANULARITIES:
+        raise serializers.ValidationError({'granularity': 'Must be "hour" or "day".'})
+    step = analytics.GRANULARITIES[granularity]
+    floor = analytics.hour_bucket if granularity == 'hour' else analytics.day_bucket
 
-    def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        return Response({
-            'user': {
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-            },
-            'message': 'User registered successfully. Please login to get your token.'
-        }, status=status.HTTP_201_CREATED)
+    end = parse_datetime_param(params, 'end') or timezone.now()
+    end = floor(end) + step if floor(end) < end else floor(end)
+    start = parse_datetime_param(params, 'start')
+    start = floor(start) if start else end - analytics.DEFAULT_BUCKETS[granularity] * step
+    if start >= end:
+        raise serializers.ValidationError({'start': 'Must be before end.'})
+
+    max_buckets = analytics.analytics_setting('MAX_BUCKETS')
+    if (end - start) / step > max_buckets:
+        raise serializers.ValidationError({'start': f'The window can span at most {max_buckets} {granularity}s.'})
+    if granularity == 'hour' and start < analytics.hourly_horizon():
+        days = analytics.analytics_setting('HOURLY_RETENTION_DAYS')
+        raise serializers.ValidationError(
+            {'start': f'Hourly buckets are kept for the last {days} days; use granularity=day.'}
+        )
+    return start, end, granularity
+
+
+class ProjectedListMixin:
+    """
+    Serve list() from a values() projection instead of the ModelSerializer.
+    The projection produces the same output as `serializer_class`, narrowed
+    by the `fields` and `expand` query parameters.
+
+    Views that define `get_archived_queryset()` also accept
+    `?include_archived=true`, which lists the hot and archive tables
+    together through a UNION ALL.
+
+    Views whose `get_shard_querysets()` returns querysets on several
+    databases list them (and the archive) merged in Python instead.
+    """
+    projection_class = None
+    archived_projection_class = None
+
+    def get_projection(self):
+        return self.projection_class.from_request(self.request)
+
+    def get_archived_projection(self):
+        return (self.archived_projection_class or self.projection_class).from_request(self.request)
+
+    def get_archived_queryset(self):
+        return None
+
+    def get_shard_querysets(self, queryset):
+        """Querysets to read and merge instead of `queryset`, or None."""
+        return None
+
+    def include_archived(self):
+        return self.request.query_params.get('include_archived', '').lower() in ('true', '1', 'yes')
+
+    def ordering_of(self, queryset):
+        ordering = [key for key in queryset.query.order_by if isinstance(key, str)]
+        return ordering or list(queryset.model._meta.ordering)
+
+    def with_archived(self, queryset, projection):
+        """Project the hot queryset and its archive counterpart into one ordered union."""
+        ordering = self.ordering_of(queryset)
+        ordering_columns = [key.lstrip('-') for key in ordering]
+
+        archived = self.filter_queryset(self.get_archived_queryset())
+        hot = projection.project(queryset.order_by(), extra=ordering_columns)
+        cold = self.get_archived_projection().project(archived.order_by(), extra=ordering_columns)
+        return hot.union(cold, all=True).order_by(*ordering)
+
+    def sharded_list(self, querysets, projection):
+        """List rows from several databases, merged by the queryset ordering plus id."""
+        ordering = self.ordering_of(querysets[0])
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('id')
+        ordering_columns = [key.lstrip('-') for key in ordering]
+
+        streams = [(projection, projection.project(queryset.order_by(), extra=ordering_columns))
+                   for queryset in querysets]
+        if self.include_archived() and self.get_archived_queryset() is not None:
+            archived_projection = self.get_archived_projection()
+            archived = self.filter_queryset(self.get_archived_queryset())
+            streams.append(
+                (archived_projection, archived_projection.project(archived.order_by(), extra=ordering_columns))
+            )
+        rows = ShardedRows([queryset for _, queryset in streams], ordering)
+
+        page = self.paginate_queryset(rows)
+        items = page if page is not None else list(rows)
+        with span('serialization'):
+            pages = {}
+            for stream, row in items:
+                pages.setdefault(streams[stream][0], []).append(row)
+            for stream_projection, stream_rows in pages.items():
+                stream_projection.prepare(stream_rows)
+            data = [streams[stream][0].represent(row) for stream, row in items]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_projection()
+        queryset = self.filter_queryset(self.get_queryset())
+        querysets = self.get_shard_querysets(queryset)
+        if querysets is not None:
+            return self.sharded_list(querysets, projection)
+        if self.include_archived() and self.get_archived_queryset() is not None:
+            queryset = self.with_archived(queryset, projection)
+        else:
+            queryset = projection.project(queryset)
 
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.represent_many(page))
 
-class EventViewSet(viewsets.ModelViewSet):
+        return Response(projection.represent_many(queryset))
+
+
+class ShardedRowsMixin:
+    """
+    For the RSVP and review viewsets: list every shard, and find a detail
+    object on whichever shard holds it (see events.sharding).
+    """
+
+    def get_shard_querysets(self, queryset):
+        if not sharding.is_sharded():
+            return None
+        return sharding.fan_out(queryset)
+
+    def get_object(self):
+        if not sharding.is_sharded():
+            return super().get_object()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = sharding.find(self.filter_queryset(self.get_queryset()), **lookup)
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class EventViewSet(IdempotentCreateMixin, TracedViewMixin, ProjectedListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Event model.
     Provides CRUD operations for events with filtering and search.
     """
     serializer_class = EventSerializer
+    projection_class = EventProjection
+    archived_projection_class = ArchivedEventProjection
     permission_classes = [IsAuthenticatedOrReadOnly, IsOrganizerOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['location', 'is_public', 'organizer__username']
     search_fields = ['title', 'description', 'location', 'organizer__username']
     ordering_fields = ['start_time', 'created_at', 'title']
 
+    @traced('queryset')
     def get_queryset(self):
         """
         Filter queryset to show only public events for unauthenticated users.
         Authenticated users can see public events and their own private events.
         """
         queryset = Event.objects.all()
-        
+
+        if self.action in ('retrieve', 'rsvps', 'reviews'):
+            # The instance is only used for permission checks; output comes from a projection
+            queryset = queryset.only('id', 'is_public', 'organizer')
+        elif self.action == 'analytics':
+            queryset = queryset.only('id', 'is_public', 'organizer', 'recurrence')
+
+        return self.visible(queryset)
+
+    def get_archived_queryset(self):
+        """Archived events, with the same visibility rules."""
+        return self.visible(ArchivedEvent.objects.all())
+
+    def visible(self, queryset):
         if not self.request.user.is_authenticated:
             # Unauthenticated users can only see public events
             return queryset.filter(is_public=True)
@@ -67,7 +235,18 @@ class EventViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Set the organizer to the current user when creating an event."""
-        serializer.save(organizer=self.request.user)
+        with transaction.atomic():
+            serializer.save(organizer=self.request.user)
+
+    def perform_update(self, serializer):
+        """Save the event and its change log entry in one transaction."""
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        """Delete the event, its RSVPs and reviews and their change log entries in one transaction."""
+        with transaction.atomic():
+            instance.delete()
 
     def retrieve(self, request, *args, **kwargs):
         """
@@ -84,42 +263,179 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        serializer = self.get_serializer(instance)
+        projection = self.get_projection()
+        rows = projection.project(Event.objects.filter(pk=instance.pk))
+        return Response(projection.represent_many(rows)[0])
+
+    def list(self, request, *args, **kwargs):
+        """
+        List events. With ?expand_recurring=true, recurring events are
+        expanded into their occurrences in the ?start=/?end=/?limit= window,
+        after the usual filters and search, and entries are returned in the
+        /calendar/ format ordered by start time.
+        """
+        if request.query_params.get('expand_recurring', '').lower() in ('true', '1', 'yes'):
+            start, end, limit = self.occurrence_window(request)
+            entries = recurrence.calendar(self.filter_queryset(self.get_queryset()), start, end, limit)
+            return Response({'results': recurrence.represent(entries)})
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
+    def batch(self, request):
+        """
+        Get many events by id in one request: /api/events/batch/?ids=1,2,3
+        Results are returned in request order, each with its own status.
+        Ids that do not exist or are not visible to the caller are both
+        reported as not found, as on the detail endpoint.
+        """
+        raw_ids = parse_field_list(request.query_params.get('ids')) or []
+        if not raw_ids:
+            return Response({'detail': 'Provide event ids as ?ids=1,2,3.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(value) for value in raw_ids]
+        except ValueError:
+            return Response({'detail': 'Event ids must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = getattr(settings, 'EVENT_BATCH_MAX_SIZE', 100)
+        if len(ids) > max_size:
+            return Response(
+                {'detail': f'At most {max_size} ids can be requested at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One annotated query over the events the caller may see
+        projection = self.get_projection()
+        queryset = projection.project(self.get_queryset().filter(pk__in=set(ids)).order_by())
+        page = list(queryset.values('pk', *projection.columns()))
+        rows = dict(zip([row['pk'] for row in page], projection.represent_many(page)))
+
+        results = []
+        for pk in ids:
+            if pk in rows:
+                results.append({'id': pk, 'status': status.HTTP_200_OK, 'data': rows[pk]})
+            else:
+                results.append({'id': pk, 'status': status.HTTP_404_NOT_FOUND, 'detail': 'Not found.'})
+        return Response({'results': results})
+
+    def occurrence_window(self, request):
+        """Parse ?start=, ?end= and ?limit= for the occurrence listings."""
+        params = request.query_params
+        start = parse_datetime_param(params, 'start') or timezone.now()
+        end = parse_datetime_param(params, 'end')
+        max_limit = getattr(settings, 'EVENT_OCCURRENCE_MAX_LIMIT', 10000)
+        try:
+            limit = int(params.get('limit', 100))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Must be an integer.'})
+        if not 1 <= limit <= max_limit:
+            raise serializers.ValidationError({'limit': f'Must be between 1 and {max_limit}.'})
+        return start, end, limit
+
+    @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticatedOrReadOnly, IsOrganizerOrReadOnly])
+    def occurrences(self, request, pk=None):
+        """
+        GET: occurrences of a recurring event, expanded for the requested window.
+        POST: store one occurrence (by occurrence_start) and apply overrides to it.
+        """
+        series = self.get_object()
+        if not series.recurrence:
+            return Response({'detail': 'This event does not recur.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'GET':
+            start, end, limit = self.occurrence_window(request)
+            entries = islice(recurrence.expand_series(series, start, end), limit)
+            return Response({'results': recurrence.represent(entries)})
+
+        original_start = parse_datetime_param(request.data, 'occurrence_start', required=True)
+        overrides = {key: value for key, value in request.data.items() if key != 'occurrence_start'}
+        with transaction.atomic():
+            try:
+                occurrence = recurrence.materialize(series, original_start)
+            except ValueError as exc:
+                return Response({'occurrence_start': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = self.get_serializer(occurrence, data=overrides, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
+    def calendar(self, request):
+        """
+        Visible events and expanded occurrences of recurring events in a
+        window, ordered by start time: /api/events/calendar/?start=&end=&limit=
+        """
+        start, end, limit = self.occurrence_window(request)
+        entries = recurrence.calendar(self.visible(Event.objects.all()), start, end, limit)
+        return Response({'results': recurrence.represent(entries)})
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def analytics(self, request, pk=None):
+        """
+        RSVP and review activity of an event from the rollup tables, for its
+        organizer: /api/events/{id}/analytics/?granularity=day&start=&end=
+        """
+        event = self.get_object()
+        if event.organizer_id != request.user.id:
+            return Response(
+                {'detail': 'Only the organizer can view event analytics.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        start, end, granularity = analytics_window(request.query_params)
+        event_ids = [event.id]
+        if event.recurrence:
+            # A series reports the activity of its stored occurrences too
+            event_ids.extend(event.occurrences.values_list('id', flat=True))
+        report = analytics.report({'event_id__in': event_ids}, start, end, granularity)
+        return Response({'event': event.id, **report})
+
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
     def rsvps(self, request, pk=None):
         """Get all RSVPs for a specific event."""
         event = self.get_object()
-        rsvps = event.rsvps.all()
-        serializer = RSVPSerializer(rsvps, many=True)
-        return Response(serializer.data)
+        projection = RSVPProjection.from_request(request)
+        return Response(projection.represent_many(projection.project(event.rsvps.all())))
 
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticatedOrReadOnly])
     def reviews(self, request, pk=None):
         """Get all reviews for a specific event."""
         event = self.get_object()
-        reviews = event.reviews.all()
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        projection = ReviewProjection.from_request(request)
+        return Response(projection.represent_many(projection.project(event.reviews.all())))
 
 
-class RSVPViewSet(viewsets.ModelViewSet):
+class RSVPViewSet(IdempotentCreateMixin, TracedViewMixin, ShardedRowsMixin, ProjectedListMixin, viewsets.ModelViewSet):
     """
     ViewSet for RSVP model.
     Allows users to RSVP to events.
     """
     serializer_class = RSVPSerializer
+    projection_class = RSVPProjection
     permission_classes = [IsAuthenticated]
 
+    @traced('queryset')
     def get_queryset(self):
         """Return RSVPs for the current user."""
         return RSVP.objects.filter(user=self.request.user)
 
+    def get_archived_queryset(self):
+        """Return the current user's RSVPs to archived events."""
+        return ArchivedRSVP.objects.filter(user=self.request.user)
+
     def perform_create(self, serializer):
         """Set the user to the current user when creating an RSVP."""
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        """Save the RSVP and its webhook outbox rows in one transaction."""
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        """Delete the RSVP and queue its webhooks in one transaction."""
+        with transaction.atomic():
+            instance.delete()
+
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Create a new RSVP or update existing one.
@@ -134,36 +450,63 @@ class RSVPViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # RSVPs to one occurrence of a recurring event go to its stored row
+        if event.recurrence and request.data.get('occurrence_start'):
+            original_start = parse_datetime_param(request.data, 'occurrence_start')
+            try:
+                event = recurrence.materialize(event, original_start)
+            except ValueError as exc:
+                return Response({'occurrence_start': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+            data = {key: value for key, value in request.data.items() if key != 'occurrence_start'}
+            data['event'] = event.id
+        else:
+            data = request.data
+
         # Check if RSVP already exists
-        existing_rsvp = RSVP.objects.filter(event=event, user=request.user).first()
+        existing_rsvp = sharding.for_event(RSVP, event.id).filter(user=request.user).first()
         
         if existing_rsvp:
             # Update existing RSVP
-            serializer = self.get_serializer(existing_rsvp, data=request.data, partial=True)
+            serializer = self.get_serializer(existing_rsvp, data=data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         # Create new RSVP
-        serializer = self.get_serializer(data=request.data)
+        serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(IdempotentCreateMixin, TracedViewMixin, ShardedRowsMixin, ProjectedListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Review model.
     Allows users to leave reviews for events.
     """
     serializer_class = ReviewSerializer
+    projection_class = ReviewProjection
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    @traced('queryset')
     def get_queryset(self):
         """
         Return all reviews or filter by event_id if provided.
         """
-        queryset = Review.objects.all()
+        return self.for_event(Review.objects.all())
+
+    def get_archived_queryset(self):
+        """Return archived reviews, filtered the same way."""
+        return self.for_event(ArchivedReview.objects.all())
+
+    def get_shard_querysets(self, queryset):
+        """Reviews of one event are all on its shard."""
+        event_id = self.request.query_params.get('event', '')
+        if sharding.is_sharded() and event_id.isdigit():
+            return [queryset.using(sharding.shard_for(event_id))]
+        return super().get_shard_querysets(queryset)
+
+    def for_event(self, queryset):
         event_id = self.request.query_params.get('event', None)
         
         if event_id is not None:
@@ -175,6 +518,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
         """Set the user to the current user when creating a review."""
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        """Save the review and its webhook outbox rows in one transaction."""
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        """Delete the review and queue its webhooks in one transaction."""
+        with transaction.atomic():
+            instance.delete()
+
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Create a new review.
@@ -191,7 +545,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
             )
 
         # Check if user has already reviewed this event
-        existing_review = Review.objects.filter(event=event, user=request.user).first()
+        existing_review = sharding.for_event(Review, event.id).filter(user=request.user).first()
         
         if existing_review:
             return Response(
@@ -206,5 +560,62 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_analytics(request):
+    """
+    RSVP and review activity across every event the current user organizes,
+    archived events included: /api/me/analytics/?granularity=day&start=&end=
+    """
+    start, end, granularity = analytics_window(request.query_params)
+    report = analytics.report({'organizer': request.user}, start, end, granularity)
+    return Response({'organizer': request.user.id, **report})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def changes(request):
+    """
+    Changes to events, RSVPs and reviews after a cursor, oldest first, for
+    incremental consumers: /api/changes/?after=<seq>&limit=100
+    Pass the returned `cursor` as `after` to get the next changes.
+    """
+    max_limit = changelog.changes_setting('MAX_LIMIT')
+    try:
+        after = int(request.query_params.get('after', 0))
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        raise serializers.ValidationError({'detail': 'after and limit must be integers.'})
+    if after < 0:
+        raise serializers.ValidationError({'after': 'Must be zero or more.'})
+    if not 1 <= limit <= max_limit:
+        raise serializers.ValidationError({'limit': f'Must be between 1 and {max_limit}.'})
+
+    entries, cursor = changelog.read(after, limit)
+    return Response({
+        'results': [changelog.represent(change) for change in entries],
+        'cursor': cursor,
+        'has_more': len(entries) == limit,
+    })
+
+
+class WebhookSubscriptionViewSet(TracedViewMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for WebhookSubscription model.
+    Organizers manage the endpoints that receive their RSVP and review changes.
+    """
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+
+    @traced('queryset')
+    def get_queryset(self):
+        """Return subscriptions owned by the current user."""
+        return WebhookSubscription.objects.filter(organizer=self.request.user)
+
+    def perform_create(self, serializer):
+        """Set the organizer to the current user when creating a subscription."""
+        serializer.save(organizer=self.request.user)
+
+
 # Import models for Q query
 from django.db import models
@@ -0,0 +1,355 @@
+"""
+Outbound webhook delivery for organizers.
+
+Changes to RSVPs and reviews are recorded in the WebhookOutbox table in the
+same transaction as the change itself. The WebhookDeliverer drains the
+outbox out of band so third-party endpoints never sit on the request path.
+
+Several delivery workers can run at once: each leases the rows it takes
+(SELECT ... FOR UPDATE SKIP LOCKED, then moves next_attempt_at out by
+WEBHOOKS['CLAIM_TIMEOUT']), so no row is sent by two workers. SQLite has
+no row locks; run a single worker there. A row waits while an older row
+for the same subscription and object is still in retry backoff, so a
+subscriber never sees an older state after a newer one. Rows that fail
+WEBHOOKS['MAX_ATTEMPTS'] times are marked failed; `purge_webhook_outbox`
+removes delivered and failed rows after WEBHOOKS['RETENTION_DAYS'].
+
+Subscription URLs must be http(s) and resolve to public addresses, which
+is checked when a subscription is saved and again before every delivery
+(set WEBHOOKS['ALLOW_PRIVATE_ADDRESSES'] for local development). Each
+delivery round resolves a subscription's host once and connects to the
+address it checked, with the Host header and TLS server name still set to
+the host name, so DNS cannot point the connection elsewhere in between.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import random
+import socket
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from queue import Empty, LifoQueue
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import WebhookOutbox, WebhookSubscription
+
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'MAX_WORKERS': 8,
+    'TIMEOUT': 5,
+    'MAX_ATTEMPTS': 8,
+    'RETRY_BASE_DELAY': 2,
+    'RETRY_MAX_DELAY': 600,
+    'POOL_SIZE': 4,
+    'CLAIM_TIMEOUT': 300,
+    'RETENTION_DAYS': 7,
+    'ALLOW_PRIVATE_ADDRESSES': False,
+}
+
+
+def webhook_setting(name):
+    """Read a WEBHOOKS setting, falling back to the module default."""
+    return getattr(settings, 'WEBHOOKS', {}).get(name, DEFAULTS[name])
+
+
+def enqueue(instance, action):
+    """
+    Record a change to an RSVP or Review for every active subscription
+    of the event's organizer. Must be called inside the write transaction.
+    """
+    subscriptions = list(WebhookSubscription.objects.filter(
+        organizer__organized_events=instance.event_id, is_active=True
+    ).values_list('id', flat=True))
+    if not subscriptions:
+        return
+
+    model_name = instance._meta.model_name
+    payload = {
+        'type': f'{model_name}.{action}',
+        'object': model_name,
+        'id': instance.pk,
+        'event': instance.event_id,
+        'user': instance.user_id,
+        'occurred_at': timezone.now().isoformat(),
+    }
+    if model_name == 'rsvp':
+        payload['status'] = instance.status
+    else:
+        payload['rating'] = instance.rating
+
+    now = timezone.now()
+    WebhookOutbox.objects.bulk_create([
+        WebhookOutbox(
+            subscription_id=subscription_id,
+            event_type=payload['type'],
+            object_key=f'{model_name}:{instance.pk}',
+            payload=payload,
+            next_attempt_at=now,
+        )
+        for subscription_id in subscriptions
+    ])
+
+
+def retry_delay(attempts):
+    """Exponential backoff with full jitter, in seconds."""
+    ceiling = min(webhook_setting('RETRY_MAX_DELAY'), webhook_setting('RETRY_BASE_DELAY') * 2 ** attempts)
+    return random.uniform(0, ceiling)
+
+
+def coalesce(rows):
+    """
+    Collapse pending rows for the same object into the latest one.
+    Returns (rows_to_send, superseded_rows), preserving outbox order.
+    """
+    latest = OrderedDict()
+    superseded = []
+    for row in rows:
+        previous = latest.pop(row.object_key, None)
+        if previous is not None:
+            superseded.append(previous)
+        latest[row.object_key] = row
+    return list(latest.values()), superseded
+
+
+def public_address(address):
+    address = ipaddress.ip_address(address.split('%')[0])
+    return address.is_global and not address.is_multicast
+
+
+def resolve(url):
+    """
+    Check `url` and return the address to connect to: the first address its
+    host resolves to, or None (connect by name) when private addresses are
+    allowed. Raises ValueError unless the URL is http(s) and every address
+    is public.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError('Webhook URLs must be http or https.')
+    if webhook_setting('ALLOW_PRIVATE_ADDRESSES'):
+        return None
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, ValueError):
+        raise ValueError('Webhook URL host does not resolve.')
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(public_address(address) for address in addresses):
+        raise ValueError('Webhook URLs must not point to loopback, private or reserved addresses.')
+    return addresses[0]
+
+
+def validate_url(url):
+    """Raise ValueError unless `url` is http(s) and its host resolves to public addresses only."""
+    resolve(url)
+
+
+def purge(now=None, batch_size=1000):
+    """Delete delivered and failed rows older than WEBHOOKS['RETENTION_DAYS']. Returns the number deleted."""
+    horizon = (now or timezone.now()) - timedelta(days=webhook_setting('RETENTION_DAYS'))
+    done = WebhookOutbox.objects.filter(Q(delivered_at__lt=horizon) | Q(failed_at__lt=horizon))
+    deleted = 0
+    while True:
+        ids = list(done.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += WebhookOutbox.objects.filter(id__in=ids).delete()[0]
+
+
+def sign(secret, body):
+    """HMAC-SHA256 signature of the request body."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections pooled per (scheme, host, port, address).
+    Connections are reused across batches and closed on error. With an
+    address, the socket connects to it instead of resolving the host again;
+    the Host header and TLS server name (and certificate check) still use
+    the host.
+    """
+
+    def __init__(self, size=None, timeout=None):
+        self.size = size or webhook_setting('POOL_SIZE')
+        self.timeout = timeout or webhook_setting('TIMEOUT')
+        self._pools = defaultdict(lambda: LifoQueue(maxsize=self.size))
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            pool = self._pools[key]
+        try:
+            return pool.get_nowait()
+        except Empty:
+            # Imported here: only the delivery worker needs it, not every web worker
+            import http.client
+
+            scheme, host, port, address = key
+            conn_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conn_class(host, port, timeout=self.timeout)
+            if address is not None:
+                conn._create_connection = lambda target, *args: socket.create_connection((address, target[1]), *args)
+            return conn
+
+    def _put(self, key, conn):
+        with self._lock:
+            pool = self._pools[key]
+        if pool.full():
+            conn.close()
+        else:
+            pool.put_nowait(conn)
+
+    def post(self, url, body, headers, address=None):
+        """POST body to url, connecting to `address` if given, and return the response status code."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port, address)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+
+        conn = self._get(key)
+        try:
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._put(key, conn)
+        return response.status
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, defaultdict(lambda: LifoQueue(maxsize=self.size))
+        for pool in pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+
+class WebhookDeliverer:
+    """
+    Drains the outbox: coalesces and batches pending rows per subscription,
+    sends them over pooled connections with a per-endpoint concurrency cap
+    and schedules failed batches for retry with jittered backoff.
+
+    Only HTTP work happens on worker threads; all database access stays
+    on the calling thread.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool or ConnectionPool()
+        self.batch_size = webhook_setting('BATCH_SIZE')
+        self.max_attempts = webhook_setting('MAX_ATTEMPTS')
+        self._semaphores = {}
+
+    def _semaphore(self, subscription):
+        if subscription.pk not in self._semaphores:
+            self._semaphores[subscription.pk] = threading.BoundedSemaphore(max(1, subscription.max_concurrency))
+        return self._semaphores[subscription.pk]
+
+    def _resolve(self, subscription):
+        """(address, None) to deliver to, or (None, error) if the URL is refused."""
+        try:
+            return resolve(subscription.url), None
+        except ValueError as exc:
+            return None, str(exc)
+
+    def _send(self, subscription, rows, target):
+        address, error = target
+        if error is not None:
+            return rows, error
+        body = json.dumps({'events': [row.payload for row in rows]}).encode()
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if subscription.secret:
+            headers['X-Webhook-Signature'] = sign(subscription.secret, body)
+        with self._semaphore(subscription):
+            try:
+                status_code = self.pool.post(subscription.url, body, headers, address)
+            except Exception as exc:
+                return rows, str(exc) or exc.__class__.__name__
+        if 200 <= status_code < 300:
+            return rows, None
+        return rows, f'HTTP {status_code}'
+
+    def pending(self, now=None):
+        """Due rows that no older row for the same subscription and object is waiting ahead of."""
+        now = now or timezone.now()
+        waiting = WebhookOutbox.objects.filter(
+            subscription=OuterRef('subscription'), object_key=OuterRef('object_key'), pk__lt=OuterRef('pk'),
+            delivered_at__isnull=True, failed_at__isnull=True, next_attempt_at__gt=now,
+        )
+        return (
+            WebhookOutbox.objects
+            .filter(delivered_at__isnull=True, failed_at__isnull=True, next_attempt_at__lte=now,
+                    subscription__is_active=True)
+            .exclude(Exists(waiting))
+            .select_related('subscription')
+            .order_by('id')
+        )
+
+    def claim(self, now, limit):
+        """Lease up to `limit` pending rows to this worker for WEBHOOKS['CLAIM_TIMEOUT'] seconds."""
+        with transaction.atomic():
+            rows = list(self.pending(now).select_for_update(skip_locked=True, of=('self',))[:limit])
+            WebhookOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt_at=now + timedelta(seconds=webhook_setting('CLAIM_TIMEOUT'))
+            )
+        return rows
+
+    def run_once(self, limit=1000):
+        """Deliver one round of pending rows. Returns (delivered, failed) row counts."""
+        now = timezone.now()
+        grouped = OrderedDict()
+        for row in self.claim(now, limit):
+            grouped.setdefault(row.subscription, []).append(row)
+
+        jobs = []
+        superseded_ids = []
+        for subscription, rows in grouped.items():
+            to_send, superseded = coalesce(rows)
+            self._semaphore(subscription)
+            superseded_ids.extend(row.pk for row in superseded)
+            for start in range(0, len(to_send), self.batch_size):
+                jobs.append((subscription, to_send[start:start + self.batch_size]))
+
+        if superseded_ids:
+            WebhookOutbox.objects.filter(pk__in=superseded_ids).update(delivered_at=now)
+
+        delivered = failed = 0
+        if not jobs:
+            return delivered, failed
+
+        with ThreadPoolExecutor(max_workers=min(len(jobs), webhook_setting('MAX_WORKERS'))) as executor:
+            # One lookup per subscription per round, shared by its batches
+            subscriptions = list(dict.fromkeys(subscription for subscription, _ in jobs))
+            targets = dict(zip(subscriptions, executor.map(self._resolve, subscriptions)))
+            results = list(executor.map(lambda job: self._send(*job, targets[job[0]]), jobs))
+
+        done = timezone.now()
+        for rows, error in results:
+            if error is None:
+                WebhookOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(delivered_at=done)
+                delivered += len(rows)
+                continue
+            failed += len(rows)
+            for row in rows:
+                row.attempts += 1
+                row.last_error = error[:1000]
+                row.next_attempt_at = done + timedelta(seconds=retry_delay(row.attempts))
+                if row.attempts >= self.max_attempts:
+                    row.failed_at = done
+            WebhookOutbox.objects.bulk_update(rows, ['attempts', 'last_error', 'next_attempt_at', 'failed_at'])
+        return delivered, failed